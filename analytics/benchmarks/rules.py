@@ -0,0 +1,162 @@
+"""
+Rule evaluation benchmark: row-by-row rules vs. columnar (NumPy) rules.
+
+Generates N synthetic CDRs (a share of the users flapping between two BTS, a share speeding) and
+serves them from an in-memory cursor, so only rule evaluation is timed, not Postgres. The
+columnar timings include building the NumPy columns from the fetched rows. Both versions must produce the same
+alerts.
+
+Flapping compares the current implementation, check_flapping (find_flapping_chains over the rows of the
+flapping query, ordered by (imei, timestamp_arrival)), with the columnar FlappingDetector.load() over the same
+window in arrival order (the cold start query). load() also builds the detector's in-memory state (per-IMEI
+transitions, arrivals, seen ids) that later polls extend incrementally, so it is expected to be slower than
+check_flapping here; the gain is that afterwards only new rows are processed instead of the whole window.
+
+    cd analytics
+    python -m benchmarks.rules --rows 1000000
+"""
+
+import time
+import random
+import logging
+import argparse
+import datetime
+import statistics
+
+from src.anomaly_detection.rules_based_anomaly_detector import (
+    check_flapping, FlappingDetector,
+    check_abnormal_speed, check_abnormal_speed_columnar,
+    check_overload, check_overload_columnar, AlertSuppressionIndex,
+)
+
+# cdr_records / bts_registry column order (central-backend/src/main/resources/schema.sql)
+CDR_COLUMNS = [
+    "id", "imei", "mcc", "mnc", "lac", "bts_id", "previous_bts_id", "timestamp_arrival",
+    "timestamp_departure", "user_location_x", "user_location_y", "distance", "speed", "duration",
+    "created_at",
+]
+BTS_COLUMNS = [
+    "id", "bts_id", "lac", "location_x", "location_y", "status", "max_capacity", "current_load",
+    "created_at", "updated_at",
+]
+FLAPPING_COLUMNS = ["id", "imei", "previous_bts_id", "bts_id", "timestamp_arrival"]
+EVENTS_PER_USER = 50
+
+
+class MemoryCursor:
+    """Just enough of a psycopg2 cursor: execute() is ignored, fetchall() returns the given rows."""
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.description = [(name,) for name in columns]
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+
+def make_cdrs(n, flapping_ratio, speeding_ratio, bts_count=200):
+    """CDRs ordered by (imei, timestamp_arrival), as the flapping query returns them."""
+    rows = []
+    start = datetime.datetime.now() - datetime.timedelta(minutes=59)
+    for user in range(n // EVENTS_PER_USER):
+        imei = f"{350000000000000 + user}"
+        flapping = random.random() < flapping_ratio
+        a, b = random.sample(range(bts_count), 2)
+        previous = None
+        for event in range(EVENTS_PER_USER):
+            if flapping and random.random() < 0.9:
+                bts = f"BTS{a if previous != f'BTS{a}' else b}"
+            else:
+                bts = f"BTS{random.randrange(bts_count)}"
+            speed = random.uniform(200, 400) if random.random() < speeding_ratio else random.uniform(0, 120)
+            ts = start + datetime.timedelta(seconds=event * 60)
+            rows.append((
+                len(rows) + 1, imei, "219", "01", "1001", bts, previous, ts, None,
+                0.0, 0.0, 1.0, round(speed, 2), 60, ts,
+            ))
+            previous = bts
+    return rows
+
+
+def make_bts(n):
+    now = datetime.datetime.now()
+    return [
+        (i, f"BTS{i}", "1001", 0.0, 0.0, "active", 1000, random.randrange(0, 100), now, now)
+        for i in range(n)
+    ]
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - started_at) * 1000)
+    return result, statistics.median(times)
+
+
+def key(alerts):
+    return sorted(alert[:5] for alert in alerts)
+
+
+def compare(name, n, row_fn, columnar_fn, repeat):
+    row_alerts, row_ms = timed(row_fn, repeat)
+    columnar_alerts, columnar_ms = timed(columnar_fn, repeat)
+    assert key(row_alerts) == key(columnar_alerts), f"{name}: columnar alerts differ"
+    print(
+        f"{name:<15} {n:>9} rows | row-by-row {row_ms:9.1f} ms | columnar {columnar_ms:8.1f} ms "
+        f"| {row_ms / columnar_ms:5.1f}x | {len(row_alerts)} alerts"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--bts", type=int, default=10000)
+    parser.add_argument("--flapping", type=float, default=0.05, help="share of flapping users")
+    parser.add_argument("--speeding", type=float, default=0.02, help="share of speeding CDRs")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    # every alert is logged at DEBUG; keep the output to the results
+    logging.getLogger("src.anomaly_detection.rules_based_anomaly_detector").setLevel(logging.WARNING)
+
+    cdrs = make_cdrs(args.rows, args.flapping, args.speeding)
+    bts = make_bts(args.bts)
+
+    # both flapping queries return (id, imei, previous_bts_id, bts_id, timestamp_arrival):
+    # check_flapping ordered by (imei, timestamp_arrival), the cold start in arrival order
+    flapping = MemoryCursor([(row[0], row[1], row[6], row[5], row[7]) for row in cdrs], FLAPPING_COLUMNS)
+    arrivals = sorted(flapping.rows, key=lambda row: (row[4], row[0]))
+    compare(
+        "flapping", len(arrivals),
+        lambda: check_flapping(flapping, "", AlertSuppressionIndex()),
+        lambda: FlappingDetector().load(arrivals, AlertSuppressionIndex()),
+        args.repeat,
+    )
+
+    # the speed and overload queries filter in SQL; the rules then run over the matching rows
+    speeding = MemoryCursor([row for row in cdrs if row[CDR_COLUMNS.index("speed")] > 200], CDR_COLUMNS)
+    compare(
+        "abnormal speed", len(speeding.rows),
+        lambda: check_abnormal_speed(speeding, "%s"),
+        lambda: check_abnormal_speed_columnar(speeding, "%s"),
+        args.repeat,
+    )
+
+    overloaded = MemoryCursor([row for row in bts if row[BTS_COLUMNS.index("current_load")] > 50], BTS_COLUMNS)
+    compare(
+        "overload", len(overloaded.rows),
+        lambda: check_overload(overloaded, "%s"),
+        lambda: check_overload_columnar(overloaded, "%s"),
+        args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+from .rules_based_anomaly_detector import main
+
+main()
@@ -4,6 +4,13 @@ import os
 import logging
 import time
 import datetime
+import json
+import weakref
+import bisect
+import itertools
+import operator
+from collections import deque
+import numpy as np
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
@@ -13,21 +20,75 @@ DB_HOST = os.getenv("DB_HOST", "admin")
 DB_PORT = int(os.getenv("DB_PORT", "5432"))
 DB_USER = os.getenv("DB_USER", "admin")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "admin123")
+# poll: provjere svakih POLL_INTERVAL sekundi; stream: na svaki novi CDR (stream_detector.py)
+DETECTION_MODE = os.getenv("DETECTION_MODE", "poll")
+CONSUMER_NAME = os.getenv("CONSUMER_NAME", "anomaly-detection")
+# velicina paketa koji server-side cursor salje odjednom (za upite nad cijelim prozorom)
+CURSOR_ITERSIZE = int(os.getenv("CURSOR_ITERSIZE", "5000"))
+# flapping: koliko sekundi iza watermarka se zapisi ponovno citaju (zapisi commitani s kasnijim timestamp_arrival)
+FLAPPING_LATE_GRACE = int(os.getenv("FLAPPING_LATE_GRACE", "60"))
+# isti alert (alert_type, imei, bts_id, opis) ne ponavlja se unutar cooldowna svog tipa
+ALERT_COOLDOWNS = {
+    'flapping': datetime.timedelta(hours=1),
+    'abnormal speed': datetime.timedelta(minutes=5),
+    'overload': datetime.timedelta(minutes=15),
+}
+DEFAULT_ALERT_COOLDOWN = datetime.timedelta(hours=1)
+ALERT_INDEX_SIZE = int(os.getenv("ALERT_INDEX_SIZE", "100000"))
+# datoteka u koju se sprema indeks alerta, da restart ne ponovi nedavne alerte (prazno: bez snapshota)
+ALERT_SNAPSHOT_PATH = os.getenv("ALERT_SNAPSHOT_PATH", "")
+
+
+class PreparedQuery:
+    """
+    Upit koji se na svakoj vezi jednom pripremi (PREPARE), a zatim se izvrsava s EXECUTE,
+    pa ga Postgres ne parsira i ne planira u svakom pollu. Parametri se pisu kao %s, kao za
+    cursor.execute, i uvijek se salju odvojeno od upita.
+    """
+
+    def __init__(self, name, query):
+        self.name = name
+        self.query = query
+        self.param_count = query.count('%s')
+        self.prepared_on = weakref.WeakSet()  # veze na kojima je upit pripremljen
+
+    def execute(self, cursor, params):
+        if cursor.connection not in self.prepared_on:
+            positional = self.query.strip().rstrip(';')
+            for i in range(1, self.param_count + 1):
+                positional = positional.replace('%s', f'${i}', 1)
+            cursor.execute(f"PREPARE {self.name} AS {positional}")
+            self.prepared_on.add(cursor.connection)
+        cursor.execute(f"EXECUTE {self.name} ({', '.join(['%s'] * self.param_count)})", params)
+
 
 flapping_query = """
-SELECT * FROM cdr_records WHERE timestamp_arrival >= %s 
-ORDER BY imei, timestamp_arrival ASC; 
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM cdr_records
+WHERE timestamp_arrival >= %s
+ORDER BY imei, timestamp_arrival ASC;
 """
-speed_query = """
-SELECT * FROM cdr_records WHERE created_at >= '%s' AND speed > 200;
-"""
-overload_query = """
-SELECT * FROM bts_registry WHERE updated_at >= '%s' AND current_load > 50;
+# incremental flapping: rows from a grace period behind the watermark on, in arrival order (already seen ids are skipped)
+flapping_cold_start_query = """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM cdr_records
+WHERE timestamp_arrival >= %s
+ORDER BY timestamp_arrival, id;
 """
+flapping_incremental_query = PreparedQuery("flapping_incremental", """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM cdr_records
+WHERE timestamp_arrival >= %s
+ORDER BY timestamp_arrival, id;
+""")
+speed_query = PreparedQuery("abnormal_speed", """
+SELECT imei, bts_id, speed FROM cdr_records WHERE created_at >= %s AND speed > 200;
+""")
+overload_query = PreparedQuery("overload", """
+SELECT bts_id, current_load FROM bts_registry WHERE updated_at >= %s AND current_load > 50;
+""")
 col_names_query = """
 SELECT column_name
 FROM information_schema.columns
-WHERE table_name = '%s';
+WHERE table_name = %s
+ORDER BY ordinal_position;
 """
 alerts_insert = """
 INSERT INTO alerts (alert_type, severity, imei, bts_id, description, detected_at)
@@ -39,24 +100,169 @@ def generate_alert(alert_type, severity, imei, bts_id, description):
     logger.debug(f"alert generated: {alert}")
     return alert
 
+def generate_alerts(alert_type, severity, imeis, bts_ids, description):
+    """generate_alert za cijeli paket: alerti jedne provjere dijele detected_at."""
+    detected_at = datetime.datetime.now()
+    alerts = [(alert_type, severity, imei, bts_id, description, detected_at) for imei, bts_id in zip(imeis, bts_ids)]
+    if logger.isEnabledFor(logging.DEBUG):
+        for alert in alerts:
+            logger.debug(f"alert generated: {alert}")
+    return alerts
+
+def execute(cursor, query, params):
+    """Izvrsava SQL string ili PreparedQuery s parametrima."""
+    if isinstance(query, PreparedQuery):
+        query.execute(cursor, params)
+    else:
+        cursor.execute(query, params)
+
+cursor_ids = itertools.count()
+
+def stream_rows(cursor, query, params, itersize=CURSOR_ITERSIZE):
+    """
+    Zapisi upita preko server-side (named) cursora: stizu u paketima od itersize zapisa,
+    umjesto da se cijeli rezultat odjednom ucita u memoriju s fetchall().
+    Upit mora biti SQL string (DECLARE ne prima EXECUTE pripremljenog upita).
+    """
+    named_cursor = cursor.connection.cursor(name=f"anomaly_detection_{next(cursor_ids)}")
+    named_cursor.itersize = itersize
+    try:
+        named_cursor.execute(query, params)
+        yield from named_cursor
+    finally:
+        named_cursor.close()
+
 def fetch_data(cursor, query, time_cutoff):
-    cursor.execute(query % time_cutoff)
+    execute(cursor, query, (time_cutoff,))
     data = cursor.fetchall()
     return data
 
-def clear_old_flapping_alerts(recent_flapping):
-    now_minus_1h = datetime.datetime.now() - datetime.timedelta(hours=1)
-    culled_flapping_list = [x for x in recent_flapping if x["detected_at"] > now_minus_1h]
-    return culled_flapping_list
+def column_positions(cursor, *columns):
+    """Pozicije stupaca u rezultatu zadnjeg upita (prema cursor.description, upiti ne dohvacaju cijelu tablicu)."""
+    names = [c[0] for c in cursor.description]
+    return [names.index(column) for column in columns]
 
-# flapping: korisnik se prebacuje izmedju 2 BTS-a >5 puta/h
-def check_flapping(cursor, flapping_query, column_names, recent_flapping):
-    idx_imei = column_names.index('imei')
-    idx_bts = column_names.index('bts_id')
-    idx_prev_bts = column_names.index('previous_bts_id') 
+class AlertSuppressionIndex:
+    """
+    Deduplikacija alerta svih pravila.
 
-    cursor.execute(flapping_query, (datetime.datetime.now() - datetime.timedelta(hours=1),))
-    data = cursor.fetchall()
+    Kljuc je (alert_type, imei, bts_id, signature), a signature je opis alerta (za flapping opis
+    odreduje cijeli niz: oba BTS-a i broj prijelaza). Alert s kljucem koji je vec u indeksu
+    potiskuje se dok ne istekne cooldown njegovog tipa (ALERT_COOLDOWNS). Svaki tip ima svoj dict
+    kljuc -> istek; uz isti cooldown redoslijed umetanja je i redoslijed isteka, pa se istekli
+    zapisi izbacuju s pocetka dicta, a provjera kljuca je O(1). Iznad max_entries izbacuje se
+    zapis kojem je istek najblizi. Uz snapshot_path indeks se sprema u datoteku (save_snapshot)
+    i ucitava nakon restarta (load_snapshot).
+    """
+
+    def __init__(self, cooldowns=ALERT_COOLDOWNS, max_entries=ALERT_INDEX_SIZE, snapshot_path=None,
+                 snapshot_interval=POLL_INTERVAL):
+        self.cooldowns = cooldowns
+        self.max_entries = max_entries
+        self.snapshot_path = snapshot_path
+        self.snapshot_interval = snapshot_interval  # najmanje sekundi izmedju dva spremanja
+        self.entries = {}  # alert_type -> {(imei, bts_id, signature): istek}
+        self.size = 0
+        self.suppressed = 0
+        self.dirty = False
+        self.last_saved = None
+
+    def __len__(self):
+        return self.size
+
+    def expire(self, now=None):
+        now = now or datetime.datetime.now()
+        for entries in self.entries.values():
+            while entries:
+                key = next(iter(entries))
+                if entries[key] > now:
+                    break
+                del entries[key]
+                self.size -= 1
+                self.dirty = True
+
+    def evict(self):
+        """Izbacuje zapis kojem je istek najblizi (prvi u dictu nekog tipa)."""
+        alert_type, key = min(
+            ((alert_type, next(iter(entries))) for alert_type, entries in self.entries.items() if entries),
+            key=lambda item: self.entries[item[0]][item[1]]
+        )
+        del self.entries[alert_type][key]
+        self.size -= 1
+        self.dirty = True
+
+    def admit(self, alert_type, imei, bts_id, signature, now=None):
+        """True ako alert treba zapisati (i od sada se potiskuje), False ako je potisnut."""
+        now = now or datetime.datetime.now()
+        entries = self.entries.setdefault(alert_type, {})
+        key = (imei, bts_id, signature)
+        expires_at = entries.get(key)
+        if expires_at is not None:
+            if expires_at > now:
+                self.suppressed += 1
+                return False
+            del entries[key]
+            self.size -= 1
+        entries[key] = now + self.cooldowns.get(alert_type, DEFAULT_ALERT_COOLDOWN)
+        self.size += 1
+        self.dirty = True
+        if self.size > self.max_entries:
+            self.evict()
+        return True
+
+    def filter(self, alerts, now=None):
+        """Alerti (iz generate_alert) koji nisu potisnuti."""
+        return [alert for alert in alerts if self.admit(alert[0], alert[2], alert[3], alert[4], now)]
+
+    def save_snapshot(self, force=False):
+        """Sprema indeks ako je promijenjen (najcesce svakih snapshot_interval sekundi); privremena datoteka + os.replace."""
+        if not self.snapshot_path or not self.dirty:
+            return
+        if not force and self.last_saved is not None and time.monotonic() - self.last_saved < self.snapshot_interval:
+            return
+        entries = [
+            [alert_type, imei, bts_id, signature, expires_at.isoformat()]
+            for alert_type, type_entries in self.entries.items()
+            for (imei, bts_id, signature), expires_at in type_entries.items()
+        ]
+        tmp_path = f"{self.snapshot_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"saved_at": datetime.datetime.now().isoformat(), "entries": entries}, f)
+        os.replace(tmp_path, self.snapshot_path)
+        self.dirty = False
+        self.last_saved = time.monotonic()
+
+    def load_snapshot(self, now=None):
+        """Zamjenjuje indeks zadnjim snapshotom (ako postoji), bez isteklih zapisa; vraca broj zapisa."""
+        self.entries = {}
+        self.size = 0
+        self.dirty = False
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path) as f:
+                snapshot = json.load(f)
+            entries = sorted(
+                (datetime.datetime.fromisoformat(expires_at), alert_type, imei, bts_id, signature)
+                for alert_type, imei, bts_id, signature, expires_at in snapshot["entries"]
+            )
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logger.warning(f"Alert snapshot {self.snapshot_path} not loaded: {error}")
+            return 0
+        now = now or datetime.datetime.now()
+        for expires_at, alert_type, imei, bts_id, signature in entries:
+            if expires_at > now:
+                self.entries.setdefault(alert_type, {})[(imei, bts_id, signature)] = expires_at
+                self.size += 1
+        while self.size > self.max_entries:
+            self.evict()
+        logger.info(f"Loaded {self.size} alerts from {self.snapshot_path}")
+        return self.size
+
+# flapping: korisnik se prebacuje izmedju 2 BTS-a >5 puta/h
+def check_flapping(cursor, flapping_query, suppression):
+    data = fetch_data(cursor, flapping_query, datetime.datetime.now() - datetime.timedelta(hours=1))
+    idx_imei, idx_bts, idx_prev_bts = column_positions(cursor, 'imei', 'bts_id', 'previous_bts_id')
 
     imei_grouped_entries = {}
     
@@ -75,71 +281,345 @@ def check_flapping(cursor, flapping_query, column_names, recent_flapping):
     for imei, transitions in imei_grouped_entries.items():
         if len(transitions) <= 5:
             continue
-            
-        current_chain = []
-        
-        for i in range(len(transitions)):
-            curr_prev, curr_curr = transitions[i]
-            
-            if not current_chain:
-                current_chain.append(curr_prev)
-                current_chain.append(curr_curr)
-                continue
-                
-            last_bts = current_chain[-1]
-            second_to_last = current_chain[-2]
-            
-            if curr_prev == last_bts and curr_curr == second_to_last:
-                current_chain.append(curr_curr)
-            else:
-                if len(current_chain) > 6:
-                    new_flapping.append((imei, tuple(current_chain)))
-                current_chain = [curr_prev, curr_curr]
-
-        if len(current_chain) > 6:
-            new_flapping.append((imei, tuple(current_chain)))
+        new_flapping.extend((imei, chain) for chain in find_flapping_chains(transitions))
+
+    return flapping_alerts(new_flapping, suppression)
 
+def extend_chain(current_chain, curr_prev, curr_curr):
+    """
+    Dodaje prijelaz (curr_prev -> curr_curr) u trenutni niz (mijenja listu na mjestu).
+    Vraca niz koji je time prekinut (ako je prekinut), inace None.
+    """
+    if current_chain:
+        last_bts = current_chain[-1]
+        second_to_last = current_chain[-2]
+        if curr_prev == last_bts and curr_curr == second_to_last:
+            current_chain.append(curr_curr)
+            return None
+    closed_chain = tuple(current_chain) if current_chain else None
+    current_chain[:] = [curr_prev, curr_curr]
+    return closed_chain
+
+def find_flapping_chains(transitions):
+    """Svi nizovi izmjene dva BTS-a s vise od 5 prijelaza, za prijelaze jednog IMEI-a."""
+    chains = []
+    current_chain = []
+    for curr_prev, curr_curr in transitions:
+        closed_chain = extend_chain(current_chain, curr_prev, curr_curr)
+        if closed_chain is not None and len(closed_chain) > 6:
+            chains.append(closed_chain)
+    if len(current_chain) > 6:
+        chains.append(tuple(current_chain))
+    return chains
+
+def flapping_alerts(new_flapping, suppression, now=None):
     alerts = []
-    recent_flapping_info = {x["info"] for x in recent_flapping}
-    for flap in new_flapping:
-        imei, chain = flap
-        if flap not in recent_flapping_info:
-            alert = generate_alert(
-                'flapping', 'medium',
-                imei, chain[0],
-                f"Flapping between {chain[0]} and {chain[1]} {len(chain)-1} times"
-            )
-            recent_flapping.append({
-                "info": flap, 
-                "detected_at": datetime.datetime.now()
-            })
-            alerts.append(alert)
+    for imei, chain in new_flapping:
+        description = f"Flapping between {chain[0]} and {chain[1]} {len(chain)-1} times"
+        if suppression.admit('flapping', imei, chain[0], description, now):
+            alerts.append(generate_alert('flapping', 'medium', imei, chain[0], description))
     return alerts
 
+class FlappingDetector:
+    """
+    Inkrementalna verzija check_flapping.
+
+    Prijelazi svakog IMEI-a iz zadnjeg sata (window) i njegov trenutni niz drze se u memoriji.
+    Svaka provjera dohvaca samo zapise od watermarka (timestamp_arrival, id) zadnjeg obradenog
+    zapisa umanjenog za late_grace i izbacuje prijelaze starije od prozora, pa trosak provjere ovisi
+    o broju novih (i isteklih) zapisa, a ne o velicini prozora. Prvi poziv (cold start, load) jednom
+    ucitava cijeli prozor, preko server-side cursora.
+    Zapis cija transakcija commita nakon novijih zapisa ima timestamp_arrival iza watermarka; zato se
+    late_grace iza watermarka cita ponovno, a vec obradeni id-jevi se preskacu. Takav zapis umece se
+    medu prijelaze IMEI-a prema timestamp_arrival i niz tog IMEI-a se ponovno izgradi.
+    """
+
+    def __init__(self, cold_start_query=flapping_cold_start_query,
+                 incremental_query=flapping_incremental_query,
+                 window=datetime.timedelta(hours=1), max_imeis=100000,
+                 late_grace=datetime.timedelta(seconds=FLAPPING_LATE_GRACE), chunk_size=CURSOR_ITERSIZE):
+        self.cold_start_query = cold_start_query
+        self.incremental_query = incremental_query
+        self.window = window
+        self.late_grace = late_grace
+        self.chunk_size = chunk_size  # zapisa po paketu u load (kao itersize server-side cursora)
+        self.max_imeis = max_imeis  # najvise IMEI-a u memoriji; izbacuju se oni najdulje neaktivni
+        self.watermark = None  # (timestamp_arrival, id) zadnjeg obradenog zapisa
+        self.transitions = {}  # imei -> deque[(timestamp_arrival, previous_bts_id, bts_id)]
+        self.chains = {}  # imei -> trenutni (otvoreni) niz
+        self.arrivals = deque()  # (timestamp_arrival, imei) svih prijelaza u prozoru, redom
+        self.seen = deque()  # (timestamp_arrival, id) zapisa obradenih unutar late_grace iza watermarka
+        self.seen_ids = set()
+        self.last_fetched = 0
+
+    def fetch_new_rows(self, cursor, cutoff):
+        if self.watermark is None:
+            return stream_rows(cursor, self.cold_start_query, (cutoff,))
+        execute(cursor, self.incremental_query, (max(cutoff, self.watermark[0] - self.late_grace),))
+        return cursor.fetchall()
+
+    def expire(self, cutoff, new_flapping):
+        """Izbacuje prijelaze starije od prozora i ponovno gradi nizove IMEI-a kojima su izbaceni."""
+        expired = set()
+        while self.arrivals and self.arrivals[0][0] < cutoff:
+            expired.add(self.arrivals.popleft()[1])
+
+        for imei in expired:
+            transitions = self.transitions.get(imei)
+            if transitions is None:
+                continue  # vec izbacen zbog max_imeis
+            while transitions and transitions[0][0] < cutoff:
+                transitions.popleft()
+            if not transitions:
+                del self.transitions[imei]
+                del self.chains[imei]
+                continue
+            self.rebuild_chain(imei, new_flapping)
+        return expired
+
+    def rebuild_chain(self, imei, new_flapping):
+        current_chain = []
+        for _, curr_prev, curr_curr in self.transitions[imei]:
+            closed_chain = extend_chain(current_chain, curr_prev, curr_curr)
+            if closed_chain is not None and len(closed_chain) > 6:
+                new_flapping.append((imei, closed_chain))
+        self.chains[imei] = current_chain
+
+    def check(self, cursor, suppression, now=None):
+        now = now or datetime.datetime.now()
+        rows = self.fetch_new_rows(cursor, now - self.window)
+        if self.watermark is None:
+            return self.load(rows, suppression, now)
+        return self.process(rows, suppression, now)
+
+    def load(self, rows, suppression, now=None):
+        """
+        Cold start: puni prazno stanje iz cijelog prozora (rows redom dolaska, moze biti iterator).
+        rows se citaju u paketima od chunk_size zapisa (server-side cursor se ne ucitava cijeli) i svaki
+        paket odmah se slaze u prijelaze po IMEI-u. Nizovi se zatim traze jednom, stupcano
+        (flapping_segments) nad prijelazima svih IMEI-a, a ne prijelaz po prijelaz kao u process;
+        alerti i stanje isti su kao iz process. Koristi ga i obnova stanja u streaming nacinu rada.
+        """
+        now = now or datetime.datetime.now()
+        cutoff = now - self.window
+        self.last_fetched = 0
+
+        rows = iter(rows)
+        recent = deque()  # paketi koji mogu biti unutar late_grace iza watermarka
+        for chunk in iter(lambda: list(itertools.islice(rows, self.chunk_size)), []):
+            self.load_chunk(chunk, cutoff)
+            recent.append(chunk)
+            while recent[0][-1][4] < self.watermark[0] - self.late_grace:
+                recent.popleft()
+        for chunk in recent:
+            for row_id, _, _, _, timestamp_arrival in chunk:
+                if timestamp_arrival >= self.watermark[0] - self.late_grace:
+                    self.seen.append((timestamp_arrival, row_id))
+                    self.seen_ids.add(row_id)
+        if not self.transitions:
+            return []
+
+        # IMEI-i redom zadnjeg prijelaza, pa je prvi u dictu onaj najdulje neaktivan (kao nakon process)
+        last_active = dict.fromkeys(map(operator.itemgetter(1), reversed(self.arrivals)))
+        self.transitions = {imei: self.transitions[imei] for imei in reversed(last_active)}
+
+        # prijelazi svih IMEI-a jedan za drugim; IMEI je kodiran brojem, pa je usporedba susjeda brza
+        counts = [len(transitions) for transitions in self.transitions.values()]
+        codes = np.repeat(np.arange(len(counts)), counts)
+        previous_bts_ids = np.fromiter(
+            (t[1] for transitions in self.transitions.values() for t in transitions), dtype=object, count=len(codes)
+        )
+        bts_ids = np.fromiter(
+            (t[2] for transitions in self.transitions.values() for t in transitions), dtype=object, count=len(codes)
+        )
+        starts, lengths = flapping_segments(codes, previous_bts_ids, bts_ids)
+
+        imeis = list(self.transitions)
+        new_flapping = [
+            (imeis[codes[start]], segment_chain(previous_bts_ids, bts_ids, start, length))
+            for start, length in zip(starts[lengths > 5].tolist(), lengths[lengths > 5].tolist())
+        ]
+
+        # zadnji niz svakog IMEI-a je njegov trenutni (otvoreni) niz
+        last = np.append(np.flatnonzero(codes[starts[1:]] != codes[starts[:-1]]), len(starts) - 1)
+        for start, length in zip(starts[last].tolist(), lengths[last].tolist()):
+            self.chains[imeis[codes[start]]] = list(segment_chain(previous_bts_ids, bts_ids, start, length))
+
+        self.evict_inactive()
+        return flapping_alerts(new_flapping, suppression, now)
+
+    def load_chunk(self, chunk, cutoff):
+        """Dodaje paket zapisa u prijelaze IMEI-a (kao process, bez gradnje nizova)."""
+        self.last_fetched += len(chunk)
+        # rows su poredani po (timestamp_arrival, id), pa je zadnji zapis paketa watermark
+        self.watermark = (chunk[-1][4], chunk[-1][0])
+        transitions_of = self.transitions
+        for _, imei, previous_bts_id, bts_id, timestamp_arrival in chunk:
+            if bts_id == previous_bts_id or timestamp_arrival < cutoff:
+                continue
+            transitions = transitions_of.get(imei)
+            if transitions is None:
+                transitions = transitions_of[imei] = deque()
+            transitions.append((timestamp_arrival, previous_bts_id, bts_id))
+            self.arrivals.append((timestamp_arrival, imei))
+
+    def process(self, rows, suppression, now=None):
+        """
+        Obraduje nove zapise (id, imei, previous_bts_id, bts_id, timestamp_arrival) redom dolaska;
+        rows moze biti i iterator (server-side cursor). Koristi ga i check (polling) i streaming
+        nacin rada (stream_detector.py).
+        """
+        now = now or datetime.datetime.now()
+        cutoff = now - self.window
+        new_flapping = []
+        touched = self.expire(cutoff, new_flapping)
+        late = set()
+        self.last_fetched = 0
+
+        for row_id, imei, previous_bts_id, bts_id, timestamp_arrival in rows:
+            if row_id in self.seen_ids:
+                continue  # procitan ponovno iz late_grace iza watermarka
+            self.seen_ids.add(row_id)
+            self.seen.append((timestamp_arrival, row_id))
+            if self.watermark is None or (timestamp_arrival, row_id) > self.watermark:
+                self.watermark = (timestamp_arrival, row_id)
+            self.last_fetched += 1
+            if bts_id == previous_bts_id or timestamp_arrival < cutoff:
+                continue
+            # IMEI se premjesta na kraj, pa je prvi u dictu onaj najdulje neaktivan
+            transitions = self.transitions.pop(imei, None) or deque()
+            self.transitions[imei] = transitions
+            self.arrivals.append((timestamp_arrival, imei))
+            touched.add(imei)
+            if transitions and timestamp_arrival < transitions[-1][0]:
+                # zakasnjeli zapis: umece se na svoje mjesto, niz se gradi ponovno nakon paketa
+                bisect.insort(transitions, (timestamp_arrival, previous_bts_id, bts_id), key=lambda t: t[0])
+                late.add(imei)
+                continue
+            transitions.append((timestamp_arrival, previous_bts_id, bts_id))
+            current_chain = self.chains.setdefault(imei, [])
+            closed_chain = extend_chain(current_chain, previous_bts_id, bts_id)
+            if closed_chain is not None and len(closed_chain) > 6:
+                new_flapping.append((imei, closed_chain))
+
+        for imei in late:
+            self.rebuild_chain(imei, new_flapping)
+
+        self.trim_seen()
+
+        for imei in touched:
+            current_chain = self.chains.get(imei)
+            if current_chain is not None and len(current_chain) > 6:
+                new_flapping.append((imei, tuple(current_chain)))
+
+        self.evict_inactive()
+        return flapping_alerts(new_flapping, suppression, now)
+
+    def trim_seen(self):
+        """Zaboravlja id-jeve zapisa starijih od late_grace iza watermarka (ne citaju se ponovno)."""
+        if self.watermark is not None:
+            horizon = self.watermark[0] - self.late_grace
+            while self.seen and self.seen[0][0] < horizon:
+                self.seen_ids.discard(self.seen.popleft()[1])
+
+    def evict_inactive(self):
+        while len(self.transitions) > self.max_imeis:
+            imei = next(iter(self.transitions))
+            del self.transitions[imei]
+            del self.chains[imei]
+
 # abnormal speed: >200km/h
-def check_abnormal_speed(cursor, speed_query, column_names):
+def check_abnormal_speed(cursor, speed_query):
     data = fetch_data(cursor, speed_query, datetime.datetime.now() - datetime.timedelta(seconds=POLL_INTERVAL))
+    idx_imei, idx_bts = column_positions(cursor, 'imei', 'bts_id')
     alerts = []
     for row in data:
-        imei = row[column_names.index('imei')]
-        bts_id = row[column_names.index('bts_id')]
+        imei = row[idx_imei]
+        bts_id = row[idx_bts]
         alerts.append(generate_alert('abnormal speed', 'low', imei, bts_id, "Speed above 200km/h"))
     return alerts
 
 # overload: current load >50
-def check_overload(cursor, overload_query, column_names):
+def check_overload(cursor, overload_query):
     data = fetch_data(cursor, overload_query, datetime.datetime.now() - datetime.timedelta(seconds=POLL_INTERVAL))
+    idx_bts, = column_positions(cursor, 'bts_id')
     alerts = []
     for row in data:
-        bts_id = row[column_names.index('bts_id')]
+        bts_id = row[idx_bts]
         alerts.append(generate_alert('overload', 'high', None, bts_id, "Current load above 50"))
     return alerts
 
+# ---------------------------------------------------------------------------
+# Stupcane (vektorizirane) verzije pravila: iz rezultata upita izdvajaju se samo
+# potrebni stupci kao NumPy polja i pravila se racunaju nad cijelim poljima
+# ---------------------------------------------------------------------------
+
+def fetch_columns(cursor, query, columns, params):
+    """
+    Izvrsava upit i vraca {stupac: np.array} za trazene stupce {stupac: dtype} (prema cursor.description).
+    Numericki stupci odmah su tipizirana polja (float, int), object ostaje samo za id-jeve (imei, bts_id).
+    """
+    execute(cursor, query, params)
+    rows = cursor.fetchall()
+    positions = column_positions(cursor, *columns)
+    return {
+        column: np.fromiter(map(operator.itemgetter(i), rows), dtype=dtype, count=len(rows))
+        for (column, dtype), i in zip(columns.items(), positions)
+    }
+
+def flapping_segments(imeis, previous_bts_ids, bts_ids):
+    """
+    Stupcani find_flapping_chains za prijelaze vise IMEI-a, poredane po (imei, timestamp_arrival).
+    Prijelaz nastavlja niz prethodnog prijelaza ako je isti IMEI i ako je obrnut (A->B pa B->A);
+    nizovi su neprekinuti odsjecci takvih prijelaza. Vraca (pocetak, broj prijelaza) svih nizova.
+    """
+    # shift za jedan prijelaz unutar istog IMEI-a
+    continues = np.zeros(len(imeis), dtype=bool)
+    continues[1:] = (
+        (imeis[1:] == imeis[:-1])
+        & (previous_bts_ids[1:] == bts_ids[:-1])
+        & (bts_ids[1:] == previous_bts_ids[:-1])
+    )
+    starts = np.flatnonzero(~continues)
+    lengths = np.diff(np.append(starts, len(imeis)))
+    return starts, lengths
+
+def segment_chain(previous_bts_ids, bts_ids, start, length):
+    """Niz BTS-ova odsjecka od length prijelaza koji pocinje na start."""
+    pair = (previous_bts_ids[start], bts_ids[start])
+    return tuple(pair[k % 2] for k in range(length + 1))
+
+def check_abnormal_speed_columnar(cursor, speed_query):
+    data = fetch_columns(
+        cursor, speed_query, {'imei': object, 'bts_id': object, 'speed': float},
+        (datetime.datetime.now() - datetime.timedelta(seconds=POLL_INTERVAL),)
+    )
+    # upit vec filtrira speed > 200; maska vrijedi i kad se pravilo racuna nad cijelim paketom
+    speeding = data['speed'] > 200
+    return generate_alerts(
+        'abnormal speed', 'low', data['imei'][speeding].tolist(), data['bts_id'][speeding].tolist(),
+        "Speed above 200km/h"
+    )
+
+def check_overload_columnar(cursor, overload_query):
+    data = fetch_columns(
+        cursor, overload_query, {'bts_id': object, 'current_load': np.int64},
+        (datetime.datetime.now() - datetime.timedelta(seconds=POLL_INTERVAL),)
+    )
+    overloaded = data['current_load'] > 50
+    bts_ids = data['bts_id'][overloaded].tolist()
+    return generate_alerts('overload', 'high', [None] * len(bts_ids), bts_ids, "Current load above 50")
+
+schema_cache = weakref.WeakKeyDictionary()  # veza -> {tablica: stupci}
+
 def fetch_column_names(cursor, query, table_name):
-    cursor.execute(query % table_name)
-    data = cursor.fetchall()
-    cdr_records_col_names = list(sum(data, ())) # flattens data into 1d list
-    return cdr_records_col_names
+    """Stupci tablice; information_schema se cita jednom po vezi, ne u svakom pollu."""
+    tables = schema_cache.setdefault(cursor.connection, {})
+    if table_name not in tables:
+        cursor.execute(query, (table_name,))
+        data = cursor.fetchall()
+        tables[table_name] = list(sum(data, ())) # flattens data into 1d list
+    return tables[table_name]
 
 def open_db_connection(connection_params):
     logger.info('Connecting to the PostgreSQL database...')
@@ -161,27 +641,32 @@ def main():
         "host": DB_HOST,
         "port": DB_PORT
     }
-    recent_flapping = []
+    if DETECTION_MODE == "stream":
+        from .stream_detector import StreamDetector
+        StreamDetector(connection_params, consumer=CONSUMER_NAME).run()
+        return
+    suppression = AlertSuppressionIndex(snapshot_path=ALERT_SNAPSHOT_PATH or None)
+    suppression.load_snapshot()
+    flapping_detector = FlappingDetector()
     conn = None
     while True:
         try:
             if conn is None or conn.closed:
                 conn, cur = open_db_connection(connection_params)
             starttime = time.monotonic()
-            cdr_records_col_names = fetch_column_names(cur, col_names_query, 'cdr_records')
-            bts_registry_col_names = fetch_column_names(cur, col_names_query, 'bts_registry')
-            
-            recent_flapping = clear_old_flapping_alerts(recent_flapping)
-            flapping_alerts = check_flapping(cur, flapping_query, cdr_records_col_names, recent_flapping)
-            abnormal_speed_alerts = check_abnormal_speed(cur, speed_query, cdr_records_col_names)
-            overload_alerts = check_overload(cur, overload_query, bts_registry_col_names)
+
+            suppression.expire()
+            flapping_alerts = flapping_detector.check(cur, suppression)
+            abnormal_speed_alerts = suppression.filter(check_abnormal_speed_columnar(cur, speed_query))
+            overload_alerts = suppression.filter(check_overload_columnar(cur, overload_query))
 
             alerts = flapping_alerts + abnormal_speed_alerts + overload_alerts
             if alerts:
                 cur.executemany(alerts_insert, alerts)
                 conn.commit()
                 logger.info('Alerts table updated')
-            
+            suppression.save_snapshot()
+
             elapsed = time.monotonic() - starttime
             time.sleep(POLL_INTERVAL - elapsed)
         except (psycopg2.OperationalError, psycopg2.InterfaceError) as error:
@@ -0,0 +1,258 @@
+import select
+import datetime
+import time
+import logging
+
+import psycopg2
+import psycopg2.extensions
+
+from .rules_based_anomaly_detector import (
+    POLL_INTERVAL, ALERT_SNAPSHOT_PATH, PreparedQuery, FlappingDetector, AlertSuppressionIndex,
+    generate_alert, alerts_insert, execute, stream_rows, open_db_connection, close_db_connection,
+)
+
+logger = logging.getLogger(__name__)
+
+# kanali na koje okidaci iz schema.sql salju obavijesti (jedna po naredbi, prazan payload)
+CDR_CHANNEL = "cdr_records"
+BTS_CHANNEL = "bts_registry"
+
+BATCH_SIZE = 5000
+# rupa u id-jevima (transakcija koja jos nije commitana ili je ponistena) ceka se ovoliko sekundi
+GAP_TIMEOUT = 10.0
+# updated_at se postavlja prije commita, pa promjena BTS-a moze postati vidljiva iza offseta;
+# promjene ovoliko sekundi prije offseta citaju se ponovno
+BTS_LATE_GRACE = datetime.timedelta(seconds=60)
+
+offsets_select = """
+SELECT last_cdr_id, pending_cdr_ids, last_bts_update FROM detector_offsets WHERE consumer = %s;
+"""
+offsets_upsert = """
+INSERT INTO detector_offsets (consumer, last_cdr_id, pending_cdr_ids, last_bts_update, updated_at)
+VALUES (%s, %s, %s, %s, NOW())
+ON CONFLICT (consumer) DO UPDATE SET
+    last_cdr_id = EXCLUDED.last_cdr_id,
+    pending_cdr_ids = EXCLUDED.pending_cdr_ids,
+    last_bts_update = EXCLUDED.last_bts_update,
+    updated_at = NOW();
+"""
+new_cdrs_query = PreparedQuery("stream_new_cdrs", """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival, speed FROM cdr_records
+WHERE id > %s AND NOT (id = ANY(%s::BIGINT[]))
+ORDER BY id
+LIMIT %s;
+""")
+# zapisi do offseta, za obnovu stanja flappinga nakon restarta (bez generiranja alerta)
+replay_cdrs_query = """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM cdr_records
+WHERE timestamp_arrival >= %s AND (id <= %s OR id = ANY(%s::BIGINT[]))
+ORDER BY timestamp_arrival, id;
+"""
+bts_updates_query = PreparedQuery("stream_bts_updates", """
+SELECT bts_id, current_load, updated_at FROM bts_registry
+WHERE updated_at >= %s
+ORDER BY updated_at, id;
+""")
+bts_state_query = """
+SELECT bts_id, current_load, updated_at FROM bts_registry;
+"""
+
+
+class CdrOffset:
+    """
+    Offset potrosaca nad cdr_records.id.
+
+    last_id je najveci id do kojeg su obradeni svi zapisi; pending su obradeni id-jevi iza rupe.
+    Id-jevi se dodjeljuju pri INSERT-u, a zapisi postaju vidljivi pri commitu, pa zapis s manjim
+    id-jem moze postati vidljiv nakon veceg. Rupa se zato ne preskace odmah, nego tek nakon
+    GAP_TIMEOUT sekundi (tada je transakcija sigurno ponistena).
+    """
+
+    def __init__(self, last_id=0, pending=()):
+        self.last_id = last_id
+        self.pending = set(pending)
+        self.gap_since = None
+
+    def is_new(self, row_id):
+        return row_id > self.last_id and row_id not in self.pending
+
+    def advance(self, row_ids, now=None):
+        now = now or time.monotonic()
+        self.pending.update(row_ids)
+        while self.pending:
+            if self.last_id + 1 in self.pending:
+                self.pending.remove(self.last_id + 1)
+                self.last_id += 1
+                self.gap_since = None
+                continue
+            if self.gap_since is None:
+                self.gap_since = now
+            if now - self.gap_since < GAP_TIMEOUT:
+                break
+            logger.warning(f"Skipping CDR ids {self.last_id + 1}..{min(self.pending) - 1}")
+            self.last_id = min(self.pending) - 1
+            self.gap_since = None
+
+
+class StreamDetector:
+    """
+    Streaming nacin rada: pravila se primjenjuju na svaki novi CDR cim je zapisan.
+
+    Okidaci u schema.sql na INSERT u cdr_records i promjenu current_load u bts_registry salju
+    NOTIFY; obavijest samo budi detektor, a novi zapisi se citaju prema offsetu, pa se nista ne
+    propusti ni kad obavijest izostane (npr. za vrijeme prekida veze). Alerti i novi offset
+    zapisuju se u istoj transakciji, pa nakon restarta detektor nastavlja od zadnjeg offseta
+    bez propustenih i bez dupliciranih alerta.
+
+    Stanje je ograniceno: flapping drzi prijelaze zadnjeg sata za najvise max_imeis IMEI-a,
+    overload samo zadnje stanje svakog BTS-a, a indeks alerta najvise ALERT_INDEX_SIZE alerta.
+    """
+
+    def __init__(self, connection_params, consumer="anomaly-detection", max_imeis=100000):
+        self.connection_params = connection_params
+        self.consumer = consumer
+        self.flapping = FlappingDetector(max_imeis=max_imeis)
+        self.suppression = AlertSuppressionIndex(snapshot_path=ALERT_SNAPSHOT_PATH or None)
+        self.overloaded = {}  # bts_id -> je li BTS trenutno preopterecen
+        self.offset = CdrOffset()
+        self.last_bts_update = None
+        self.conn = None
+        self.cur = None
+        self.listen_conn = None
+
+    # -----------------------------------------------------------------
+    # veza i offseti
+    # -----------------------------------------------------------------
+
+    def connect(self):
+        self.conn, self.cur = open_db_connection(self.connection_params)
+
+        self.listen_conn = psycopg2.connect(**self.connection_params)
+        self.listen_conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        listen_cur = self.listen_conn.cursor()
+        listen_cur.execute(f"LISTEN {CDR_CHANNEL};")
+        listen_cur.execute(f"LISTEN {BTS_CHANNEL};")
+        logger.info(f"Listening on {CDR_CHANNEL}, {BTS_CHANNEL}")
+
+    def close(self):
+        close_db_connection(self.listen_conn)
+        close_db_connection(self.conn)
+        self.conn = self.listen_conn = None
+
+    def restore(self):
+        """
+        Ucitava offset i obnavlja stanje flappinga i overloada do offseta, bez alerta.
+        Poziva se nakon svakog (ponovnog) spajanja: sve sto nije commitano obraduje se ponovo.
+        Indeks alerta vraca se na zadnji snapshot (bez snapshota na prazan indeks).
+        """
+        self.flapping = FlappingDetector(window=self.flapping.window, max_imeis=self.flapping.max_imeis)
+        self.suppression.load_snapshot()
+        self.overloaded = {}
+
+        self.cur.execute(offsets_select, (self.consumer,))
+        row = self.cur.fetchone()
+        if row is None:
+            # prvo pokretanje: krece se od trenutnog kraja tablica
+            self.cur.execute("SELECT COALESCE(MAX(id), 0) FROM cdr_records;")
+            self.offset = CdrOffset(self.cur.fetchone()[0])
+            self.last_bts_update = None
+        else:
+            self.offset = CdrOffset(row[0], row[1] or ())
+            self.last_bts_update = row[2]
+
+        now = datetime.datetime.now()
+        rows = stream_rows(self.cur, replay_cdrs_query, (
+            now - self.flapping.window, self.offset.last_id, sorted(self.offset.pending)
+        ))
+        # alerti za ove nizove su vec zapisani prije restarta; ovdje se samo pamte kao vidjeni
+        self.flapping.load(rows, self.suppression, now)
+
+        # BTS-ovi promijenjeni nakon offseta obradit ce se u consume_bts_updates
+        self.cur.execute(bts_state_query)
+        baseline = self.last_bts_update is None
+        for bts_id, current_load, updated_at in self.cur.fetchall():
+            if baseline or updated_at is None or updated_at <= self.last_bts_update:
+                self.overloaded[bts_id] = current_load > 50
+            if baseline and updated_at is not None:
+                self.last_bts_update = max(self.last_bts_update or updated_at, updated_at)
+        self.conn.commit()
+        logger.info(f"Resuming {self.consumer} after CDR id {self.offset.last_id}")
+
+    def commit(self, alerts):
+        if alerts:
+            self.cur.executemany(alerts_insert, alerts)
+        self.cur.execute(offsets_upsert, (
+            self.consumer, self.offset.last_id, sorted(self.offset.pending), self.last_bts_update
+        ))
+        self.conn.commit()
+        self.suppression.save_snapshot()
+        if alerts:
+            logger.info(f"Alerts table updated ({len(alerts)})")
+
+    # -----------------------------------------------------------------
+    # pravila
+    # -----------------------------------------------------------------
+
+    def consume_cdrs(self):
+        """Obraduje sve nove CDR-ove, u paketima od BATCH_SIZE zapisa."""
+        alerts = []
+        while True:
+            execute(self.cur, new_cdrs_query, (self.offset.last_id, sorted(self.offset.pending), BATCH_SIZE))
+            rows = [r for r in self.cur.fetchall() if self.offset.is_new(r[0])]
+            if rows:
+                self.suppression.expire()
+                alerts += self.flapping.process([r[:5] for r in rows], self.suppression)
+                # abnormal speed: >200km/h
+                alerts += self.suppression.filter(
+                    generate_alert('abnormal speed', 'low', imei, bts_id, "Speed above 200km/h")
+                    for row_id, imei, _, bts_id, _, speed in rows
+                    if speed is not None and speed > 200
+                )
+            self.offset.advance(r[0] for r in rows)
+            if len(rows) < BATCH_SIZE:
+                return alerts
+
+    def consume_bts_updates(self):
+        """
+        overload: alert kad current_load BTS-a prijede 50 (ne za svaku promjenu dok je preopterecen).
+        Promjene unutar BTS_LATE_GRACE prije offseta (i one s istim updated_at) citaju se ponovno;
+        redak nosi trenutno stanje BTS-a, pa ponovno citanje ne generira novi alert.
+        """
+        alerts = []
+        since = self.last_bts_update - BTS_LATE_GRACE if self.last_bts_update else datetime.datetime.min
+        execute(self.cur, bts_updates_query, (since,))
+        for bts_id, current_load, updated_at in self.cur.fetchall():
+            overloaded = current_load > 50
+            if overloaded and not self.overloaded.get(bts_id):
+                alerts += self.suppression.filter([generate_alert('overload', 'high', None, bts_id, "Current load above 50")])
+            self.overloaded[bts_id] = overloaded
+            self.last_bts_update = max(self.last_bts_update or updated_at, updated_at)
+        return alerts
+
+    def step(self):
+        alerts = self.consume_cdrs() + self.consume_bts_updates()
+        self.commit(alerts)
+
+    def wait(self, timeout):
+        """Ceka NOTIFY (ili timeout, za istek prozora flappinga i rupe u id-jevima)."""
+        if select.select([self.listen_conn], [], [], timeout) != ([], [], []):
+            self.listen_conn.poll()
+            self.listen_conn.notifies.clear()
+
+    def run(self):
+        while True:
+            try:
+                if self.conn is None or self.conn.closed:
+                    self.connect()
+                    self.restore()
+                self.step()
+                self.wait(min(POLL_INTERVAL, GAP_TIMEOUT))
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as error:
+                logger.error(f"DB Connection lost: {error}")
+                self.close()
+                time.sleep(5)
+            except Exception as error:
+                logger.exception("Unexpected error")
+                # stanje u memoriji moze biti ispred commitanog offseta; obnavlja se nakon spajanja
+                self.close()
+                time.sleep(5)
@@ -3,6 +3,7 @@ import sys
 import datetime
 import logging
 import csv
+import tempfile
 import unittest
 
 # sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
@@ -57,13 +58,24 @@ drop_test_tables_str="""
 DROP TABLE IF EXISTS test_cdr_records, test_bts_registry;
 """
 test_flapping_query="""
-SELECT * FROM test_cdr_records WHERE timestamp_arrival >= '%s';
+SELECT * FROM test_cdr_records WHERE timestamp_arrival >= %s
+ORDER BY imei, timestamp_arrival ASC;
+"""
+test_flapping_cold_start_query = """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM test_cdr_records
+WHERE timestamp_arrival >= %s
+ORDER BY timestamp_arrival, id;
+"""
+test_flapping_incremental_query = """
+SELECT id, imei, previous_bts_id, bts_id, timestamp_arrival FROM test_cdr_records
+WHERE timestamp_arrival >= %s
+ORDER BY timestamp_arrival, id;
 """
 test_speed_query = """
-SELECT * FROM test_cdr_records WHERE created_at >= '%s' AND speed > 200;
+SELECT * FROM test_cdr_records WHERE created_at >= %s AND speed > 200;
 """
 test_overload_query = """
-SELECT * FROM test_bts_registry WHERE updated_at >= '%s' AND current_load > 50;
+SELECT * FROM test_bts_registry WHERE updated_at >= %s AND current_load > 50;
 """
 get_alerts_query = """
 SELECT * FROM alerts WHERE alert_type = '%s';
@@ -138,8 +150,6 @@ class TestAnomalyDetection(unittest.TestCase):
         create_test_tables(cls.cur)
         #logger.debug(get_table_names(cls.cur))
                 
-        cls.cdr_records_col_names = fetch_column_names(cls.cur, col_names_query, 'test_cdr_records')
-        cls.bts_registry_col_names = fetch_column_names(cls.cur, col_names_query, 'test_bts_registry')
         cls.alerts_col_names = fetch_column_names(cls.cur, col_names_query, 'alerts')
         
         test_cdr_records_header, test_cdr_records = read_dummy_data("./dummy_data/dummy_cdr_records.csv")
@@ -160,7 +170,7 @@ class TestAnomalyDetection(unittest.TestCase):
         self.assertTrue(self.conn.closed == 0)
     
     def test_flapping_alerts(self):
-        flapping_alerts = check_flapping(self.cur, test_flapping_query, self.cdr_records_col_names, [])
+        flapping_alerts = check_flapping(self.cur, test_flapping_query, AlertSuppressionIndex())
         self.cur.executemany(alerts_insert, flapping_alerts)
         self.cur.execute(get_alerts_query % "flapping")
         flapping_data_from_table = self.cur.fetchall()
@@ -179,8 +189,92 @@ class TestAnomalyDetection(unittest.TestCase):
             self.assertEqual(flapping_alert[self.alerts_col_names.index('bts_id')], expected_result["bts_id"])
             self.assertEqual(flapping_alert[self.alerts_col_names.index('description')], expected_result["description"])
 
+    def test_incremental_flapping_alerts(self):
+        detector = FlappingDetector(test_flapping_cold_start_query, test_flapping_incremental_query)
+        suppression = AlertSuppressionIndex()
+
+        # cold start: cijeli prozor se ucitava jednom, isti alerti kao check_flapping
+        flapping_alerts = detector.check(self.cur, suppression)
+        expected_results = [
+            ('123455', 'BTS4', 'Flapping between BTS4 and BTS2 7 times'),
+            ('123457', 'BTS2', 'Flapping between BTS2 and BTS3 6 times'),
+        ]
+        self.assertEqual(sorted((a[2], a[3], a[4]) for a in flapping_alerts), expected_results)
+        self.assertIsNotNone(detector.watermark)
+
+        # iduca provjera dohvaca samo zapise nakon watermarka: nema novih zapisa ni novih alerta
+        self.assertEqual(detector.check(self.cur, suppression), [])
+        self.assertEqual(detector.last_fetched, 0)
+
+        # nakon sat vremena svi prijelazi isteknu iz prozora
+        detector.check(self.cur, suppression, now=datetime.datetime.now() + datetime.timedelta(hours=1))
+        self.assertEqual(detector.transitions, {})
+
+    def test_late_flapping_rows(self):
+        detector = FlappingDetector()
+        suppression = AlertSuppressionIndex()
+        now = datetime.datetime.now()
+        at = lambda seconds: now - datetime.timedelta(seconds=seconds)
+        bts = ['BTS1', 'BTS2'] * 4
+        rows = [(i, '123460', bts[i], bts[i + 1], at(100 - i)) for i in range(7)]
+
+        # zapis 3 commitan je nakon zapisa 4..6: kad se pojavi, timestamp_arrival mu je iza watermarka
+        late_row = rows.pop(3)
+        self.assertEqual(detector.process(rows, suppression, now), [])
+
+        # ponovno citanje late_grace iza watermarka: vec obradeni zapisi se preskacu, zakasnjeli se umece
+        flapping_alerts = detector.process([late_row] + rows[3:], suppression, now)
+        self.assertEqual(detector.last_fetched, 1)
+        self.assertEqual([(a[2], a[4]) for a in flapping_alerts], [('123460', 'Flapping between BTS1 and BTS2 7 times')])
+        self.assertEqual(detector.watermark, (rows[-1][4], rows[-1][0]))
+
+    def test_columnar_rules(self):
+        # stupcane verzije pravila daju iste alerte kao verzije redak po redak
+        key = lambda alerts: sorted(a[:5] for a in alerts)
+        cold_start = FlappingDetector(test_flapping_cold_start_query, test_flapping_incremental_query, chunk_size=2)
+        self.assertEqual(
+            key(cold_start.check(self.cur, AlertSuppressionIndex())),
+            key(check_flapping(self.cur, test_flapping_query, AlertSuppressionIndex())),
+        )
+        self.assertEqual(
+            key(check_abnormal_speed_columnar(self.cur, test_speed_query)),
+            key(check_abnormal_speed(self.cur, test_speed_query)),
+        )
+        self.assertEqual(
+            key(check_overload_columnar(self.cur, test_overload_query)),
+            key(check_overload(self.cur, test_overload_query)),
+        )
+
+    def test_alert_suppression(self):
+        now = datetime.datetime.now()
+        overload = ('overload', 'high', None, 'BTS3', "Current load above 50", now)
+        speeding = ('abnormal speed', 'low', '123458', 'BTS1', "Speed above 200km/h", now)
+        suppression = AlertSuppressionIndex(max_entries=3)
+
+        # isti alert se potiskuje do isteka cooldowna svog tipa
+        self.assertEqual(suppression.filter([overload, overload], now), [overload])
+        self.assertEqual(suppression.filter([speeding], now), [speeding])
+        later = now + datetime.timedelta(minutes=6)
+        self.assertEqual(suppression.filter([overload, speeding], later), [speeding])
+        self.assertEqual(suppression.suppressed, 2)
+
+        # istekli zapisi se izbacuju, a velicina je ogranicena na max_entries
+        suppression.expire(now + datetime.timedelta(minutes=12))
+        self.assertEqual(len(suppression), 1)
+        for bts_id in ('BTS1', 'BTS2', 'BTS4', 'BTS5'):
+            suppression.admit('overload', None, bts_id, "Current load above 50", now)
+        self.assertEqual(len(suppression), 3)
+
+        # snapshot: nakon restarta su nedavni alerti i dalje potisnuti
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            suppression.snapshot_path = f"{snapshot_dir}/alerts.json"
+            suppression.save_snapshot(force=True)
+            restarted = AlertSuppressionIndex(snapshot_path=suppression.snapshot_path)
+            self.assertEqual(restarted.load_snapshot(now), 3)
+            self.assertFalse(restarted.admit('overload', None, 'BTS5', "Current load above 50", now))
+
     def test_speed_alerts(self):
-        abnormal_speed_alerts = check_abnormal_speed(self.cur, test_speed_query, self.cdr_records_col_names)
+        abnormal_speed_alerts = check_abnormal_speed(self.cur, test_speed_query)
         self.cur.executemany(alerts_insert, abnormal_speed_alerts)
         self.cur.execute(get_alerts_query % "abnormal_speed")
         speeding_from_table = self.cur.fetchall()
@@ -192,7 +286,7 @@ class TestAnomalyDetection(unittest.TestCase):
 
 
     def test_overload_alerts(self):
-        overload_alerts = check_overload(self.cur, test_overload_query, self.bts_registry_col_names)
+        overload_alerts = check_overload(self.cur, test_overload_query)
         self.cur.executemany(alerts_insert, overload_alerts)
         self.cur.execute(get_alerts_query % "overload")
         overload_from_table = self.cur.fetchall()
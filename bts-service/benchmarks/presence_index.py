@@ -0,0 +1,119 @@
+"""
+Presence check benchmark: legacy SET + per-IMEI EXISTS scan vs. last-seen ZSET.
+
+Seeds one cell with N connected users (a share of them stale) in both layouts and times one
+UserPresenceChecker tick for each. Needs a running Redis; all keys live under a throwaway owner id
+and are deleted afterwards.
+
+    cd bts-service
+    python -m benchmarks.presence_index --host localhost --users 10000 100000
+"""
+
+import time
+import asyncio
+import argparse
+import statistics
+
+import redis.asyncio as redis
+
+from src.observers.redis_cache import AsyncUserRedisCache
+
+TTL = 9
+OWNER = "bench-presence"
+
+
+async def seed(client: redis.Redis, cache: AsyncUserRedisCache, users: int, stale_ratio: float) -> None:
+    await client.delete(cache._legacy_users_set_key, cache._presence_key)
+    now = time.time()
+    stale = int(users * stale_ratio)
+
+    pipe = client.pipeline(transaction=False)
+    for i in range(users):
+        imei = f"{i:015d}"
+        pipe.sadd(cache._legacy_users_set_key, imei)
+        pipe.zadd(cache._presence_key, {imei: now - (TTL * 2 if i < stale else 0)})
+        # Metadata hash only exists for users that are still present
+        if i >= stale:
+            pipe.hset(f"{cache._user_key_prefix}{imei}", mapping={"location_x": "0", "location_y": "0"})
+            pipe.expire(f"{cache._user_key_prefix}{imei}", TTL * 10)
+        if i % 5000 == 0:
+            await pipe.execute()
+    await pipe.execute()
+
+
+async def legacy_check(client: redis.Redis, cache: AsyncUserRedisCache) -> tuple[int, int]:
+    """What UserPresenceChecker did before the ZSET: SMEMBERS, one EXISTS per IMEI, SREM, SCARD."""
+    imeis = list(await client.smembers(cache._legacy_users_set_key))
+
+    pipe = client.pipeline(transaction=False)
+    for imei in imeis:
+        pipe.exists(f"{cache._user_key_prefix}{imei}")
+    stale = [imei for imei, exists in zip(imeis, await pipe.execute()) if not exists]
+
+    if stale:
+        pipe = client.pipeline(transaction=False)
+        for imei in stale:
+            pipe.srem(cache._legacy_users_set_key, imei)
+        await pipe.execute()
+
+    return len(stale), int(await client.scard(cache._legacy_users_set_key))
+
+
+async def timed(fn, repeat: int) -> list[float]:
+    durations = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await fn()
+        durations.append((time.perf_counter() - started_at) * 1000)
+    return durations
+
+
+async def run(client: redis.Redis, users: int, stale_ratio: float, repeat: int) -> None:
+    cache = AsyncUserRedisCache(redis_client=client, ttl=TTL, owner_bts_id=OWNER)
+
+    # First tick removes the stale users, later ticks are the steady state (nothing to remove)
+    await seed(client, cache, users, stale_ratio)
+    legacy_first = (await timed(lambda: legacy_check(client, cache), 1))[0]
+    legacy_steady = await timed(lambda: legacy_check(client, cache), repeat)
+
+    await seed(client, cache, users, stale_ratio)
+    zset_first = (await timed(cache.remove_stale, 1))[0]
+    zset_steady = await timed(cache.remove_stale, repeat)
+
+    print(
+        f"{users:>8} users | legacy first {legacy_first:9.2f} ms, steady p50 {statistics.median(legacy_steady):9.2f} ms"
+        f" | zset first {zset_first:7.2f} ms, steady p50 {statistics.median(zset_steady):7.2f} ms"
+        f" | speedup x{statistics.median(legacy_steady) / max(statistics.median(zset_steady), 1e-6):.0f}"
+    )
+
+
+async def cleanup(client: redis.Redis) -> None:
+    cache = AsyncUserRedisCache(redis_client=client, ttl=TTL, owner_bts_id=OWNER)
+    await client.delete(cache._legacy_users_set_key, cache._presence_key)
+    keys = [key async for key in client.scan_iter(match=f"{cache._user_key_prefix}*", count=10000)]
+    for i in range(0, len(keys), 10000):
+        await client.delete(*keys[i:i + 10000])
+
+
+async def bench(args) -> None:
+    client = redis.Redis(host=args.host, port=args.port, decode_responses=True)
+    try:
+        for users in args.users:
+            await run(client, users, args.stale_ratio, args.repeat)
+    finally:
+        await cleanup(client)
+        await client.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--users", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--stale-ratio", type=float, default=0.05, help="share of users that stopped sending keep-alives")
+    parser.add_argument("--repeat", type=int, default=10)
+    asyncio.run(bench(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
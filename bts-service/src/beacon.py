@@ -0,0 +1,67 @@
+import json
+import socket
+import struct
+from datetime import datetime
+
+# Beacon wire format, version 1 (network byte order). The first byte tells the formats apart:
+# a JSON beacon always starts with '{' (0x7B), a binary beacon with its version number.
+#
+#   offset  size  field
+#   0       1     version (1)
+#   1       8     timestamp, float64 unix seconds  <- the only field that changes per beacon
+#   9       8     location x, float64
+#   17      8     location y, float64
+#   25      4     connect ip, IPv4
+#   29      2     connect port, uint16
+#   31      1+n   bts_id, uint8 length + utf-8
+#   ..      1+n   lac, uint8 length + utf-8
+#   ..      1+n   connect path, uint8 length + utf-8 ('' for a single-cell BTS)
+#
+# The decoder lives in simulator/backend/comms/beacon.py; keep both in sync.
+
+BEACON_VERSION = 1
+BEACON_HEADER = struct.Struct("!BdddIH")
+TIMESTAMP_FIELD = struct.Struct("!d")
+TIMESTAMP_OFFSET = 1
+
+
+def _short_string(value: str) -> bytes:
+    encoded = str(value).encode("utf-8")
+    if len(encoded) > 255:
+        raise ValueError(f"Beacon field longer than 255 bytes: {value!r}")
+    return bytes([len(encoded)]) + encoded
+
+
+def encode_binary(*, bts_id, lac, x, y, ip, port, path="", timestamp=0.0) -> bytearray:
+    """Encode a version 1 binary beacon; patch the timestamp later with stamp_binary()."""
+    header = BEACON_HEADER.pack(
+        BEACON_VERSION, timestamp, float(x), float(y),
+        struct.unpack("!I", socket.inet_aton(ip))[0], int(port)
+    )
+    return bytearray(header + _short_string(bts_id) + _short_string(lac) + _short_string(path))
+
+
+def stamp_binary(message: bytearray, timestamp: float) -> bytearray:
+    """Write the timestamp into an encoded binary beacon in place."""
+    TIMESTAMP_FIELD.pack_into(message, TIMESTAMP_OFFSET, timestamp)
+    return message
+
+
+def encode_json(*, bts_id, lac, x, y, ip, port, path="", timestamp=None) -> bytes:
+    """Original JSON beacon, understood by receivers that predate the binary format."""
+    beacon = {
+        'time': (datetime.fromtimestamp(timestamp) if timestamp is not None else datetime.now()).isoformat(),
+        'bts_id': bts_id,
+        'lac': lac,
+        'bts_location': {
+            'x': x,
+            'y': y
+        },
+        'connect': {
+            'ip': ip,
+            'port': port
+        }
+    }
+    if path:
+        beacon['connect']['path'] = path
+    return json.dumps(beacon).encode('utf-8')
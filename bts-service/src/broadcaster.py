@@ -1,74 +1,102 @@
 import socket
-import json
 import time
 import os
 import logging
-from threading import Thread
-from datetime import datetime
+
+from .beacon import encode_binary, encode_json, stamp_binary
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class Broadcaster:
-    def __init__(self):
+    def __init__(
+        self,
+        *,
+        bts_id=None,
+        lac=None,
+        location_x=None,
+        location_y=None,
+        port=None,
+        path="",
+        host=None,
+        sock=None,
+        beacon_format=None,
+    ):
+        """
+        Sends UDP beacons of one BTS cell. Without arguments the cell is configured from the
+        environment (single-cell container); a multi-cell host passes each cell's values.
+
+        :param path: URL prefix of the cell's API on host:port ('' for a single-cell container)
+        :param host: address announced in the beacon, defaults to this host's address
+        :param sock: shared broadcast socket (multi-cell host); created and owned by this instance if None
+        :param beacon_format: 'binary' (compact, versioned) or 'json' (for receivers that predate the
+                              binary format), defaults to BEACON_FORMAT or 'binary'
+        """
         self.broadcast_address = '255.255.255.255'
         self.broadcast_port = 5000
-        self.bts_id = os.getenv('BTS_ID', 'BTS001')
-        self.lac = os.getenv('BTS_LAC', '1001')
-        self.location_x = float(os.getenv('BTS_LOCATION_X', 100))
-        self.location_y = float(os.getenv('BTS_LOCATION_Y', 100))
-        self.port = int(os.getenv('BTS_PORT', 8080))
+        self.bts_id = bts_id if bts_id is not None else os.getenv('BTS_ID', 'BTS001')
+        self.lac = lac if lac is not None else os.getenv('BTS_LAC', '1001')
+        self.location_x = float(location_x if location_x is not None else os.getenv('BTS_LOCATION_X', 100))
+        self.location_y = float(location_y if location_y is not None else os.getenv('BTS_LOCATION_Y', 100))
+        self.port = int(port if port is not None else os.getenv('BTS_PORT', 8080))
+        self.path = path
         self.broadcast_interval = 3
 
+        self.host = host if host is not None else self.resolve_host()
+
+        self._owns_sock = sock is None
+        if sock is None:
+            sock = self.create_socket()
+        self.sock = sock
+
+        self.beacon_format = beacon_format or os.getenv('BEACON_FORMAT', 'binary')
+        if self.beacon_format not in ('binary', 'json'):
+            raise ValueError(f"Unknown beacon format {self.beacon_format}")
+        self.encode()
+
+    @staticmethod
+    def resolve_host() -> str:
         interfaces = socket.getaddrinfo(
             host=socket.gethostname(), port=None, family=socket.AF_INET)
-        self.host = interfaces[0][-1][0]
-
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        self.running = False
+        return interfaces[0][-1][0]
 
-    def start(self):
-        """Start beacon broadcasting in a background thread."""
-        self.running = True
-        thread = Thread(target=self._broadcast_loop, daemon=True)
-        thread.start()
-        logger.info(f"Broadcaster started for {self.bts_id}")
+    @staticmethod
+    def create_socket() -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        # Beacons are sent from the event loop (PeriodicScheduler), so never block on the socket
+        sock.setblocking(False)
+        return sock
 
     def stop(self):
-        """Stop broadcasting."""
-        self.running = False
+        """Close the beacon socket (a shared socket is closed by its owner)."""
+        if not self._owns_sock:
+            return
         try:
             self.sock.close()
         except Exception:
             pass
 
-    def _broadcast_loop(self):
-        """Continuously send beacon messages."""
-        while self.running:
-            try:
-                x, y = self.location_x, self.location_y
-                beacon = {
-                    'time': datetime.now().isoformat(),
-                    'bts_id': self.bts_id,
-                    'lac': self.lac,
-                    'bts_location': {
-                        'x': x,
-                        'y': y
-                    },
-                    'connect': {
-                        'ip': self.host,
-                        'port': self.port
-                    }
-                }
-
-                message = json.dumps(beacon).encode('utf-8')
-                self.sock.sendto(
-                    message, (self.broadcast_address, self.broadcast_port))
-                logger.info(f"Beacon sent: {self.bts_id} @ ({x}, {y})")
+    def encode(self) -> None:
+        """
+        Pre-encode the beacon. Everything but the timestamp is fixed, so each tick only patches the
+        timestamp of the binary beacon in place; call again if the cell's location or address changes.
+        """
+        fields = dict(
+            bts_id=self.bts_id, lac=self.lac, x=self.location_x, y=self.location_y,
+            ip=self.host, port=self.port, path=self.path
+        )
+        self._fields = fields
+        self._message = encode_binary(**fields) if self.beacon_format == 'binary' else None
 
-            except Exception as e:
-                logger.error(f"Failed to send beacon: {e}")
+    async def broadcast(self):
+        """Send one beacon message."""
+        if self._message is not None:
+            message = stamp_binary(self._message, time.time())
+        else:
+            message = encode_json(**self._fields)
 
-            time.sleep(self.broadcast_interval)
+        self.sock.sendto(
+            message, (self.broadcast_address, self.broadcast_port))
+        logger.debug(f"Beacon sent: {self.bts_id} @ ({self.location_x}, {self.location_y})")
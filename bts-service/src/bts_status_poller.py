@@ -1,56 +1,127 @@
-import time
+import json
+import hashlib
 import logging
-import asyncio
-from threading import Thread
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class BtsStatusPoller:
-    def __init__(self, fetch_all_bts_info_async, observer, owner_bts_id, poll_interval=3):
+    def __init__(self, fetch_all_bts_info_async, observer, owner_bts_id, poll_interval=3, neighbour_table=None):
+        """
+        Polls Central Backend for all BTS and caches neighbour BTS information.
+        Scheduled by PeriodicScheduler, which calls poll() every poll_interval seconds.
+
+        Polling is conditional and incremental:
+          - the ETag of the last list is sent back as If-None-Match; an unchanged registry answers
+            304 and only the TTLs of the cached neighbours are refreshed (one pipeline)
+          - on a changed list, each neighbour is fingerprinted (content hash) and only new or changed
+            neighbours are written; neighbours missing from the list are removed from the cache
+
+        :param fetch_all_bts_info_async: async fn(etag: str|None) -> (list[dict] | {"data": list[dict]} | None, etag: str|None),
+                                         None result when Central answered 304 Not Modified
+        :param observer: asyncio cache (e.g., AsyncBtsInformationRedisCache) with async update_many(event, data_list),
+                         touch(ids) -> missing ids and remove(ids)
+        :param owner_bts_id: this BTS's id (skipped when caching neighbours)
+        :param poll_interval: seconds between polls
+        :param neighbour_table: optional in-process NeighbourTable refreshed with the whole list after each change
+                                and touched on 304 (its snapshot expires when Central stays unreachable)
+        """
         self.fetch_all_bts_info_async = fetch_all_bts_info_async
         self.observer = observer
+        self.neighbour_table = neighbour_table
         self.owner_bts_id = str(owner_bts_id)
         self.poll_interval = poll_interval
-        self.running = False
-
-    def start(self):
-        """Start polling in a background thread."""
-        self.running = True
-        thread = Thread(target=self._poll_loop, daemon=True)
-        thread.start()
-        logger.info("BtsStatusPoller started")
-
-    def stop(self):
-        """Stop polling."""
-        self.running = False
-
-    def _poll_loop(self):
-        """Continuously poll Central Backend and cache neighbour BTS information."""
-        while self.running:
-            try:
-                result = asyncio.run(self.fetch_all_bts_info_async())
-
-                # Accept either list[dict] or {"data": list[dict]}
-                if isinstance(result, dict):
-                    bts_list = result.get("data", [])
-                else:
-                    bts_list = result or []
-
-                for bts in bts_list:
-                    if not isinstance(bts, dict):
-                        continue
-                    if "btsId" not in bts:
-                        continue
-                    if str(bts.get("btsId")) == self.owner_bts_id:
-                        continue
-
-                    self.observer.update(event="bts_info_updated", data=bts)
-
-                logger.debug(f"BtsStatusPoller refreshed {len(bts_list)} BTS entries")
-
-            except Exception as e:
-                logger.error(f"BtsStatusPoller failed to refresh BTS status: {e}")
-
-            time.sleep(self.poll_interval)
+
+        self._etag = None
+        # neighbour bts_id -> fingerprint of the entry last written to the cache
+        self._fingerprints: dict[str, str] = {}
+
+        self._stats = {
+            "polls": 0,
+            "not_modified": 0,
+            "written": 0,
+            "unchanged": 0,
+            "removed": 0,
+            "resynced": 0,
+        }
+
+    @staticmethod
+    def fingerprint(bts: dict) -> str:
+        """Content hash of one registry entry; any field change (not only updatedAt) changes it."""
+        encoded = json.dumps(bts, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def reset(self):
+        """Forget the ETag and fingerprints, so the next poll rewrites every neighbour."""
+        self._etag = None
+        self._fingerprints = {}
+
+    async def poll(self):
+        """Poll Central Backend once and cache changed neighbour BTS information."""
+        self._stats["polls"] += 1
+        result, etag = await self.fetch_all_bts_info_async(self._etag)
+
+        if result is None:
+            self._stats["not_modified"] += 1
+            await self._touch(self._fingerprints.keys())
+            if self.neighbour_table is not None:
+                self.neighbour_table.touch()
+            logger.debug("BtsStatusPoller: BTS registry not modified")
+            return
+
+        # Accept either list[dict] or {"data": list[dict]}
+        if isinstance(result, dict):
+            bts_list = result.get("data", [])
+        else:
+            bts_list = result or []
+
+        fingerprints = {}
+        changed = []
+        for bts in bts_list:
+            if not isinstance(bts, dict):
+                continue
+            if "btsId" not in bts:
+                continue
+            bts_id = str(bts.get("btsId"))
+            if bts_id == self.owner_bts_id:
+                continue
+
+            fingerprints[bts_id] = self.fingerprint(bts)
+            if self._fingerprints.get(bts_id) != fingerprints[bts_id]:
+                changed.append(bts)
+
+        removed = [bts_id for bts_id in self._fingerprints if bts_id not in fingerprints]
+        unchanged = [bts_id for bts_id, fp in fingerprints.items() if self._fingerprints.get(bts_id) == fp]
+
+        if changed and not await self.observer.update_many(event="bts_info_updated", data_list=changed):
+            # Keep the old fingerprints and ETag, so the next poll fetches and writes the changes again
+            raise RuntimeError(f"failed to cache {len(changed)} changed neighbours")
+        if removed:
+            await self.observer.remove(removed)
+
+        self._fingerprints = fingerprints
+        self._etag = etag
+        await self._touch(unchanged)
+
+        if self.neighbour_table is not None:
+            self.neighbour_table.refresh(bts_list)
+
+        self._stats["written"] += len(changed)
+        self._stats["unchanged"] += len(unchanged)
+        self._stats["removed"] += len(removed)
+        logger.debug(
+            f"BtsStatusPoller refreshed {len(bts_list)} BTS entries "
+            f"(written={len(changed)}, unchanged={len(unchanged)}, removed={len(removed)})"
+        )
+
+    async def _touch(self, bts_ids):
+        """Keep unchanged neighbours alive; if any of them vanished from Redis, resync on the next poll."""
+        missing = await self.observer.touch(list(bts_ids))
+        if missing:
+            self._stats["resynced"] += 1
+            logger.info(f"BtsStatusPoller: {len(missing)} cached neighbours missing, forcing a full refresh")
+            self.reset()
+
+    def stats(self) -> dict:
+        return {**self._stats, "etag": self._etag, "neighbours": len(self._fingerprints)}
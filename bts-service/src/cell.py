@@ -0,0 +1,728 @@
+import csv
+import json
+import time
+import inspect
+import logging
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import Awaitable, Callable, Optional
+
+from fastapi import HTTPException
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from . import metrics
+from .metrics import phase
+from .broadcaster import Broadcaster
+from .bts_status_poller import BtsStatusPoller
+from .bts_status_sender import BtsStatusSender
+from .central_client import CentralBackendClient
+from .handover_scorer import HandoverScorer
+from .handover_sweeper import HandoverSweeper
+from .neighbour_table import NeighbourTable
+from .user_presence_checker import UserPresenceChecker
+from .models import (
+    UserLocation,
+    ConnectRequest,
+    ConnectResponse,
+    KeepAliveRequest,
+    KeepAliveResponse,
+    BatchResponse,
+    CONNECT_BATCH_ADAPTER,
+    KEEPALIVE_BATCH_ADAPTER,
+)
+from .observers.redis_cache import (
+    AsyncUserRedisCache,
+    AsyncBtsInformationRedisCache,
+    AsyncBtsStatusRedisCache,
+)
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CellConfig:
+    """Radio and capacity settings of one BTS cell."""
+    bts_id: str
+    lac: str = "1001"
+    location_x: float = 100.0
+    location_y: float = 100.0
+    bts_range: float = 150.0
+    max_capacity: int = 100
+    mcc: str = "219"  # Croatia
+    mnc: str = "01"
+    neighbour_radius: float = 500.0
+    overload_threshold: float = 0.8
+
+    # Registry style (camelCase) names accepted in cell definition files
+    ALIASES = {
+        "btsId": "bts_id",
+        "locationX": "location_x",
+        "locationY": "location_y",
+        "range": "bts_range",
+        "maxCapacity": "max_capacity",
+        "neighbourRadius": "neighbour_radius",
+        "overloadThreshold": "overload_threshold",
+    }
+
+    @classmethod
+    def from_dict(cls, data: dict, defaults: Optional[dict] = None) -> "CellConfig":
+        """Build a cell from one definition; keys missing from data are taken from defaults."""
+        types = {f.name: f.type for f in fields(cls)}
+        values = {key: value for key, value in (defaults or {}).items() if key in types}
+        for key, value in data.items():
+            key = cls.ALIASES.get(key, key)
+            if key in types and value not in (None, ""):
+                values[key] = value
+        if not values.get("bts_id"):
+            raise ValueError(f"Cell definition without bts_id: {data}")
+
+        # CSV values are strings, JSON numbers may be int or str
+        return cls(**{key: types[key](value) for key, value in values.items()})
+
+
+def load_cell_configs(path: str, defaults: Optional[dict] = None) -> list[CellConfig]:
+    """
+    Load cell definitions from a JSON file (a list of objects) or a CSV file (one cell per row,
+    header with CellConfig field names or their registry aliases).
+    """
+    with open(path, newline="") as f:
+        if path.endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = json.load(f)
+
+    cells = [CellConfig.from_dict(row, defaults) for row in rows]
+    ids = [cell.bts_id for cell in cells]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate bts_id in {path}")
+    return cells
+
+
+@dataclass(frozen=True)
+class CellTimings:
+    """Job intervals and cache TTLs (seconds), shared by all cells of a process."""
+    keep_alive_interval: int = 3
+    status_sender_interval: int = 5
+    presence_checker_interval: int = 4
+    neighbour_poll_interval: int = 5
+    handover_sweep_interval: int = 10
+    batch_max_size: int = 500
+
+    @property
+    def user_ttl(self) -> int:
+        return self.keep_alive_interval * 3
+
+    @property
+    def neighbour_ttl(self) -> int:
+        return self.neighbour_poll_interval * 3
+
+    @property
+    def status_ttl(self) -> int:
+        return self.status_sender_interval * 3
+
+
+def validate_batch(adapter: TypeAdapter, model: type[BaseModel], items: list) -> tuple[list, list]:
+    """
+    Validate a batch of raw items.
+
+    The whole list is validated in one call; only when that fails are items validated one by one
+    to find out which of them are invalid. Returns (models, errors) aligned with items,
+    where exactly one of models[i] / errors[i] is None.
+    """
+    try:
+        return adapter.validate_python(items), [None] * len(items)
+    except ValidationError:
+        pass
+
+    models, errors = [], []
+    for item in items:
+        try:
+            models.append(model.model_validate(item))
+            errors.append(None)
+        except ValidationError as e:
+            models.append(None)
+            errors.append("; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc']) or 'body'}: {err['msg']}" for err in e.errors()
+            ))
+    return models, errors
+
+
+def batch_item(index: int, status: str, data: dict) -> dict:
+    return {"index": index, "status": status, "data": data}
+
+
+def calculate_distance(x1: float, y1: float, x2: float, y2: float) -> float:
+    """Calculate Euclidean distance between two points"""
+    return ((x2 - x1) ** 2 + (y2 - y1) ** 2) ** 0.5
+
+
+def calculate_signal_strength(distance: float, bts_range: float) -> float:
+    """Calculate signal strength based on distance and BTS range"""
+    if distance >= bts_range:
+        return 0.0
+    return (1 - (distance / bts_range) ** 2)
+
+
+class BtsCell:
+    """
+    One BTS cell: its caches, neighbour table, periodic job components and request handling.
+
+    All state lives on the instance, so one process can serve any number of cells. Resources that
+    are not per cell (Redis client, Central Backend client, write-behind buffer, removal delivery)
+    are passed in and shared. The cell schedules nothing itself; its owner (single-cell main or the
+    multi-cell host) schedules the tick methods of the components.
+    """
+
+    def __init__(
+        self,
+        config: CellConfig,
+        *,
+        redis_client,
+        central: CentralBackendClient,
+        submit_removal: Callable[[str, str, float], bool],
+        cancel_removals: Optional[Callable[[str, float], int]] = None,
+        timings: CellTimings = CellTimings(),
+        write_behind=None,
+        fetch_all_bts_info_async: Optional[Callable[[Optional[str]], Awaitable]] = None,
+        broadcaster: Optional[Broadcaster] = None,
+    ):
+        """
+        :param config: the cell's radio and capacity settings
+        :param redis_client: shared redis.asyncio client
+        :param central: shared Central Backend client
+        :param submit_removal: fn(previous_bts_id, imei, connected_at) -> bool, queues removal of a user from its
+                               previous cell after its connect here at connected_at (unix time)
+        :param cancel_removals: fn(imei, connected_at), drops removals this cell still has queued for a user that
+                                connected to another cell at connected_at
+        :param timings: job intervals, cache TTLs and batch size limit
+        :param write_behind: optional shared UserEventWriteBehind for keep-alive events
+        :param fetch_all_bts_info_async: registry fetch for the neighbour poller, defaults to a direct
+                                         conditional GET (a multi-cell host passes one shared fetch)
+        :param broadcaster: beacon sender of this cell (created from config if None)
+        """
+        self.config = config
+        self.bts_id = config.bts_id
+        self.central = central
+        self.submit_removal = submit_removal
+        self.cancel_removals = cancel_removals
+        self.timings = timings
+        self.write_behind = write_behind
+
+        self.user_cache = AsyncUserRedisCache(redis_client=redis_client, ttl=timings.user_ttl, owner_bts_id=self.bts_id)
+        self.bts_information_cache = AsyncBtsInformationRedisCache(
+            redis_client=redis_client, ttl=timings.neighbour_ttl, owner_bts_id=self.bts_id
+        )
+        self.bts_status_cache = AsyncBtsStatusRedisCache(redis_client=redis_client, ttl=timings.status_ttl, owner_bts_id=self.bts_id)
+        self.observers = [self.user_cache]
+
+        # In-process neighbour snapshot used by should_handover (refreshed by the poller)
+        self.neighbour_table = NeighbourTable(
+            owner_bts_id=self.bts_id,
+            owner_x=config.location_x,
+            owner_y=config.location_y,
+            neighbour_radius=config.neighbour_radius,
+            overload_threshold=config.overload_threshold,
+            ttl=timings.neighbour_ttl,
+        )
+
+        # Vectorised handover scoring of users against the neighbour snapshot
+        self.handover_scorer = HandoverScorer(
+            bts_range=config.bts_range,
+            owner_x=config.location_x,
+            owner_y=config.location_y,
+            overload_threshold=config.overload_threshold,
+        )
+
+        self.broadcaster = broadcaster or Broadcaster(
+            bts_id=self.bts_id, lac=config.lac, location_x=config.location_x, location_y=config.location_y
+        )
+
+        self.bts_status_sender = BtsStatusSender(
+            send_bts_status_to_central_backend_async=central.send_bts_status,
+            cache=self.bts_status_cache,
+            owner_bts_id=self.bts_id,
+            send_interval=timings.status_sender_interval
+        )
+
+        self.neighbour_bts_status_poller = BtsStatusPoller(
+            fetch_all_bts_info_async=fetch_all_bts_info_async or central.get_all_bts_information,
+            observer=self.bts_information_cache,
+            owner_bts_id=self.bts_id,
+            poll_interval=timings.neighbour_poll_interval,
+            neighbour_table=self.neighbour_table
+        )
+
+        self.user_presence_checker = UserPresenceChecker(
+            user_cache=self.user_cache,
+            bts_status_cache=self.bts_status_cache,
+            owner_bts_id=self.bts_id,
+            capacity=config.max_capacity,
+            overload_threshold=config.overload_threshold,
+            check_interval=timings.presence_checker_interval
+        )
+
+        self.handover_sweeper = HandoverSweeper(
+            user_cache=self.user_cache,
+            neighbour_table=self.neighbour_table,
+            scorer=self.handover_scorer,
+            owner_bts_id=self.bts_id,
+            sweep_interval=timings.handover_sweep_interval
+        )
+
+    # -------------------------------------------------------------------------------------------------
+    # Lifecycle
+    # -------------------------------------------------------------------------------------------------
+
+    def registration(self) -> dict:
+        """Initial BTS information sent to Central Backend"""
+        return {
+            "btsId": self.bts_id,
+            "mcc": self.config.mcc,
+            "mnc": self.config.mnc,
+            "lac": self.config.lac,
+            "locationX": self.config.location_x,
+            "locationY": self.config.location_y,
+            "status": "active",
+            "maxCapacity": self.config.max_capacity,
+            "currentLoad": 0
+        }
+
+    async def start(self) -> None:
+        """Prepare caches and register the cell with Central Backend."""
+        # Move connected users from the pre-ZSET presence layout (no-op once migrated)
+        await self.user_cache.migrate_legacy_users_set()
+
+        # Warm the neighbour table from what is already cached in Redis (e.g. after a restart)
+        self.neighbour_table.refresh(await self.bts_information_cache.get_all())
+
+        # Send initial BTS information to Central Backend
+        await self.central.send_bts_information(self.registration())
+        logger.info(f"Initial BTS information of {self.bts_id} sent to Central Backend")
+
+        # Cache initial BTS status
+        await self.bts_status_cache.set_status(self.bts_id, "active", self.config.max_capacity, 0)
+
+    def stop(self) -> None:
+        self.broadcaster.stop()
+
+    # -------------------------------------------------------------------------------------------------
+    # Helpers
+    # -------------------------------------------------------------------------------------------------
+
+    async def notify_observers(self, event: str, data: dict):
+        """Notify all observers of an event (observers may be sync or asyncio)"""
+        for observer in self.observers:
+            result = observer.update(event=event, data=data)
+            if inspect.isawaitable(result):
+                await result
+
+    async def notify_observers_many(self, event: str, data_list: list[dict]):
+        """Notify all observers of a batch of events (uses update_many where an observer supports it)"""
+        if not data_list:
+            return
+        for observer in self.observers:
+            if hasattr(observer, "update_many"):
+                result = observer.update_many(event=event, data_list=data_list)
+                if inspect.isawaitable(result):
+                    await result
+                continue
+            for data in data_list:
+                result = observer.update(event=event, data=data)
+                if inspect.isawaitable(result):
+                    await result
+
+    def build_user_information(self, request) -> dict:
+        """User event payload for Central Backend"""
+        return {
+            "imei": request.imei,
+            "mcc": self.config.mcc,
+            "mnc": self.config.mnc,
+            "lac": self.config.lac,
+            "btsId": self.bts_id,
+            "timestamp": datetime.now().isoformat(),
+            "userLocation": {
+                "x": request.user_location.x,
+                "y": request.user_location.y
+            }
+        }
+
+    def build_observer_data(self, request) -> dict:
+        """User event payload for observers (Redis cache)"""
+        return {
+            "imei": request.imei,
+            "location": {
+                "x": request.user_location.x,
+                "y": request.user_location.y
+            },
+            "bts_id": self.bts_id,
+            "timestamp": request.timestamp
+        }
+
+    def is_user_out_of_range(self, user_location: UserLocation) -> bool:
+        return calculate_distance(
+            self.config.location_x, self.config.location_y,
+            user_location.x, user_location.y
+        ) > self.config.bts_range
+
+    def out_of_range_response_data(self) -> dict:
+        return {
+            "bts_id": self.bts_id,
+            "action": "disconnect",
+            "target_bts_id": None,
+            "message": "User out of range"
+        }
+
+    def check_batch_size(self, items: list) -> None:
+        if not items:
+            raise HTTPException(status_code=400, detail="Batch must contain at least one event")
+        if len(items) > self.timings.batch_max_size:
+            raise HTTPException(
+                status_code=413, detail=f"Batch size {len(items)} exceeds limit of {self.timings.batch_max_size}"
+            )
+
+    def batch_response(self, results: list[dict]) -> BatchResponse:
+        failed = sum(1 for r in results if r["status"] != "success")
+        return BatchResponse(status="success", data={
+            "bts_id": self.bts_id,
+            "processed": len(results),
+            "failed": failed,
+            "results": results
+        })
+
+    def should_handover_many(self, user_locations: list[UserLocation]) -> list[tuple[bool, Optional[str]]]:
+        """
+        Evaluate handover for many users at once against the in-memory neighbour snapshot (no I/O).
+        Neighbours are already filtered to the neighbour radius and flagged if overloaded;
+        the strongest eligible neighbour wins if its signal beats the serving BTS.
+        """
+        if not user_locations:
+            return []
+
+        snapshot = self.neighbour_table.snapshot()
+        if not snapshot.known_count:
+            # TODO No valid BTS found for handover --> should we disconnect user?
+            return [(True, None)] * len(user_locations)
+
+        # In real life, user would report its signal strength for neighbor BTS
+        # Here we are simulating that from the distance between the user and each BTS
+        scores = self.handover_scorer.score(
+            [(location.x, location.y) for location in user_locations],
+            snapshot.matrix
+        )
+        return [(True, target) if target else (False, None) for target in scores.targets]
+
+    def should_handover(self, user_location: UserLocation) -> tuple[bool, Optional[str]]:
+        return self.should_handover_many([user_location])[0]
+
+    async def send_keepalive_batch_to_central_backend(self, user_informations: list[dict]) -> list[dict]:
+        """
+        Forward keep-alive events to Central Backend. In write-behind mode events are queued and
+        answered as accepted; only events that do not fit in the buffer are sent synchronously.
+        """
+        if not self.write_behind:
+            return await self.central.send_user_batch(user_informations)
+
+        responses: list[Optional[dict]] = [None] * len(user_informations)
+        overflow = []
+        for index, user_information in enumerate(user_informations):
+            if await self.write_behind.submit(user_information["imei"], user_information):
+                responses[index] = {"status": "success", "data": None}
+            else:
+                overflow.append(index)
+
+        if overflow:
+            overflow_responses = await self.central.send_user_batch([user_informations[i] for i in overflow])
+            for index, response in zip(overflow, overflow_responses):
+                responses[index] = response
+
+        return responses
+
+    # -------------------------------------------------------------------------------------------------
+    # Requests
+    # -------------------------------------------------------------------------------------------------
+
+    async def connect(self, request: ConnectRequest) -> ConnectResponse:
+        metrics.observe_validation()
+        logger.info(f"User {request.imei} connecting to {self.bts_id}")
+
+        # Check for handover need
+        # needs_handover, target_bts = self.should_handover(request.user_location)
+
+        if self.is_user_out_of_range(request.user_location):
+            logger.warning(f"User {request.imei} is out of range for BTS {self.bts_id}")
+            return ConnectResponse(status="error", data=self.out_of_range_response_data())
+
+        # Prepare data for Central Backend
+        connected_at = time.time()
+        user_information = self.build_user_information(request)
+
+        # A pending write-behind keep-alive would reach Central after this connect, drop it
+        if self.write_behind:
+            self.write_behind.discard(request.imei, connected_at)
+
+        # Send to Central Backend with HMAC signature
+        with phase("central"):
+            central_response = await self.central.send_user_information(user_information)
+        previous_bts_id = central_response["data"]["previousLocation"]["btsId"]
+
+        # Delivered in the background, the UE does not wait on the previous cell
+        if previous_bts_id and previous_bts_id != self.bts_id:
+            self.submit_removal(previous_bts_id, request.imei, connected_at)
+
+        with phase("redis_write"):
+            await self.notify_observers(event="user_connected", data=self.build_observer_data(request))
+
+        # Build response
+        response_data = {
+            "bts_id": self.bts_id,
+            # "action": "handover" if needs_handover else None,
+            "action": None,
+            # "target_bts_id": target_bts if needs_handover else None,
+            "target_bts_id": None,
+            "message": "Connected successfully"
+        }
+
+        # if needs_handover:
+        #     logger.warning(f"Handover suggested for {request.imei} to BTS {target_bts}")
+
+        return ConnectResponse(status="success", data=response_data)
+
+    async def keepalive(self, request: KeepAliveRequest) -> KeepAliveResponse:
+        metrics.observe_validation()
+        logger.info(f"User {request.imei} sending keep-alive to {self.bts_id}")
+
+        if self.is_user_out_of_range(request.user_location):
+            logger.warning(f"User {request.imei} is out of range for BTS {self.bts_id}")
+            return KeepAliveResponse(status="failure", data=self.out_of_range_response_data())
+
+        # Check for handover need
+        with phase("should_handover"):
+            needs_handover, target_bts = self.should_handover(request.user_location)
+
+        # Prepare data for Central Backend
+        user_information = self.build_user_information(request)
+
+        # Send to Central Backend; in write-behind mode queue it and reply without waiting on Central,
+        # falling back to a synchronous send when the buffer is full
+        with phase("central"):
+            if not (self.write_behind and await self.write_behind.submit(request.imei, user_information)):
+                await self.central.send_user_information(user_information)
+
+        with phase("redis_write"):
+            await self.notify_observers(event="user_keepalive", data=self.build_observer_data(request))
+
+        # Build response
+        response_data = {
+            "bts_id": self.bts_id,
+            "action": "handover" if needs_handover else None,
+            "target_bts_id": target_bts if needs_handover else None,
+            "message": "Keep-alive successful"
+        }
+
+        if needs_handover:
+            logger.warning(f"Handover suggested for {request.imei}")
+
+        return KeepAliveResponse(status="success", data=response_data)
+
+    async def connect_batch(self, payload: list[dict]) -> BatchResponse:
+        """
+        Connect many users in one request.
+        Events are validated in bulk, sent to Central Backend in one call and cached in one Redis pipeline.
+        Returns one result per event (same shape as /connect), in request order.
+        """
+        self.check_batch_size(payload)
+        logger.info(f"Batch of {len(payload)} connect events for {self.bts_id}")
+
+        with phase("validation"):
+            requests, errors = validate_batch(CONNECT_BATCH_ADAPTER, ConnectRequest, payload)
+        results: list[Optional[dict]] = [None] * len(payload)
+        accepted = []
+
+        for index, (request, error) in enumerate(zip(requests, errors)):
+            if error:
+                results[index] = batch_item(index, "error", {"bts_id": self.bts_id, "message": error})
+            elif self.is_user_out_of_range(request.user_location):
+                results[index] = batch_item(index, "error", self.out_of_range_response_data())
+            else:
+                accepted.append((index, request))
+
+        if accepted:
+            connected_at = time.time()
+            if self.write_behind:
+                for _, request in accepted:
+                    self.write_behind.discard(request.imei, connected_at)
+
+            with phase("central"):
+                central_responses = await self.central.send_user_batch(
+                    [self.build_user_information(request) for _, request in accepted]
+                )
+
+            connected = []
+            for (index, request), central_response in zip(accepted, central_responses):
+                if not central_response or central_response.get("status") != "success":
+                    results[index] = batch_item(index, "error", {
+                        "bts_id": self.bts_id, "message": "Central Backend rejected event"
+                    })
+                    continue
+
+                previous_location = (central_response.get("data") or {}).get("previousLocation") or {}
+                previous_bts_id = previous_location.get("btsId")
+                if previous_bts_id and previous_bts_id != self.bts_id:
+                    self.submit_removal(previous_bts_id, request.imei, connected_at)
+
+                connected.append(self.build_observer_data(request))
+                results[index] = batch_item(index, "success", {
+                    "bts_id": self.bts_id,
+                    "action": None,
+                    "target_bts_id": None,
+                    "message": "Connected successfully"
+                })
+
+            with phase("redis_write"):
+                await self.notify_observers_many(event="user_connected", data_list=connected)
+
+        return self.batch_response(results)
+
+    async def keepalive_batch(self, payload: list[dict]) -> BatchResponse:
+        """
+        Keep-alive for many users in one request.
+        Events are validated in bulk, sent to Central Backend in one call and cached in one Redis pipeline.
+        Returns one result per event (same shape as /keepalive), in request order.
+        """
+        self.check_batch_size(payload)
+        logger.info(f"Batch of {len(payload)} keep-alive events for {self.bts_id}")
+
+        with phase("validation"):
+            requests, errors = validate_batch(KEEPALIVE_BATCH_ADAPTER, KeepAliveRequest, payload)
+        results: list[Optional[dict]] = [None] * len(payload)
+        accepted = []
+
+        for index, (request, error) in enumerate(zip(requests, errors)):
+            if error:
+                results[index] = batch_item(index, "error", {"bts_id": self.bts_id, "message": error})
+            elif self.is_user_out_of_range(request.user_location):
+                results[index] = batch_item(index, "failure", self.out_of_range_response_data())
+            else:
+                accepted.append((index, request))
+
+        if accepted:
+            with phase("central"):
+                central_responses = await self.send_keepalive_batch_to_central_backend(
+                    [self.build_user_information(request) for _, request in accepted]
+                )
+
+            with phase("should_handover"):
+                handover_decisions = self.should_handover_many([request.user_location for _, request in accepted])
+
+            alive = []
+            for (index, request), central_response, (needs_handover, target_bts) in zip(
+                accepted, central_responses, handover_decisions
+            ):
+                if not central_response or central_response.get("status") != "success":
+                    results[index] = batch_item(index, "error", {
+                        "bts_id": self.bts_id, "message": "Central Backend rejected event"
+                    })
+                    continue
+
+                alive.append(self.build_observer_data(request))
+                results[index] = batch_item(index, "success", {
+                    "bts_id": self.bts_id,
+                    "action": "handover" if needs_handover else None,
+                    "target_bts_id": target_bts if needs_handover else None,
+                    "message": "Keep-alive successful"
+                })
+
+            with phase("redis_write"):
+                await self.notify_observers_many(event="user_keepalive", data_list=alive)
+
+        return self.batch_response(results)
+
+    async def remove_user(self, imei: str, connected_at: Optional[float] = None) -> dict:
+        """Remove a user that connected to another BTS at connected_at (unix time, default now)."""
+        logger.info(f"Removing user {imei} from BTS {self.bts_id}")
+
+        if await self.apply_removals({imei: self.removal_time(connected_at)}):
+            logger.info(f"User {imei} removed from the list of connected users in {self.bts_id}")
+        else:
+            logger.info(f"User {imei} not found in the list of connected users in {self.bts_id}")
+            return {"status": "success", "message": f"User {imei} not found in {self.bts_id}"}
+
+        return {"status": "success", "message": f"User {imei} removed from {self.bts_id}"}
+
+    async def remove_users(self, imeis: list, connected_at: Optional[dict] = None) -> dict:
+        """Batch variant of remove_user(); connected_at maps an IMEI to its connect time elsewhere."""
+        if len(imeis) > self.timings.batch_max_size:
+            raise HTTPException(
+                status_code=413, detail=f"Batch size {len(imeis)} exceeds limit of {self.timings.batch_max_size}"
+            )
+
+        if connected_at is None:
+            connected_at = {}
+        elif not isinstance(connected_at, dict):
+            raise HTTPException(status_code=422, detail="connected_at must map IMEIs to unix timestamps")
+
+        removed = await self.apply_removals(
+            {str(imei): self.removal_time(connected_at.get(str(imei))) for imei in imeis}
+        )
+        logger.info(f"Removed {removed}/{len(imeis)} users from BTS {self.bts_id}")
+        return {"status": "success", "data": {"bts_id": self.bts_id, "requested": len(imeis), "removed": removed}}
+
+    @staticmethod
+    def removal_time(value) -> Optional[float]:
+        """connected_at of a removal request: unix time, or None if the sender did not send one."""
+        if value is None:
+            return None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise HTTPException(status_code=422, detail=f"connected_at must be a unix timestamp, got {value!r}")
+        return float(value)
+
+    async def apply_removals(self, removals: dict[str, Optional[float]]) -> int:
+        """
+        Remove users that connected to another BTS: imei -> unix time of that connect (None = now).
+        A user seen here after its connect elsewhere (it flapped back) is kept. Returns how many were removed.
+        """
+        now = time.time()
+        removals = {imei: now if connected_at is None else connected_at for imei, connected_at in removals.items()}
+
+        for imei, connected_at in removals.items():
+            # A keep-alive still queued here would reach Central after that connect
+            if self.write_behind:
+                self.write_behind.discard(imei, connected_at)
+            # Removals this cell still has queued for an older connect of the user are stale now
+            if self.cancel_removals:
+                self.cancel_removals(imei, connected_at)
+
+        return await self.user_cache.remove_connected_imeis(removals)
+
+    # -------------------------------------------------------------------------------------------------
+    # Introspection
+    # -------------------------------------------------------------------------------------------------
+
+    def handover_candidates(self) -> dict:
+        return {
+            "bts_id": self.bts_id,
+            "sweep": self.handover_sweeper.last_sweep,
+            "candidates": self.handover_sweeper.candidates
+        }
+
+    def info(self) -> dict:
+        return {
+            "service": f"BTS Service - {self.bts_id}",
+            "lac": self.config.lac,
+            "location": {"x": self.config.location_x, "y": self.config.location_y}
+        }
+
+    def stats(self) -> dict:
+        snapshot = self.neighbour_table.snapshot()
+        return {
+            "bts_id": self.bts_id,
+            "connected_users": self.user_presence_checker.last_load,
+            "neighbour_poller": self.neighbour_bts_status_poller.stats(),
+            "neighbour_table": {
+                "neighbours": len(snapshot),
+                "known_bts": snapshot.known_count,
+                "refreshed_at": snapshot.refreshed_at,
+                "expired": self.neighbour_table.is_expired(snapshot)
+            }
+        }
@@ -0,0 +1,120 @@
+import hmac
+import json
+import hashlib
+import logging
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from fastapi import HTTPException
+
+from .http_client import HttpClientPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def generate_hmac_signature(secret: str, body: str, timestamp: str) -> str:
+    """Generate HMAC-SHA256 signature for request"""
+    message = body + timestamp  # Match Java backend
+    signature = hmac.new(
+        secret.encode('utf-8'),
+        message.encode('utf-8'),
+        hashlib.sha256
+    ).digest()
+    return signature.hex()
+
+
+class CentralBackendClient:
+    """
+    Signed requests to Central Backend over a shared HttpClientPool.
+
+    Holds no per-BTS state, so one instance serves every cell of a process.
+    X-Timestamp sprječava replay attacks - stare zahtjeve ne mogu biti ponovno poslani
+    """
+
+    def __init__(self, *, http_client: HttpClientPool, base_url: str, hmac_secret: str):
+        """
+        :param http_client: shared keep-alive HTTP client pool
+        :param base_url: Central Backend base URL, e.g. http://central-backend:8080
+        :param hmac_secret: shared HMAC secret
+        """
+        self.http_client = http_client
+        self.base_url = base_url.rstrip("/")
+        self.hmac_secret = hmac_secret
+
+    def _signed(self, data) -> tuple[bytes, dict]:
+        """Serialize data and build the HMAC headers for it."""
+        # Generate timestamp (ISO 8601 format)
+        timestamp = datetime.now().isoformat()
+
+        # Serialize body to JSON string (consistent formatting)
+        body_str = json.dumps(data, separators=(',', ':'), sort_keys=True)
+
+        headers = {
+            "X-HMAC-Signature": generate_hmac_signature(self.hmac_secret, body_str, timestamp),
+            "X-Timestamp": timestamp,
+            "Content-Type": "application/json"
+        }
+        return body_str.encode('utf-8'), headers
+
+    async def send_user_information(self, data: dict) -> dict:
+        """Send user event to Central Backend with HMAC signature"""
+        content, headers = self._signed(data)
+        try:
+            response = await self.http_client.post(f"{self.base_url}/api/v1/user", content=content, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to send data to Central: {e}")
+            raise HTTPException(status_code=502, detail="Central Backend unreachable")
+
+    async def send_user_batch(self, data_list: list[dict]) -> list[dict]:
+        """
+        Send a batch of user events to Central Backend in one signed request.
+        Returns one response per event, in the same order.
+        """
+        content, headers = self._signed(data_list)
+        try:
+            response = await self.http_client.post(f"{self.base_url}/api/v1/user/batch", content=content, headers=headers)
+            response.raise_for_status()
+            return response.json()
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to send batch of {len(data_list)} user events to Central: {e}")
+            raise HTTPException(status_code=502, detail="Central Backend unreachable")
+
+    async def send_bts_information(self, data: dict) -> dict:
+        """Register BTS information with Central Backend (409 = already registered)"""
+        content, headers = self._signed(data)
+        response = await self.http_client.post(f"{self.base_url}/api/v1/bts", content=content, headers=headers)
+
+        if response.status_code == 409:
+            logger.info(f"BTS {data.get('btsId')} already registered (409). Continuing.")
+            return response.json() if response.content else {"status": "conflict"}
+
+        response.raise_for_status()
+        return response.json()
+
+    async def send_bts_status(self, bts_id: str, data: dict) -> dict:
+        """Send BTS status to Central Backend with HMAC signature"""
+        content, headers = self._signed(data)
+        response = await self.http_client.patch(f"{self.base_url}/api/v1/bts/{bts_id}/status", content=content, headers=headers)
+        response.raise_for_status()
+        return response.json()
+
+    async def get_all_bts_information(self, etag: Optional[str] = None) -> tuple[Optional[list], Optional[str]]:
+        """
+        Conditional GET of the BTS registry.
+        Returns (bts_list, etag); bts_list is None when Central answered 304 Not Modified for the given etag.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+
+        try:
+            response = await self.http_client.get(f"{self.base_url}/api/v1/bts", headers=headers)
+            if response.status_code == 304:
+                return None, etag
+            response.raise_for_status()
+            return response.json(), response.headers.get("ETag")
+        except httpx.HTTPError as e:
+            logger.error(f"Failed to get data from Central: {e}")
+            raise HTTPException(status_code=502, detail="Central Backend unreachable")
@@ -0,0 +1,86 @@
+"""
+Configuration from environment variables, shared by the single-cell app (main.py) and the multi-cell host (host.py)
+"""
+
+import os
+
+from .cell import CellTimings
+
+
+BTS_ID = os.getenv("BTS_ID", "bts-1")
+BTS_LAC = os.getenv("BTS_LAC", "1001")
+BTS_RANGE = int(os.getenv("BTS_RANGE", "150"))
+BTS_LOCATION_X = float(os.getenv("BTS_LOCATION_X", "100"))
+BTS_LOCATION_Y = float(os.getenv("BTS_LOCATION_Y", "100"))
+CENTRAL_API_URL = os.getenv("CENTRAL_API_URL", "http://localhost:8080")
+REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
+REDIS_PORT = int(os.getenv("REDIS_PORT", "6379"))
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+MCC = os.getenv("MCC", "219")  # Croatia
+MNC = os.getenv("MNC", "01")
+HMAC_SECRET = os.getenv("HMAC_SECRET_KEY", "your_shared_secret_key_here")
+BTS_MAX_USER_CAPACITY = int(os.getenv("BTS_MAX_USER_CAPACITY", "100"))
+POLL_FOR_NEIGHBOUR_BTS_INFO_INTERVAL = int(os.getenv("POLL_FOR_NEIGHBOUR_BTS_INFO_INTERVAL", "5"))
+BTS_NEIGHBOR_RADIUS = int(os.getenv("BTS_NEIGHBOR_RADIUS", "500"))
+BTS_OVERLOAD_THRESHOLD = float(os.getenv("BTS_OVERLOAD_THRESHOLD", "0.8"))
+# BTS_HANGOVER_DISTANCE_THRESHOLD = int(os.getenv("HANGOVER_DISTANCE_THRESHOLD", "150"))
+
+USER_KEEP_ALIVE_INTERVAL = int(os.getenv("USER_KEEP_ALIVE_INTERVAL", "3")) # seconds
+STATUS_SENDER_INTERVAL = int(os.getenv("STATUS_SENDER_INTERVAL", "5")) # seconds
+USER_PRESENCE_CHECKER_INTERVAL = int(os.getenv("USER_PRESENCE_CHECKER_INTERVAL", "4")) # seconds
+HANDOVER_SWEEP_INTERVAL = int(os.getenv("HANDOVER_SWEEP_INTERVAL", "10")) # seconds
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1")) # fraction of each job's interval
+
+# Central Backend HTTP client pool
+CENTRAL_HTTP_MAX_CONNECTIONS = int(os.getenv("CENTRAL_HTTP_MAX_CONNECTIONS", "100"))
+CENTRAL_HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("CENTRAL_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+CENTRAL_HTTP_KEEPALIVE_EXPIRY = float(os.getenv("CENTRAL_HTTP_KEEPALIVE_EXPIRY", "30")) # seconds
+CENTRAL_HTTP_TIMEOUT = float(os.getenv("CENTRAL_HTTP_TIMEOUT", "5.0")) # seconds
+CENTRAL_HTTP_CONNECT_TIMEOUT = float(os.getenv("CENTRAL_HTTP_CONNECT_TIMEOUT", "2.0")) # seconds
+CENTRAL_HTTP2 = os.getenv("CENTRAL_HTTP2", "false").lower() in ("1", "true", "yes")
+
+# Removal notifications to the previous BTS of a user (background, per-neighbour connections)
+NEIGHBOUR_BTS_URL_TEMPLATE = os.getenv("NEIGHBOUR_BTS_URL_TEMPLATE", "http://{bts_id}:8080")
+REMOVAL_MAX_PENDING = int(os.getenv("REMOVAL_MAX_PENDING", "10000"))
+REMOVAL_BATCH_SIZE = int(os.getenv("REMOVAL_BATCH_SIZE", "100"))
+REMOVAL_MAX_ATTEMPTS = int(os.getenv("REMOVAL_MAX_ATTEMPTS", "5"))
+REMOVAL_BASE_BACKOFF = float(os.getenv("REMOVAL_BASE_BACKOFF", "0.5")) # seconds
+REMOVAL_MAX_BACKOFF = float(os.getenv("REMOVAL_MAX_BACKOFF", "10")) # seconds
+REMOVAL_TIMEOUT = float(os.getenv("REMOVAL_TIMEOUT", "2.0")) # seconds
+
+# Batch endpoints
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "500"))
+
+# Write-behind of keep-alive events to Central Backend (opt-in)
+CENTRAL_WRITE_BEHIND = os.getenv("CENTRAL_WRITE_BEHIND", "false").lower() in ("1", "true", "yes")
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "10000"))
+WRITE_BEHIND_BATCH_SIZE = int(os.getenv("WRITE_BEHIND_BATCH_SIZE", "200"))
+WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv("WRITE_BEHIND_FLUSH_INTERVAL", "0.5")) # seconds
+WRITE_BEHIND_SUBMIT_TIMEOUT = float(os.getenv("WRITE_BEHIND_SUBMIT_TIMEOUT", "1.0")) # seconds
+WRITE_BEHIND_MAX_ATTEMPTS = int(os.getenv("WRITE_BEHIND_MAX_ATTEMPTS", "3")) # sends of an event Central rejects
+
+# Multi-cell host (host.py): cell definitions, and defaults for fields a definition leaves out
+BTS_CELLS_FILE = os.getenv("BTS_CELLS_FILE", "cells.json")
+BTS_HOST_ID = os.getenv("BTS_HOST_ID", "bts-host")
+BTS_PORT = int(os.getenv("BTS_PORT", "8080"))
+HOST_JOB_CONCURRENCY = int(os.getenv("HOST_JOB_CONCURRENCY", "32")) # cells ticked at once by one job
+LOCAL_REMOVAL_INTERVAL = float(os.getenv("LOCAL_REMOVAL_INTERVAL", "0.5")) # seconds
+CELL_DEFAULTS = {
+    "lac": BTS_LAC,
+    "bts_range": BTS_RANGE,
+    "max_capacity": BTS_MAX_USER_CAPACITY,
+    "mcc": MCC,
+    "mnc": MNC,
+    "neighbour_radius": BTS_NEIGHBOR_RADIUS,
+    "overload_threshold": BTS_OVERLOAD_THRESHOLD,
+}
+
+# Job intervals, cache TTLs (3x the refresh interval) and batch size limit of the cell
+CELL_TIMINGS = CellTimings(
+    keep_alive_interval=USER_KEEP_ALIVE_INTERVAL,
+    status_sender_interval=STATUS_SENDER_INTERVAL,
+    presence_checker_interval=USER_PRESENCE_CHECKER_INTERVAL,
+    neighbour_poll_interval=POLL_FOR_NEIGHBOUR_BTS_INFO_INTERVAL,
+    handover_sweep_interval=HANDOVER_SWEEP_INTERVAL,
+    batch_max_size=BATCH_MAX_SIZE,
+)
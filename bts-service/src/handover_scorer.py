@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class NeighbourMatrix:
+    """Column-wise view of the neighbour BTS used for scoring."""
+    ids: tuple[str, ...]
+    positions: np.ndarray    # (N, 2) float64, x/y of every neighbour
+    load_ratios: np.ndarray  # (N,) float64, current_load / max_capacity
+    eligible: np.ndarray     # (N,) bool, False for neighbours that must not receive users
+
+    @classmethod
+    def empty(cls) -> "NeighbourMatrix":
+        return cls(
+            ids=(),
+            positions=np.empty((0, 2), dtype=np.float64),
+            load_ratios=np.empty(0, dtype=np.float64),
+            eligible=np.empty(0, dtype=bool),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass(frozen=True)
+class HandoverScores:
+    """Scoring result for M users, aligned with the input positions."""
+    serving_strength: np.ndarray  # (M,) signal strength at the serving (owner) BTS
+    best_strength: np.ndarray     # (M,) strongest eligible neighbour signal, -inf when there is none
+    best_index: np.ndarray        # (M,) index into NeighbourMatrix.ids, -1 when there is none
+    needs_handover: np.ndarray    # (M,) bool, a neighbour is strictly stronger than the serving BTS
+    targets: list[Optional[str]]  # (M,) neighbour id for users that need a handover, else None
+
+
+class HandoverScorer:
+    """
+    Vectorised handover scoring of many users against all neighbours in one call.
+
+    Signal strength follows calculate_signal_strength(): 1 - (d / range)^2 inside the range, 0 outside.
+    A user should be handed over to the eligible neighbour with the strongest signal if it is strictly
+    stronger than the serving BTS; ties go to the first neighbour, as in the scalar loop.
+    """
+
+    def __init__(self, *, bts_range: float, owner_x: float, owner_y: float, overload_threshold: float = 0.8):
+        self.bts_range = float(bts_range)
+        self.owner_position = np.array([float(owner_x), float(owner_y)], dtype=np.float64)
+        self.overload_threshold = float(overload_threshold)
+
+    def signal_strength(self, distances: np.ndarray) -> np.ndarray:
+        if self.bts_range <= 0:
+            return np.zeros_like(distances)
+        return np.where(distances < self.bts_range, 1.0 - (distances / self.bts_range) ** 2, 0.0)
+
+    @staticmethod
+    def as_positions(points: Sequence) -> np.ndarray:
+        """Accept an (M, 2) array or a sequence of (x, y) pairs."""
+        positions = np.asarray(points, dtype=np.float64)
+        return positions.reshape(-1, 2)
+
+    def score(self, user_positions, matrix: NeighbourMatrix, eligible: Optional[np.ndarray] = None) -> HandoverScores:
+        """
+        :param user_positions: (M, 2) user x/y
+        :param matrix: neighbour matrix (positions, load ratios, eligibility mask)
+        :param eligible: optional mask overriding matrix.eligible; when both are absent the mask is
+                         derived from load ratios and overload_threshold
+        """
+        users = self.as_positions(user_positions)
+        user_count = users.shape[0]
+
+        serving_distance = np.hypot(users[:, 0] - self.owner_position[0], users[:, 1] - self.owner_position[1])
+        serving_strength = self.signal_strength(serving_distance)
+
+        if user_count == 0 or len(matrix) == 0:
+            return HandoverScores(
+                serving_strength=serving_strength,
+                best_strength=np.full(user_count, -np.inf),
+                best_index=np.full(user_count, -1, dtype=np.intp),
+                needs_handover=np.zeros(user_count, dtype=bool),
+                targets=[None] * user_count,
+            )
+
+        if eligible is None:
+            eligible = matrix.eligible if matrix.eligible is not None else matrix.load_ratios < self.overload_threshold
+
+        # (M, N) distances and strengths of every user to every neighbour
+        dx = users[:, 0:1] - matrix.positions[:, 0]
+        dy = users[:, 1:2] - matrix.positions[:, 1]
+        strengths = self.signal_strength(np.hypot(dx, dy))
+        strengths[:, ~eligible] = -np.inf
+
+        best_index = np.argmax(strengths, axis=1)
+        best_strength = strengths[np.arange(user_count), best_index]
+        needs_handover = best_strength > serving_strength
+        best_index = np.where(np.isfinite(best_strength), best_index, -1)
+
+        ids = matrix.ids
+        targets = [ids[i] if handover else None for i, handover in zip(best_index.tolist(), needs_handover.tolist())]
+
+        return HandoverScores(
+            serving_strength=serving_strength,
+            best_strength=best_strength,
+            best_index=best_index,
+            needs_handover=needs_handover,
+            targets=targets,
+        )
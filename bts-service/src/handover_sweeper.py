@@ -0,0 +1,51 @@
+import time
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HandoverSweeper:
+    """
+    Periodically re-evaluates handover for every user connected to this BTS in one vectorised call.
+
+    Reads the last known location of all connected users from Redis (one pipeline), scores them
+    against the current neighbour snapshot with HandoverScorer and publishes the users that
+    would be better served by a neighbour as `candidates` ({imei: target_bts_id}).
+    Scheduled by PeriodicScheduler, which calls sweep() every sweep_interval seconds.
+    """
+
+    def __init__(self, *, user_cache, neighbour_table, scorer, owner_bts_id: str, sweep_interval: int = 10):
+        self.user_cache = user_cache
+        self.neighbour_table = neighbour_table
+        self.scorer = scorer
+        self.owner_bts_id = str(owner_bts_id)
+        self.sweep_interval = sweep_interval
+        self.candidates: dict[str, str] = {}
+        self.last_sweep = {"users": 0, "candidates": 0, "duration_ms": 0.0, "at": 0.0}
+
+    async def sweep(self) -> dict[str, str]:
+        """Score all connected users once and publish the handover candidates."""
+        started_at = time.perf_counter()
+
+        locations = await self.user_cache.get_locations(await self.user_cache.get_connected_imeis())
+        snapshot = self.neighbour_table.snapshot()
+
+        candidates = {}
+        if locations and len(snapshot.matrix):
+            imeis = list(locations.keys())
+            scores = self.scorer.score(list(locations.values()), snapshot.matrix)
+            candidates = {imei: target for imei, target in zip(imeis, scores.targets) if target}
+
+        self.candidates = candidates
+        self.last_sweep = {
+            "users": len(locations),
+            "candidates": len(candidates),
+            "duration_ms": round((time.perf_counter() - started_at) * 1000, 3),
+            "at": time.time(),
+        }
+        logger.debug(
+            f"HandoverSweeper: users={self.last_sweep['users']} candidates={len(candidates)} "
+            f"in {self.last_sweep['duration_ms']}ms"
+        )
+        return candidates
@@ -0,0 +1,447 @@
+"""
+BTS Service - multi-cell host
+
+Serves many BTS cells from one process. Cells are loaded from BTS_CELLS_FILE (JSON list or CSV) and
+share one Redis pool, one Central Backend client, one write-behind buffer and one removal dispatcher.
+A cell is addressed by path (/cells/{bts_id}/api/v1/...) or by Host header ({bts_id}.anything:port/api/v1/...).
+
+Run with: uvicorn src.host:app --host 0.0.0.0 --port 8080
+"""
+
+from fastapi import FastAPI, HTTPException, Body, Response
+from typing import Awaitable, Callable, Optional
+import redis.asyncio as redis_asyncio
+import asyncio
+import logging
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from . import metrics
+from .metrics import InstrumentedRedis, TimedRoute
+from .broadcaster import Broadcaster
+from .cell import BtsCell, CellConfig, CellTimings, load_cell_configs
+from .central_client import CentralBackendClient
+from .http_client import HttpClientPool
+from .write_behind import UserEventWriteBehind
+from .scheduler import PeriodicScheduler
+from .removal_dispatcher import RemovalDispatcher
+from .models import ConnectRequest, ConnectResponse, KeepAliveRequest, KeepAliveResponse, BatchResponse
+from .config import (
+    BTS_CELLS_FILE, BTS_HOST_ID, BTS_PORT, CELL_DEFAULTS, HOST_JOB_CONCURRENCY, LOCAL_REMOVAL_INTERVAL,
+    CENTRAL_API_URL, HMAC_SECRET, REDIS_HOST, REDIS_PORT, REDIS_MAX_CONNECTIONS,
+    STATUS_SENDER_INTERVAL, POLL_FOR_NEIGHBOUR_BTS_INFO_INTERVAL, USER_PRESENCE_CHECKER_INTERVAL,
+    HANDOVER_SWEEP_INTERVAL, SCHEDULER_JITTER, CELL_TIMINGS, BATCH_MAX_SIZE,
+    CENTRAL_HTTP_MAX_CONNECTIONS, CENTRAL_HTTP_MAX_KEEPALIVE_CONNECTIONS, CENTRAL_HTTP_KEEPALIVE_EXPIRY,
+    CENTRAL_HTTP_TIMEOUT, CENTRAL_HTTP_CONNECT_TIMEOUT, CENTRAL_HTTP2,
+    NEIGHBOUR_BTS_URL_TEMPLATE, REMOVAL_MAX_PENDING, REMOVAL_BATCH_SIZE, REMOVAL_MAX_ATTEMPTS,
+    REMOVAL_BASE_BACKOFF, REMOVAL_MAX_BACKOFF, REMOVAL_TIMEOUT,
+    CENTRAL_WRITE_BEHIND, WRITE_BEHIND_MAX_PENDING, WRITE_BEHIND_BATCH_SIZE,
+    WRITE_BEHIND_FLUSH_INTERVAL, WRITE_BEHIND_SUBMIT_TIMEOUT, WRITE_BEHIND_MAX_ATTEMPTS,
+)
+
+
+# -----------------------------------------------------------------------------------------------------
+# Multi-Cell Host
+# -----------------------------------------------------------------------------------------------------
+
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SharedBtsRegistry:
+    """
+    One conditional GET of the BTS registry per poll tick, shared by the neighbour pollers of all cells.
+
+    refresh() talks to Central Backend; fetch(etag) has the signature of a poller's registry fetch and
+    only serves the last refreshed list, answering "not modified" to a poller that already has it.
+    """
+
+    def __init__(self, fetch_all_bts_info_async: Callable[[Optional[str]], Awaitable]):
+        self.fetch_all_bts_info_async = fetch_all_bts_info_async
+        self._bts_list: list = []
+        self._etag: Optional[str] = None
+
+    async def refresh(self) -> None:
+        result, etag = await self.fetch_all_bts_info_async(self._etag)
+        if result is not None:
+            self._bts_list, self._etag = result, etag
+
+    async def fetch(self, etag: Optional[str] = None) -> tuple[Optional[list], Optional[str]]:
+        if self._etag is not None and etag == self._etag:
+            return None, etag
+        return self._bts_list, self._etag
+
+
+class MultiCellHost:
+    """
+    The cells served by this process and the batched background jobs that drive them.
+
+    Each job type is one scheduler job for all cells (not one job per cell), which ticks the cells with
+    bounded concurrency. Removals of users between two local cells never leave the process: they are
+    collected per cell and applied in one pipeline per cell by the local_removals job.
+    """
+
+    def __init__(
+        self,
+        configs: list[CellConfig],
+        *,
+        redis_client,
+        central: CentralBackendClient,
+        removal_dispatcher: RemovalDispatcher,
+        timings: CellTimings,
+        write_behind=None,
+        concurrency: int = 32,
+        beacon_port: int = 8080,
+    ):
+        """
+        :param configs: cell definitions
+        :param redis_client: shared redis.asyncio client
+        :param central: shared Central Backend client
+        :param removal_dispatcher: delivers removals to cells that are not served by this process
+        :param timings: job intervals, cache TTLs and batch size limit of every cell
+        :param write_behind: optional shared keep-alive write-behind buffer
+        :param concurrency: cells ticked at once by one job (keep below the Redis pool size)
+        :param beacon_port: port announced in the beacons of the cells
+        """
+        self.central = central
+        self.removal_dispatcher = removal_dispatcher
+        self.concurrency = int(concurrency)
+        self.registry = SharedBtsRegistry(central.get_all_bts_information)
+
+        # All cells announce this process's address and send their beacons through one socket
+        beacon_host = Broadcaster.resolve_host()
+        self._beacon_sock = Broadcaster.create_socket()
+        self._local_removals: dict[str, dict[str, float]] = {}  # bts_id -> imei -> connected_at
+        self._job_failures: dict[str, int] = {}
+
+        self.cells: dict[str, BtsCell] = {}
+        for config in configs:
+            self.cells[config.bts_id] = BtsCell(
+                config,
+                redis_client=redis_client,
+                central=central,
+                submit_removal=self.submit_removal,
+                cancel_removals=self.removal_dispatcher.cancel,
+                timings=timings,
+                write_behind=write_behind,
+                fetch_all_bts_info_async=self.registry.fetch,
+                broadcaster=Broadcaster(
+                    bts_id=config.bts_id,
+                    lac=config.lac,
+                    location_x=config.location_x,
+                    location_y=config.location_y,
+                    port=beacon_port,
+                    path=f"/cells/{config.bts_id}",
+                    host=beacon_host,
+                    sock=self._beacon_sock,
+                ),
+            )
+
+    def get(self, bts_id: str) -> BtsCell:
+        cell = self.cells.get(bts_id)
+        if cell is None:
+            raise HTTPException(status_code=404, detail=f"Cell {bts_id} not served by {BTS_HOST_ID}")
+        return cell
+
+    def submit_removal(self, bts_id: str, imei: str, connected_at: float) -> bool:
+        """Remove imei from its previous cell: in-process for a local cell, else via the dispatcher."""
+        if bts_id in self.cells:
+            removals = self._local_removals.setdefault(bts_id, {})
+            removals[imei] = max(connected_at, removals.get(imei, connected_at))
+            return True
+        return self.removal_dispatcher.submit(bts_id, imei, connected_at)
+
+    async def flush_local_removals(self) -> None:
+        pending, self._local_removals = self._local_removals, {}
+        for bts_id, removals in pending.items():
+            cell = self.cells.get(bts_id)
+            if cell is not None:
+                await cell.apply_removals(removals)
+
+    async def run_all(self, job: str, tick: Callable[[BtsCell], Awaitable]) -> None:
+        """Tick every cell with bounded concurrency; one failing cell does not stop the others."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def run(cell: BtsCell):
+            async with semaphore:
+                await tick(cell)
+
+        cells = list(self.cells.values())
+        results = await asyncio.gather(*[run(cell) for cell in cells], return_exceptions=True)
+        failed = [(cell.bts_id, result) for cell, result in zip(cells, results) if isinstance(result, Exception)]
+        if failed:
+            self._job_failures[job] = self._job_failures.get(job, 0) + len(failed)
+            bts_id, error = failed[0]
+            raise RuntimeError(f"{len(failed)}/{len(cells)} cells failed, first {bts_id}: {error}")
+
+    async def poll_neighbours(self) -> None:
+        await self.registry.refresh()
+        await self.run_all("neighbour_bts_status_poller", lambda cell: cell.neighbour_bts_status_poller.poll())
+
+    def add_jobs(self, scheduler: PeriodicScheduler, jitter: float = 0.0) -> None:
+        """Schedule one batched job per component type."""
+        scheduler.add_job(
+            "broadcaster", lambda: self.run_all("broadcaster", lambda cell: cell.broadcaster.broadcast()),
+            min(cell.broadcaster.broadcast_interval for cell in self.cells.values()) if self.cells else 3, jitter=jitter
+        )
+        scheduler.add_job(
+            "bts_status_sender", lambda: self.run_all("bts_status_sender", lambda cell: cell.bts_status_sender.send()),
+            STATUS_SENDER_INTERVAL, jitter=jitter
+        )
+        scheduler.add_job("neighbour_bts_status_poller", self.poll_neighbours, POLL_FOR_NEIGHBOUR_BTS_INFO_INTERVAL, jitter=jitter)
+        scheduler.add_job(
+            "user_presence_checker", lambda: self.run_all("user_presence_checker", lambda cell: cell.user_presence_checker.check()),
+            USER_PRESENCE_CHECKER_INTERVAL, jitter=jitter
+        )
+        scheduler.add_job(
+            "handover_sweeper", lambda: self.run_all("handover_sweeper", lambda cell: cell.handover_sweeper.sweep()),
+            HANDOVER_SWEEP_INTERVAL, jitter=jitter
+        )
+        scheduler.add_job("local_removals", self.flush_local_removals, LOCAL_REMOVAL_INTERVAL)
+
+    async def start(self) -> None:
+        """Fetch the registry once and start (migrate, warm, register) all cells."""
+        for bts_id, cell in self.cells.items():
+            metrics.track_connected_users(bts_id, lambda cell=cell: cell.user_presence_checker.last_load)
+        try:
+            await self.registry.refresh()
+        except Exception as e:
+            logger.warning(f"Initial BTS registry fetch failed: {e}")
+        await self.run_all("start", lambda cell: cell.start())
+        logger.info(f"{BTS_HOST_ID} serving {len(self.cells)} cells")
+
+    async def remove_cell(self, bts_id: str) -> None:
+        """Stop serving one cell (its beacons stop, its Redis keys expire by TTL)."""
+        cell = self.cells.pop(bts_id, None)
+        if cell is None:
+            return
+        cell.stop()
+        self._local_removals.pop(bts_id, None)
+        metrics.untrack_connected_users(bts_id)
+
+    def stop(self) -> None:
+        for cell in self.cells.values():
+            cell.stop()
+        try:
+            self._beacon_sock.close()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "cells": len(self.cells),
+            "concurrency": self.concurrency,
+            "local_removals_pending": sum(len(removals) for removals in self._local_removals.values()),
+            "cell_failures": dict(self._job_failures),
+        }
+
+
+class CellHostRouting:
+    """
+    ASGI middleware routing by Host header: a request to {bts_id}[.domain][:port]/api/v1/... for a
+    served cell is handled as /cells/{bts_id}/api/v1/.... Requests already addressed by path pass through.
+    """
+
+    def __init__(self, app, host: MultiCellHost):
+        self.app = app
+        self.host = host
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith("/cells/"):
+            for name, value in scope.get("headers", ()):
+                if name == b"host":
+                    label = value.decode("latin-1").split(":", 1)[0].split(".", 1)[0]
+                    if label in self.host.cells:
+                        prefix = f"/cells/{label}"
+                        scope = dict(scope, path=prefix + scope["path"], raw_path=prefix.encode() + scope.get("raw_path", b""))
+                    break
+        await self.app(scope, receive, send)
+
+
+# -----------------------------------------------------------------------------------------------------
+# Global Variables
+# -----------------------------------------------------------------------------------------------------
+
+
+# Initialize FastAPI app
+app = FastAPI(title=f"BTS Service - {BTS_HOST_ID}")
+
+# Per-cell request metrics are labelled with the {bts_id} path parameter, host-wide ones with BTS_HOST_ID
+app.router.route_class = TimedRoute
+metrics.configure(BTS_HOST_ID)
+
+scheduler = PeriodicScheduler(on_job_complete=metrics.observe_job)
+
+# One Redis pool and one Central Backend client pool for all cells
+async_redis_pool = redis_asyncio.ConnectionPool(
+    host=REDIS_HOST, port=REDIS_PORT, decode_responses=True, max_connections=REDIS_MAX_CONNECTIONS
+)
+async_redis_client = InstrumentedRedis(connection_pool=async_redis_pool)
+
+central_http_client = HttpClientPool(
+    max_connections=CENTRAL_HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections=CENTRAL_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=CENTRAL_HTTP_KEEPALIVE_EXPIRY,
+    timeout=CENTRAL_HTTP_TIMEOUT,
+    connect_timeout=CENTRAL_HTTP_CONNECT_TIMEOUT,
+    http2=CENTRAL_HTTP2,
+)
+central = CentralBackendClient(http_client=central_http_client, base_url=CENTRAL_API_URL, hmac_secret=HMAC_SECRET)
+
+# Removals addressed to cells of other processes
+removal_dispatcher = RemovalDispatcher(
+    url_template=NEIGHBOUR_BTS_URL_TEMPLATE,
+    max_pending=REMOVAL_MAX_PENDING,
+    batch_size=min(REMOVAL_BATCH_SIZE, BATCH_MAX_SIZE),
+    max_attempts=REMOVAL_MAX_ATTEMPTS,
+    base_backoff=REMOVAL_BASE_BACKOFF,
+    max_backoff=REMOVAL_MAX_BACKOFF,
+    timeout=REMOVAL_TIMEOUT,
+    on_send_complete=metrics.observe_removal_send,
+)
+
+user_event_write_behind = UserEventWriteBehind(
+    send_batch_async=central.send_user_batch,
+    max_pending=WRITE_BEHIND_MAX_PENDING,
+    batch_size=min(WRITE_BEHIND_BATCH_SIZE, BATCH_MAX_SIZE),
+    flush_interval=WRITE_BEHIND_FLUSH_INTERVAL,
+    submit_timeout=WRITE_BEHIND_SUBMIT_TIMEOUT,
+    max_attempts=WRITE_BEHIND_MAX_ATTEMPTS
+) if CENTRAL_WRITE_BEHIND else None
+
+cell_host = MultiCellHost(
+    load_cell_configs(BTS_CELLS_FILE, CELL_DEFAULTS),
+    redis_client=async_redis_client,
+    central=central,
+    removal_dispatcher=removal_dispatcher,
+    timings=CELL_TIMINGS,
+    write_behind=user_event_write_behind,
+    concurrency=HOST_JOB_CONCURRENCY,
+    beacon_port=BTS_PORT,
+)
+
+app.add_middleware(CellHostRouting, host=cell_host)
+
+
+# -----------------------------------------------------------------------------------------------------
+# Application Events
+# -----------------------------------------------------------------------------------------------------
+
+
+@app.on_event("startup")
+async def startup_event():
+    logger.info(f"Starting {BTS_HOST_ID} with {len(cell_host.cells)} cells from {BTS_CELLS_FILE}")
+    await central_http_client.start()
+    if user_event_write_behind:
+        await user_event_write_behind.start()
+    await removal_dispatcher.start()
+
+    await cell_host.start()
+
+    cell_host.add_jobs(scheduler, jitter=SCHEDULER_JITTER)
+    await scheduler.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    logger.info(f"Shutting down {BTS_HOST_ID}")
+    await scheduler.stop()
+    await cell_host.flush_local_removals()
+    cell_host.stop()
+    if user_event_write_behind:
+        await user_event_write_behind.stop()
+    await removal_dispatcher.stop()
+    await central_http_client.close()
+    await async_redis_client.aclose()
+
+
+# -----------------------------------------------------------------------------------------------------
+# API Endpoints
+# -----------------------------------------------------------------------------------------------------
+
+
+@app.post("/cells/{bts_id}/api/v1/connect", response_model=ConnectResponse)
+async def connect_user(bts_id: str, request: ConnectRequest):
+    return await cell_host.get(bts_id).connect(request)
+
+@app.post("/cells/{bts_id}/api/v1/keepalive", response_model=KeepAliveResponse)
+async def keepalive_user(bts_id: str, request: KeepAliveRequest):
+    return await cell_host.get(bts_id).keepalive(request)
+
+@app.post("/cells/{bts_id}/api/v1/connect/batch", response_model=BatchResponse)
+async def connect_users_batch(bts_id: str, payload: list[dict] = Body(...)):
+    return await cell_host.get(bts_id).connect_batch(payload)
+
+@app.post("/cells/{bts_id}/api/v1/keepalive/batch", response_model=BatchResponse)
+async def keepalive_users_batch(bts_id: str, payload: list[dict] = Body(...)):
+    return await cell_host.get(bts_id).keepalive_batch(payload)
+
+@app.get("/cells/{bts_id}/api/v1/handover/candidates")
+async def handover_candidates(bts_id: str):
+    return cell_host.get(bts_id).handover_candidates()
+
+@app.post("/cells/{bts_id}/api/v1/user/remove")
+async def remove_user(bts_id: str, payload: dict):
+    imei = payload.get("imei")
+    if not imei:
+        return {"status": "error", "message": "IMEI not provided"}
+    return await cell_host.get(bts_id).remove_user(imei, payload.get("connected_at"))
+
+@app.post("/cells/{bts_id}/api/v1/user/remove/batch")
+async def remove_users_batch(bts_id: str, payload: dict):
+    imeis = payload.get("imeis")
+    if not isinstance(imeis, list) or not imeis:
+        return {"status": "error", "message": "IMEIs not provided"}
+    return await cell_host.get(bts_id).remove_users(imeis, payload.get("connected_at"))
+
+@app.post("/cells/{bts_id}/api/v1/shutdown")
+async def shutdown_cell(bts_id: str, payload: dict):
+    """Shut down one cell; the host and its other cells keep running"""
+    cell_host.get(bts_id)
+    logger.warning(
+        f"Shutdown requested for {bts_id} by {payload.get('requestedBy', 'central-backend')}. "
+        f"Reason: {payload.get('reason', 'requested')}"
+    )
+    await cell_host.remove_cell(bts_id)
+    return {"status": "success", "message": f"{bts_id} shutting down"}
+
+@app.get("/cells/{bts_id}/api/v1/stats")
+async def cell_stats(bts_id: str):
+    return cell_host.get(bts_id).stats()
+
+@app.get("/cells/{bts_id}/")
+async def cell_root(bts_id: str):
+    return cell_host.get(bts_id).info()
+
+@app.get("/cells")
+async def list_cells():
+    return {
+        "host": BTS_HOST_ID,
+        "cells": [
+            {"bts_id": bts_id, "location": {"x": cell.config.location_x, "y": cell.config.location_y}}
+            for bts_id, cell in cell_host.cells.items()
+        ]
+    }
+
+@app.get("/health")
+async def health_check():
+    return {
+        "status": "healthy",
+        "host": BTS_HOST_ID,
+        "cells": len(cell_host.cells),
+        "redis": "connected" if await async_redis_client.ping() else "disconnected"
+    }
+
+@app.get("/api/v1/stats")
+async def stats():
+    """Runtime statistics of the shared resources"""
+    return {
+        "host": BTS_HOST_ID,
+        **cell_host.stats(),
+        "central_http_pool": central_http_client.stats(),
+        "write_behind": user_event_write_behind.stats() if user_event_write_behind else None,
+        "scheduler": scheduler.stats(),
+        "removal_dispatcher": removal_dispatcher.stats(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(content=generate_latest(), headers={"Content-Type": CONTENT_TYPE_LATEST})
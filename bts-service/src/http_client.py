@@ -0,0 +1,149 @@
+import time
+import logging
+from typing import Optional
+
+import httpx
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class HttpClientPool:
+    """
+    App-scoped, long-lived httpx.AsyncClient with keep-alive connection pooling.
+
+    One instance is created in the startup event and shared by the request handlers and the
+    background jobs, so calls reuse already open connections instead of doing a new TCP
+    handshake per request. Must be started and closed from the event loop that uses it.
+    """
+
+    def __init__(
+        self,
+        *,
+        base_url: str = "",
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 5.0,
+        connect_timeout: float = 2.0,
+        http2: bool = False,
+    ):
+        self.base_url = base_url
+        self.max_connections = int(max_connections)
+        self.max_keepalive_connections = int(max_keepalive_connections)
+        self.keepalive_expiry = float(keepalive_expiry)
+        self.timeout = float(timeout)
+        self.connect_timeout = float(connect_timeout)
+        self.http2 = bool(http2)
+
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # Utilisation counters
+        self._in_flight = 0
+        self._peak_in_flight = 0
+        self._requests_total = 0
+        self._errors_total = 0
+        self._request_seconds_total = 0.0
+
+    @property
+    def is_started(self) -> bool:
+        return self._client is not None and not self._client.is_closed
+
+    async def start(self) -> None:
+        """Create the underlying client. Safe to call more than once."""
+        if self.is_started:
+            return
+
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+        try:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url, limits=limits, timeout=timeout, http2=self.http2
+            )
+        except ImportError:
+            # http2=True needs the optional 'h2' package
+            logger.warning("HTTP/2 requested but 'h2' is not installed, falling back to HTTP/1.1")
+            self.http2 = False
+            self._client = httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=timeout)
+
+        logger.info(
+            f"HttpClientPool started (base_url={self.base_url or '-'}, http2={self.http2}, "
+            f"max_connections={self.max_connections}, max_keepalive={self.max_keepalive_connections})"
+        )
+
+    async def close(self) -> None:
+        """Close all pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info(f"HttpClientPool closed (base_url={self.base_url or '-'})")
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        if not self.is_started:
+            raise RuntimeError("HttpClientPool is not started")
+
+        self._in_flight += 1
+        self._peak_in_flight = max(self._peak_in_flight, self._in_flight)
+        started_at = time.perf_counter()
+        try:
+            return await self._client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self._errors_total += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._requests_total += 1
+            self._request_seconds_total += time.perf_counter() - started_at
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def patch(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("PATCH", url, **kwargs)
+
+    def _connection_counts(self) -> dict:
+        """
+        Best-effort look at the underlying httpcore pool. httpx does not expose pool state
+        publicly, so this degrades to zeros if the internals change.
+        """
+        counts = {"open": 0, "idle": 0, "active": 0}
+        if self._client is None:
+            return counts
+
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        for connection in getattr(pool, "connections", None) or []:
+            try:
+                counts["open"] += 1
+                if connection.is_idle():
+                    counts["idle"] += 1
+                else:
+                    counts["active"] += 1
+            except Exception:
+                continue
+        return counts
+
+    def stats(self) -> dict:
+        """Pool configuration and utilisation snapshot."""
+        avg_ms = (self._request_seconds_total / self._requests_total * 1000) if self._requests_total else 0.0
+        return {
+            "base_url": self.base_url,
+            "started": self.is_started,
+            "http2": self.http2,
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "connections": self._connection_counts(),
+            "in_flight": self._in_flight,
+            "peak_in_flight": self._peak_in_flight,
+            "utilisation": round(self._in_flight / self.max_connections, 4) if self.max_connections else 0.0,
+            "requests_total": self._requests_total,
+            "errors_total": self._errors_total,
+            "avg_request_ms": round(avg_ms, 3),
+        }
@@ -0,0 +1,189 @@
+import time
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import redis.asyncio as redis_asyncio
+from redis.asyncio.client import Pipeline
+from fastapi import Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.routing import APIRoute
+from prometheus_client import Counter, Gauge, Histogram
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# Buckets from 0.5 ms to 10 s: the hot path is mostly sub-millisecond Redis work plus one Central call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROUND_TRIP_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+REQUEST_DURATION = Histogram(
+    "bts_request_duration_seconds", "End-to-end request handling time",
+    ["bts_id", "endpoint", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_PHASE_DURATION = Histogram(
+    "bts_request_phase_duration_seconds",
+    "Time spent per phase of a request (validation, should_handover, redis_write, central, previous_bts_notify)",
+    ["bts_id", "endpoint", "phase"], buckets=LATENCY_BUCKETS,
+)
+REQUEST_REDIS_ROUND_TRIPS = Histogram(
+    "bts_request_redis_round_trips", "Redis round trips (commands or pipelines) made by one request",
+    ["bts_id", "endpoint"], buckets=ROUND_TRIP_BUCKETS,
+)
+REDIS_ROUND_TRIPS = Counter(
+    "bts_redis_round_trips_total", "Redis round trips (commands or pipelines), by request endpoint or 'background'",
+    ["bts_id", "source"],
+)
+JOB_DURATION = Histogram(
+    "bts_job_duration_seconds", "Duration of one run of a periodic background job",
+    ["bts_id", "job"], buckets=LATENCY_BUCKETS,
+)
+JOB_FAILURES = Counter("bts_job_failures_total", "Runs of a periodic background job that raised", ["bts_id", "job"])
+JOB_OVERRUNS = Counter("bts_job_overruns_total", "Runs of a periodic background job longer than its interval", ["bts_id", "job"])
+CONNECTED_USERS = Gauge("bts_connected_users", "Users currently connected to the BTS", ["bts_id"])
+
+
+@dataclass
+class RequestTimer:
+    """Per-request measurement state, carried in a ContextVar through the handler."""
+    bts_id: str
+    endpoint: str
+    started_at: float = field(default_factory=time.perf_counter)
+    redis_round_trips: int = 0
+
+
+_current_request: ContextVar[Optional[RequestTimer]] = ContextVar("bts_request_timer", default=None)
+
+# Set once at import time of the app (configure()); used by the helpers below
+_bts_id = "unknown"
+# Cells of a multi-cell host, the only {bts_id} path parameters used as labels (bounds label cardinality)
+_cells: set[str] = set()
+
+
+def configure(bts_id: str, connected_users: Optional[Callable[[], float]] = None) -> None:
+    """Bind the metrics to this BTS; connected_users is read at scrape time for the gauge."""
+    global _bts_id
+    _bts_id = str(bts_id)
+    if connected_users is not None:
+        track_connected_users(_bts_id, connected_users)
+
+
+def track_connected_users(bts_id: str, connected_users: Callable[[], float]) -> None:
+    """Export the connected users gauge of one cell (a multi-cell host tracks every cell it serves)."""
+    _cells.add(str(bts_id))
+    CONNECTED_USERS.labels(bts_id=str(bts_id)).set_function(connected_users)
+
+
+def untrack_connected_users(bts_id: str) -> None:
+    _cells.discard(str(bts_id))
+    try:
+        CONNECTED_USERS.remove(str(bts_id))
+    except KeyError:
+        pass
+
+
+@contextmanager
+def phase(name: str):
+    """Time a block of the current request as one phase; no-op outside a request."""
+    timer = _current_request.get()
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        if timer is not None:
+            REQUEST_PHASE_DURATION.labels(
+                bts_id=timer.bts_id, endpoint=timer.endpoint, phase=name
+            ).observe(time.perf_counter() - started_at)
+
+
+def observe_validation() -> None:
+    """
+    Record the validation phase of the current request: everything from the start of the route
+    handler (body read, JSON parse, pydantic validation) until the endpoint function is entered.
+    """
+    timer = _current_request.get()
+    if timer is not None:
+        REQUEST_PHASE_DURATION.labels(
+            bts_id=timer.bts_id, endpoint=timer.endpoint, phase="validation"
+        ).observe(time.perf_counter() - timer.started_at)
+
+
+def observe_removal_send(duration_seconds: float, failed: bool) -> None:
+    """
+    RemovalDispatcher on_send_complete hook: the previous_bts_notify phase of connect is the background
+    delivery of the removal to the previous BTS, so it is recorded here, under the 'background' endpoint.
+    """
+    REQUEST_PHASE_DURATION.labels(
+        bts_id=_bts_id, endpoint="background", phase="previous_bts_notify"
+    ).observe(duration_seconds)
+
+
+def count_redis_round_trip() -> None:
+    timer = _current_request.get()
+    if timer is not None:
+        timer.redis_round_trips += 1
+    REDIS_ROUND_TRIPS.labels(bts_id=_bts_id, source=timer.endpoint if timer else "background").inc()
+
+
+def observe_job(name: str, duration_seconds: float, failed: bool, overran: bool) -> None:
+    """PeriodicScheduler on_job_complete hook."""
+    JOB_DURATION.labels(bts_id=_bts_id, job=name).observe(duration_seconds)
+    if failed:
+        JOB_FAILURES.labels(bts_id=_bts_id, job=name).inc()
+    if overran:
+        JOB_OVERRUNS.labels(bts_id=_bts_id, job=name).inc()
+
+
+class TimedRoute(APIRoute):
+    """
+    APIRoute that times every request and counts its Redis round trips, labelled by route path.
+    Routes of a multi-cell host carry the cell in a {bts_id} path parameter, which is used as the label.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        endpoint = self.path
+
+        async def timed_handler(request: Request) -> Response:
+            cell = request.path_params.get("bts_id")
+            timer = RequestTimer(bts_id=cell if cell in _cells else _bts_id, endpoint=endpoint)
+            token = _current_request.set(timer)
+            status = "500"
+            try:
+                response = await handler(request)
+                status = str(response.status_code)
+                return response
+            except RequestValidationError:
+                status = "422"
+                raise
+            except Exception as e:
+                status = str(getattr(e, "status_code", 500))
+                raise
+            finally:
+                _current_request.reset(token)
+                REQUEST_DURATION.labels(
+                    bts_id=timer.bts_id, endpoint=endpoint, method=request.method, status=status
+                ).observe(time.perf_counter() - timer.started_at)
+                REQUEST_REDIS_ROUND_TRIPS.labels(bts_id=timer.bts_id, endpoint=endpoint).observe(timer.redis_round_trips)
+
+        return timed_handler
+
+
+class InstrumentedPipeline(Pipeline):
+    async def execute(self, raise_on_error: bool = True):
+        count_redis_round_trip()
+        return await super().execute(raise_on_error)
+
+
+class InstrumentedRedis(redis_asyncio.Redis):
+    """redis.asyncio.Redis that counts round trips: every command, script call and pipeline execute."""
+
+    async def execute_command(self, *args, **options):
+        count_redis_round_trip()
+        return await super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint: Optional[str] = None) -> InstrumentedPipeline:
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
@@ -0,0 +1,51 @@
+from pydantic import BaseModel, Field, TypeAdapter
+
+
+class UserLocation(BaseModel):
+    x: float
+    y: float
+
+
+class ConnectRequest(BaseModel):
+    imei: str = Field(..., min_length=15, max_length=15, description="IMEI number")
+    timestamp: str = Field(..., description="ISO 8601 timestamp")
+    user_location: UserLocation
+
+
+class ConnectResponse(BaseModel):
+    status: str
+    data: dict
+
+
+class KeepAliveRequest(BaseModel):
+    imei: str = Field(..., min_length=15, max_length=15, description="IMEI number")
+    timestamp: str = Field(..., description="ISO 8601 timestamp")
+    user_location: UserLocation
+
+
+class KeepAliveResponse(BaseModel):
+    status: str
+    data: dict
+
+
+class BatchResponse(BaseModel):
+    status: str
+    data: dict
+
+
+# Validate whole batches in one pass
+CONNECT_BATCH_ADAPTER = TypeAdapter(list[ConnectRequest])
+KEEPALIVE_BATCH_ADAPTER = TypeAdapter(list[KeepAliveRequest])
+
+
+class BtsInfo(BaseModel):
+    bts_id: str
+    lac: str
+    location_x: float
+    location_y: float
+
+
+class StatusBtsInfo(BaseModel):
+    bts_id: str
+    capacity: int
+    current_load: int
@@ -0,0 +1,160 @@
+import time
+import logging
+from dataclasses import dataclass, replace
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .handover_scorer import NeighbourMatrix
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Neighbour:
+    """Typed, pre-parsed neighbour BTS entry."""
+    bts_id: str
+    x: float
+    y: float
+    max_capacity: float
+    current_load: float
+    load_ratio: float
+    distance_to_owner: float
+    eligible: bool  # False when the neighbour is overloaded
+
+
+@dataclass(frozen=True)
+class NeighbourSnapshot:
+    """Immutable view of the neighbour table at one refresh."""
+    neighbours: tuple[Neighbour, ...]
+    known_count: int  # non-owner BTS entries seen in the registry, before the radius filter
+    refreshed_at: float
+    matrix: NeighbourMatrix  # the same neighbours as arrays, for vectorised scoring
+
+    def __len__(self) -> int:
+        return len(self.neighbours)
+
+
+class NeighbourTable:
+    """
+    In-process table of neighbour BTS used by the handover evaluation.
+
+    The registry list is parsed once per poll: entries for other BTS are converted to floats,
+    filtered to the neighbour radius and annotated with their distance to the owner BTS and
+    whether they are overloaded. The whole snapshot is swapped with a single reference
+    assignment, so readers on the request path never see a half-updated table and need no I/O.
+
+    A snapshot older than ttl seconds (no refresh or touch, e.g. Central Backend unreachable) is
+    treated as empty, like neighbour entries expiring from the Redis cache.
+    """
+
+    def __init__(
+        self,
+        *,
+        owner_bts_id: str,
+        owner_x: float,
+        owner_y: float,
+        neighbour_radius: float,
+        overload_threshold: float = 0.8,
+        ttl: Optional[float] = None,
+    ):
+        self.owner_bts_id = str(owner_bts_id)
+        self.owner_x = float(owner_x)
+        self.owner_y = float(owner_y)
+        self.neighbour_radius = float(neighbour_radius)
+        self.overload_threshold = float(overload_threshold)
+        self.ttl = ttl
+        self._snapshot = NeighbourSnapshot(
+            neighbours=(), known_count=0, refreshed_at=0.0, matrix=NeighbourMatrix.empty()
+        )
+
+    def is_expired(self, snapshot: NeighbourSnapshot) -> bool:
+        return self.ttl is not None and time.time() - snapshot.refreshed_at > self.ttl
+
+    def snapshot(self) -> NeighbourSnapshot:
+        snapshot = self._snapshot
+        if self.is_expired(snapshot):
+            # Keep refreshed_at, so stats still show when the neighbours were last confirmed
+            return NeighbourSnapshot(
+                neighbours=(), known_count=0, refreshed_at=snapshot.refreshed_at, matrix=NeighbourMatrix.empty()
+            )
+        return snapshot
+
+    def touch(self) -> None:
+        """Central Backend confirmed the registry is unchanged (304): the current neighbours are still valid."""
+        self._snapshot = replace(self._snapshot, refreshed_at=time.time())
+
+    def _parse(self, bts: dict) -> Optional[Neighbour]:
+        bts_id = bts.get("btsId")
+        if not bts_id:
+            return None
+
+        try:
+            bts_x = float(bts.get("locationX") or 0.0)
+            bts_y = float(bts.get("locationY") or 0.0)
+        except (TypeError, ValueError):
+            return None
+
+        distance_to_owner = ((bts_x - self.owner_x) ** 2 + (bts_y - self.owner_y) ** 2) ** 0.5
+
+        try:
+            capacity = float(bts.get("maxCapacity") or 0.0)
+            current_load = float(bts.get("currentLoad") or 0.0)
+        except (TypeError, ValueError):
+            capacity, current_load = 0.0, 0.0
+
+        load_ratio = (current_load / capacity) if capacity > 0 else 0.0
+
+        return Neighbour(
+            bts_id=str(bts_id),
+            x=bts_x,
+            y=bts_y,
+            max_capacity=capacity,
+            current_load=current_load,
+            load_ratio=load_ratio,
+            distance_to_owner=distance_to_owner,
+            eligible=not (capacity > 0 and load_ratio >= self.overload_threshold),
+        )
+
+    @staticmethod
+    def _build_matrix(neighbours: list[Neighbour]) -> NeighbourMatrix:
+        if not neighbours:
+            return NeighbourMatrix.empty()
+        return NeighbourMatrix(
+            ids=tuple(n.bts_id for n in neighbours),
+            positions=np.array([(n.x, n.y) for n in neighbours], dtype=np.float64),
+            load_ratios=np.array([n.load_ratio for n in neighbours], dtype=np.float64),
+            eligible=np.array([n.eligible for n in neighbours], dtype=bool),
+        )
+
+    def refresh(self, bts_list: Iterable[dict]) -> NeighbourSnapshot:
+        """Rebuild the table from a registry list (list of BTS dicts) and publish it atomically."""
+        neighbours = []
+        known_count = 0
+
+        for bts in bts_list or []:
+            if not isinstance(bts, dict):
+                continue
+            if not bts.get("btsId") or str(bts.get("btsId")) == self.owner_bts_id:
+                continue
+            known_count += 1
+
+            neighbour = self._parse(bts)
+            if neighbour is None:
+                continue
+            # In real life, BTS far away should not be considered for handover
+            # BTS should have a list of neighbor BTS, we are simulating that with distance here
+            if neighbour.distance_to_owner > self.neighbour_radius:
+                continue
+            neighbours.append(neighbour)
+
+        snapshot = NeighbourSnapshot(
+            neighbours=tuple(neighbours),
+            known_count=known_count,
+            refreshed_at=time.time(),
+            matrix=self._build_matrix(neighbours),
+        )
+        self._snapshot = snapshot
+        logger.debug(f"NeighbourTable refreshed: {len(neighbours)}/{known_count} neighbours for {self.owner_bts_id}")
+        return snapshot
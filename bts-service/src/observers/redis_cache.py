@@ -1,14 +1,79 @@
+import time
 import logging
-import json
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 
-class UserRedisCache:
+# Moves members of the legacy connected-users SET into the presence ZSET and deletes the SET, atomically.
+# KEYS[1] = legacy set, KEYS[2] = presence zset, ARGV[1] = score (last seen) given to migrated members.
+# Members already in the ZSET keep their (fresher) score. Returns the number of migrated members.
+MIGRATE_USERS_SET_LUA = """
+if redis.call('TYPE', KEYS[1]).ok ~= 'set' then
+    return 0
+end
+local members = redis.call('SMEMBERS', KEYS[1])
+local migrated = 0
+for i = 1, #members, 500 do
+    local args = {}
+    for j = i, math.min(i + 499, #members) do
+        table.insert(args, ARGV[1])
+        table.insert(args, members[j])
+    end
+    migrated = migrated + redis.call('ZADD', KEYS[2], 'NX', unpack(args))
+end
+redis.call('DEL', KEYS[1])
+return migrated
+"""
+
+
+# Removes users whose last-seen score is not newer than the connect that superseded them, atomically.
+# KEYS[1] = presence zset, KEYS[i + 1] = user hash of the i-th user,
+# pairs of ARGV: imei, connected_at (unix time) of the i-th user.
+# A user seen here after connected_at (flapped back) is kept. Returns the number of removed users.
+REMOVE_USERS_IF_NOT_NEWER_LUA = """
+local removed = 0
+for i = 1, #ARGV / 2 do
+    local imei = ARGV[2 * i - 1]
+    local score = redis.call('ZSCORE', KEYS[1], imei)
+    if score and tonumber(score) <= tonumber(ARGV[2 * i]) then
+        redis.call('ZREM', KEYS[1], imei)
+        redis.call('DEL', KEYS[i + 1])
+        removed = removed + 1
+    end
+end
+return removed
+"""
+
+def bts_information_mapping(data: dict) -> dict:
+    """Redis hash fields of one neighbour BTS registry entry."""
+    return {
+        "btsId": str(data.get("btsId", "")),
+        "mcc": str(data.get("mcc", "")),
+        "mnc": str(data.get("mnc", "")),
+        "lac": str(data.get("lac", "")),
+        "locationX": str(data.get("locationX", "")),
+        "locationY": str(data.get("locationY", "")),
+        "status": str(data.get("status", "")),
+        "maxCapacity": str(data.get("maxCapacity", "")),
+        "currentLoad": str(data.get("currentLoad", "")),
+        "updatedAt": str(data.get("updatedAt", "")),
+        "createdAt": str(data.get("createdAt", "")),
+    }
+
+
+class AsyncUserRedisCache:
     """
     Observer that persists user metadata to Redis when connection or keepalive events occur.
     Owner-specific: keys are namespaced by owner_bts_id.
+
+    Stores (per owner BTS):
+        hash key:     bts:{owner_bts_id}:user:{imei}         (metadata, expires after ttl)
+        presence key: bts:{owner_bts_id}:users:last_seen     (ZSET imei -> last seen unix time)
+
+    The presence ZSET replaces the old bts:{owner_bts_id}:users SET; see migrate_legacy_users_set().
+
+    Expects a redis.asyncio.Redis client.
     """
 
     def __init__(self, redis_client, ttl: int, owner_bts_id: str):
@@ -17,28 +82,28 @@ class UserRedisCache:
         self.owner_bts_id = owner_bts_id
 
         # Owner-scoped keys
-        self._users_set_key = f"bts:{self.owner_bts_id}:users"
+        self._presence_key = f"bts:{self.owner_bts_id}:users:last_seen"
         self._user_key_prefix = f"bts:{self.owner_bts_id}:user:"
+        # Pre-ZSET layout, only read by the migration
+        self._legacy_users_set_key = f"bts:{self.owner_bts_id}:users"
+        self._migrate_script = self.redis_client.register_script(MIGRATE_USERS_SET_LUA)
+        self._remove_script = self.redis_client.register_script(REMOVE_USERS_IF_NOT_NEWER_LUA)
 
-    def update(self, event: str, data: dict):
+    async def update(self, event: str, data: dict):
         if event in ("user_connected", "user_keepalive"):
-            self._store_metadata(
+            await self._store_metadata(
                 imei=data["imei"],
                 location=data["location"],
                 bts_id=data["bts_id"],
                 timestamp=data["timestamp"]
             )
 
-    def _store_metadata(self, imei: str, location: dict, bts_id: str, timestamp: str):
+    async def _store_metadata(self, imei: str, location: dict, bts_id: str, timestamp: str):
         user_key = f"{self._user_key_prefix}{imei}"
 
         try:
             pipe = self.redis_client.pipeline(transaction=False)
-
-            # Track membership in this BTS' connected users set (idempotent)
-            pipe.sadd(self._users_set_key, imei)
-
-            # Store metadata under owner namespace
+            pipe.zadd(self._presence_key, {imei: time.time()})
             pipe.hset(user_key, mapping={
                 "last_seen": timestamp,
                 "bts_id": bts_id,
@@ -46,18 +111,46 @@ class UserRedisCache:
                 "location_y": str(location["y"]),
             })
             pipe.expire(user_key, self.ttl)
-
-            pipe.execute()
+            await pipe.execute()
             logger.debug(
                 f"Redis: Cached metadata for {imei} under {self.owner_bts_id} (TTL {self.ttl}s)"
             )
         except Exception as e:
             logger.error(f"Redis: Failed to cache metadata for {imei}: {e}")
 
-    def get_metadata(self, imei: str) -> Optional[dict]:
+    async def update_many(self, event: str, data_list: list[dict]):
+        """Batch variant of update(): all users are written in a single pipeline."""
+        if event in ("user_connected", "user_keepalive"):
+            await self._store_metadata_many(data_list)
+
+    async def _store_metadata_many(self, data_list: list[dict]):
+        if not data_list:
+            return
+
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            now = time.time()
+            pipe.zadd(self._presence_key, {data["imei"]: now for data in data_list})
+            for data in data_list:
+                user_key = f"{self._user_key_prefix}{data['imei']}"
+                pipe.hset(user_key, mapping={
+                    "last_seen": data["timestamp"],
+                    "bts_id": data["bts_id"],
+                    "location_x": str(data["location"]["x"]),
+                    "location_y": str(data["location"]["y"]),
+                })
+                pipe.expire(user_key, self.ttl)
+            await pipe.execute()
+            logger.debug(
+                f"Redis: Cached metadata for {len(data_list)} users under {self.owner_bts_id} (TTL {self.ttl}s)"
+            )
+        except Exception as e:
+            logger.error(f"Redis: Failed to cache metadata for batch of {len(data_list)} users: {e}")
+
+    async def get_metadata(self, imei: str) -> Optional[dict]:
         user_key = f"{self._user_key_prefix}{imei}"
         try:
-            data = self.redis_client.hgetall(user_key)
+            data = await self.redis_client.hgetall(user_key)
             if not data:
                 return None
             return {
@@ -72,38 +165,96 @@ class UserRedisCache:
             logger.error(f"Redis: Failed to get metadata for {imei}: {e}")
             return None
 
-    def get_ttl(self, imei: str) -> int:
-        user_key = f"{self._user_key_prefix}{imei}"
-        return self.redis_client.ttl(user_key)
-
-    def get_connected_imeis(self) -> set[str]:
-        return set(self.redis_client.smembers(self._users_set_key))
-
-    def is_imei_connected(self, imei: str) -> bool:
-        return self.redis_client.sismember(self._users_set_key, imei)
+    async def get_ttl(self, imei: str) -> int:
+        return await self.redis_client.ttl(f"{self._user_key_prefix}{imei}")
+
+    async def get_locations(self, imeis) -> dict[str, tuple[float, float]]:
+        """Last known location of each given user, fetched in one pipeline. Users without metadata are skipped."""
+        imeis = list(imeis)
+        if not imeis:
+            return {}
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for imei in imeis:
+            pipe.hmget(f"{self._user_key_prefix}{imei}", "location_x", "location_y")
+
+        locations = {}
+        for imei, (x, y) in zip(imeis, await pipe.execute()):
+            if x is None or y is None:
+                continue
+            try:
+                locations[imei] = (float(x), float(y))
+            except ValueError:
+                continue
+        return locations
+
+    async def get_connected_imeis(self) -> set[str]:
+        """Users seen within the last ttl seconds."""
+        return set(await self.redis_client.zrangebyscore(self._presence_key, time.time() - self.ttl, "+inf"))
+
+    async def is_imei_connected(self, imei: str) -> bool:
+        return await self.redis_client.zscore(self._presence_key, imei) is not None
+
+    async def remove_connected_imei(self, imei: str, connected_at: Optional[float] = None) -> bool:
+        """
+        Remove user from connected set and delete their metadata, unless the user was seen here after
+        connected_at (unix time of its connect to another BTS, default now). Returns True if removed.
+        """
+        return await self.remove_connected_imeis({imei: connected_at}) == 1
 
-    def remove_connected_imei(self, imei: str) -> None:
-        """Remove user from connected set and delete their metadata"""
-        user_key = f"{self._user_key_prefix}{imei}"
+    async def remove_connected_imeis(self, removals: dict[str, Optional[float]]) -> int:
+        """
+        Batch variant of remove_connected_imei(): imei -> connected_at (None = now), one Lua call.
+        Returns how many users were removed.
+        """
+        if not removals:
+            return 0
+        now = time.time()
+        keys = [self._presence_key]
+        args = []
+        for imei, connected_at in removals.items():
+            keys.append(f"{self._user_key_prefix}{imei}")
+            args.extend((imei, now if connected_at is None else connected_at))
         try:
-            pipe = self.redis_client.pipeline(transaction=False)
-            pipe.srem(self._users_set_key, imei)
-            pipe.delete(user_key)
-            pipe.execute()
-            logger.debug(f"Redis: Removed {imei} from {self.owner_bts_id}")
+            removed = int(await self._remove_script(keys=keys, args=args))
+            logger.debug(f"Redis: Removed {removed}/{len(removals)} users from {self.owner_bts_id}")
+            return removed
         except Exception as e:
-            logger.error(f"Redis: Failed to remove {imei} from {self.owner_bts_id}: {e}")
+            logger.error(f"Redis: Failed to remove {len(removals)} users from {self.owner_bts_id}: {e}")
+            return 0
 
-    def connected_count(self) -> int:
-        return int(self.redis_client.scard(self._users_set_key))
+    async def connected_count(self) -> int:
+        return int(await self.redis_client.zcard(self._presence_key))
 
-class BtsInformationRedisCache:
+    async def remove_stale(self, now: Optional[float] = None) -> tuple[int, int]:
+        """
+        Drop users not seen for more than ttl seconds and count the rest, in one round trip
+        (ZREMRANGEBYSCORE + ZCARD). Returns (removed, connected).
+        """
+        now = time.time() if now is None else now
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.zremrangebyscore(self._presence_key, "-inf", f"({now - self.ttl}")
+        pipe.zcard(self._presence_key)
+        removed, connected = await pipe.execute()
+        return int(removed), int(connected)
+
+    async def migrate_legacy_users_set(self) -> int:
+        """Move users from the old SET layout into the presence ZSET (no-op once migrated)."""
+        migrated = int(await self._migrate_script(keys=[self._legacy_users_set_key, self._presence_key], args=[time.time()]))
+        if migrated:
+            logger.info(f"Redis: Migrated {migrated} users of {self.owner_bts_id} to the presence ZSET")
+        return migrated
+
+
+class AsyncBtsInformationRedisCache:
     """
     Caches neighbour BTS information into Redis, namespaced per *owner* BTS.
 
     Stores (per owner BTS):
         hash key:  bts_id:{owner_bts_id}:bts_neighbours:{neighbour_bts_id}:information
         index set: bts_id:{owner_bts_id}:bts_neighbours:index
+
+    Expects a redis.asyncio.Redis client.
     """
 
     def __init__(self, redis_client, ttl: int, owner_bts_id: str):
@@ -115,79 +266,93 @@ class BtsInformationRedisCache:
     def _information_key(self, neighbour_bts_id: str) -> str:
         return f"bts_id:{self.owner_bts_id}:bts_neighbours:{neighbour_bts_id}:information"
 
-    def update(self, event: str, data: dict) -> None:
+    async def update(self, event: str, data: dict) -> None:
         if event != "bts_info_updated":
             return
+        await self.update_many(event, [data])
 
-        neighbour_id = str(data.get("btsId", "")).strip()
-        if not neighbour_id:
-            return
+    async def update_many(self, event: str, data_list: list[dict]) -> bool:
+        """Write a whole poll result (hash + TTL per neighbour, index) in a single pipeline. Returns False on failure."""
+        if event != "bts_info_updated":
+            return True
+
+        neighbours = [(str(data.get("btsId", "")).strip(), data) for data in data_list or []]
+        neighbours = [(neighbour_id, data) for neighbour_id, data in neighbours if neighbour_id]
+        if not neighbours:
+            return True
 
-        key = self._information_key(neighbour_id)
         try:
-            self.redis_client.hset(
-                key,
-                mapping={
-                    "btsId": str(data.get("btsId", "")),
-                    "mcc": str(data.get("mcc", "")),
-                    "mnc": str(data.get("mnc", "")),
-                    "lac": str(data.get("lac", "")),
-                    "locationX": str(data.get("locationX", "")),
-                    "locationY": str(data.get("locationY", "")),
-                    "status": str(data.get("status", "")),
-                    "maxCapacity": str(data.get("maxCapacity", "")),
-                    "currentLoad": str(data.get("currentLoad", "")),
-                    "updatedAt": str(data.get("updatedAt", "")),
-                    "createdAt": str(data.get("createdAt", "")),
-                },
-            )
-            self.redis_client.expire(key, self.ttl)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for neighbour_id, data in neighbours:
+                key = self._information_key(neighbour_id)
+                pipe.hset(key, mapping=bts_information_mapping(data))
+                pipe.expire(key, self.ttl)
+            pipe.sadd(self._index_key, *[neighbour_id for neighbour_id, _ in neighbours])
+            await pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Redis: Failed to cache {len(neighbours)} neighbours for {self.owner_bts_id}: {e}")
+            return False
 
-            # track neighbour ids for *this* owner BTS only
-            self.redis_client.sadd(self._index_key, neighbour_id)
+    async def touch(self, neighbour_bts_ids) -> list[str]:
+        """
+        Refresh the TTL of unchanged neighbours in one pipeline.
+        Returns the ids whose hash no longer exists (expired or evicted) and must be rewritten.
+        """
+        neighbour_bts_ids = [str(i) for i in neighbour_bts_ids]
+        if not neighbour_bts_ids:
+            return []
 
-        except Exception as e:
-            logger.error(f"Redis: Failed to cache neighbour {neighbour_id} for {self.owner_bts_id}: {e}")
+        pipe = self.redis_client.pipeline(transaction=False)
+        for neighbour_id in neighbour_bts_ids:
+            pipe.expire(self._information_key(neighbour_id), self.ttl)
+        results = await pipe.execute()
+        return [neighbour_id for neighbour_id, ok in zip(neighbour_bts_ids, results) if not ok]
 
+    async def remove(self, neighbour_bts_ids) -> None:
+        """Drop neighbours that disappeared from the registry, in one pipeline."""
+        neighbour_bts_ids = [str(i) for i in neighbour_bts_ids]
+        if not neighbour_bts_ids:
+            return
+
+        pipe = self.redis_client.pipeline(transaction=False)
+        for neighbour_id in neighbour_bts_ids:
+            pipe.delete(self._information_key(neighbour_id))
+        pipe.srem(self._index_key, *neighbour_bts_ids)
+        await pipe.execute()
 
-    def get(self, neighbour_bts_id: str):
+    async def get(self, neighbour_bts_id: str):
         key = self._information_key(str(neighbour_bts_id))
         try:
-            data = self.redis_client.hgetall(key)
+            data = await self.redis_client.hgetall(key)
             return data or None
         except Exception as e:
             logger.error(f"Redis: Failed to get neighbour {neighbour_bts_id} for {self.owner_bts_id}: {e}")
             return None
-        
-    def get_all(self):
+
+    async def get_all(self):
+        """All cached neighbours: the index, then every hash in one pipeline; stale index entries are removed."""
         try:
-            ids = self.redis_client.smembers(self._index_key)
-            if not ids:
+            neighbour_bts_ids = list(await self.redis_client.smembers(self._index_key))
+            if not neighbour_bts_ids:
                 return []
 
-            results = []
-            stale = []
-
-            for neighbour_id in ids:
-                if isinstance(neighbour_id, bytes):
-                    neighbour_id = neighbour_id.decode("utf-8")
-
-                data = self.get(neighbour_id)
-                if data:
-                    results.append(data)
-                else:
-                    stale.append(neighbour_id)
+            pipe = self.redis_client.pipeline(transaction=False)
+            for neighbour_id in neighbour_bts_ids:
+                pipe.hgetall(self._information_key(neighbour_id))
+            rows = await pipe.execute()
 
+            stale = [neighbour_id for neighbour_id, data in zip(neighbour_bts_ids, rows) if not data]
             if stale:
-                self.redis_client.srem(self._index_key, *stale)
-
-            return results
+                await self.redis_client.srem(self._index_key, *stale)
+            return [data for data in rows if data]
 
         except Exception as e:
             logger.error(f"Redis: Failed to get all neighbours for {self.owner_bts_id}: {e}")
             return []
-        
-class BtsStatusRedisCache:
+
+
+class AsyncBtsStatusRedisCache:
     """
     Stores BTS status records in Redis, namespaced by an owner (e.g. "this BTS").
 
@@ -196,6 +361,8 @@ class BtsStatusRedisCache:
 
     Fields stored (only):
         bts_id, status, capacity, load
+
+    Expects a redis.asyncio.Redis client.
     """
 
     def __init__(self, redis_client, ttl: int, owner_bts_id: str):
@@ -206,17 +373,14 @@ class BtsStatusRedisCache:
     def _status_key(self, bts_id: str) -> str:
         return f"bts_id:{self.owner_bts_id}:bts_status:{str(bts_id)}"
 
-    def set_status(self, bts_id: str, status: str, capacity: int, load: int) -> None:
-        """
-        Store ONLY BTS status fields for a given bts_id (under this owner's namespace).
-        Fields: bts_id, status, capacity, load
-        """
+    async def set_status(self, bts_id: str, status: str, capacity: int, load: int) -> None:
         if not bts_id:
             return
 
         key = self._status_key(bts_id)
         try:
-            self.redis_client.hset(
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.hset(
                 key,
                 mapping={
                     "bts_id": str(bts_id),
@@ -225,20 +389,19 @@ class BtsStatusRedisCache:
                     "load": str(int(load)),
                 },
             )
-            self.redis_client.expire(key, self.ttl)
+            pipe.expire(key, self.ttl)
+            await pipe.execute()
         except Exception as e:
             logger.error(f"Redis: Failed to set status for {bts_id} (owner {self.owner_bts_id}): {e}")
 
-    def get_status(self, bts_id: str) -> Optional[dict[str, str]]:
-        """Return status dict for bts_id (under this owner's namespace) or None."""
+    async def get_status(self, bts_id: str) -> Optional[dict[str, str]]:
         if not bts_id:
             return None
 
         key = self._status_key(bts_id)
         try:
-            data = self.redis_client.hgetall(key)
+            data = await self.redis_client.hgetall(key)
             return data or None
         except Exception as e:
             logger.error(f"Redis: Failed to get status for {bts_id} (owner {self.owner_bts_id}): {e}")
             return None
-        
\ No newline at end of file
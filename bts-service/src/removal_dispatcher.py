@@ -0,0 +1,313 @@
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from .http_client import HttpClientPool
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RemovalTarget:
+    """Removal state of one neighbour BTS."""
+    bts_id: str
+    client: HttpClientPool
+    pending: dict[str, tuple[float, int]] = field(default_factory=dict)  # imei -> (connected_at, failed attempts)
+    in_flight: bool = False
+    consecutive_failures: int = 0
+    next_attempt_at: float = 0.0
+    supports_batch: bool = True  # cleared when the neighbour has no /user/remove/batch (older BTS)
+    sent: int = 0
+    failed: int = 0
+
+
+class RemovalDispatcher:
+    """
+    Background delivery of "remove user" notifications to the previous BTS of a user.
+
+    connect only calls submit(), which never waits on the network. Removals are queued per target
+    BTS and coalesced (an IMEI is sent once per target however often it was submitted), then sent
+    in batches over a persistent keep-alive HttpClientPool per neighbour. At most one request per
+    neighbour is in flight. A failed batch is retried with exponential backoff and jitter; IMEIs that
+    still fail after max_attempts are dropped, as the neighbour's presence TTL removes them anyway.
+
+    Every removal carries the unix time of the connect that caused it. The neighbour only removes a
+    user it has not seen since then, so a late removal cannot drop a UE that flapped back to it.
+    cancel() drops queued and retried removals older than a later connect of the same UE elsewhere.
+    The queue is bounded: submissions over max_pending are dropped and counted.
+    Must be started and stopped from the event loop that uses it.
+    """
+
+    def __init__(
+        self,
+        *,
+        url_template: str = "http://{bts_id}:8080",
+        max_pending: int = 10000,
+        batch_size: int = 100,
+        max_attempts: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 10.0,
+        timeout: float = 2.0,
+        max_connections_per_target: int = 4,
+        on_send_complete: Optional[Callable[[float, bool], None]] = None,
+    ):
+        """
+        :param url_template: base URL of a neighbour, formatted with bts_id
+        :param max_pending: maximum number of queued removals over all neighbours
+        :param batch_size: IMEIs per request to one neighbour
+        :param max_attempts: attempts per IMEI before it is dropped
+        :param base_backoff: seconds to wait after the first failure; doubled per consecutive failure
+        :param max_backoff: upper bound of the backoff in seconds
+        :param timeout: request timeout towards a neighbour in seconds
+        :param max_connections_per_target: connection pool size per neighbour
+        :param on_send_complete: optional fn(duration_seconds, failed) called after every request to a
+                                 neighbour, e.g. to export the delivery time as a metric
+        """
+        self.url_template = url_template
+        self.max_pending = int(max_pending)
+        self.batch_size = int(batch_size)
+        self.max_attempts = int(max_attempts)
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = float(max_backoff)
+        self.timeout = float(timeout)
+        self.max_connections_per_target = int(max_connections_per_target)
+        self._on_send_complete = on_send_complete
+
+        self._targets: dict[str, RemovalTarget] = {}
+        self._pending_count = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._sends: set[asyncio.Task] = set()
+        self._connected_during_send: dict[str, float] = {}  # imei -> latest connect reported by cancel()
+
+        # Metrics
+        self._submitted = 0
+        self._coalesced = 0
+        self._dropped = 0
+        self._retries = 0
+        self._cancelled = 0
+        self._last_send_ms = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._dispatch_loop(), name="removal-dispatcher")
+            logger.info(f"RemovalDispatcher started (batch_size={self.batch_size}, max_pending={self.max_pending})")
+
+    async def stop(self) -> None:
+        """Stop dispatching and close all neighbour connections. Removals still queued are dropped."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        for task in list(self._sends):
+            task.cancel()
+        await asyncio.gather(*self._sends, return_exceptions=True)
+
+        for target in self._targets.values():
+            await target.client.close()
+
+        if self._pending_count:
+            logger.warning(f"RemovalDispatcher stopped with {self._pending_count} removals not delivered")
+        logger.info("RemovalDispatcher stopped")
+
+    def _target(self, bts_id: str) -> RemovalTarget:
+        target = self._targets.get(bts_id)
+        if target is None:
+            target = RemovalTarget(
+                bts_id=bts_id,
+                client=HttpClientPool(
+                    base_url=self.url_template.format(bts_id=bts_id),
+                    max_connections=self.max_connections_per_target,
+                    max_keepalive_connections=self.max_connections_per_target,
+                    timeout=self.timeout,
+                    connect_timeout=self.timeout,
+                ),
+            )
+            self._targets[bts_id] = target
+        return target
+
+    def submit(self, bts_id: str, imei: str, connected_at: Optional[float] = None) -> bool:
+        """
+        Queue removal of imei from bts_id after its connect at connected_at (unix time, default now).
+        Returns False if the queue is full and it was dropped.
+        """
+        connected_at = time.time() if connected_at is None else connected_at
+        target = self._target(str(bts_id))
+        queued = target.pending.get(imei)
+        if queued is not None:
+            target.pending[imei] = (max(queued[0], connected_at), queued[1])
+            self._coalesced += 1
+            return True
+
+        if self._pending_count >= self.max_pending:
+            self._dropped += 1
+            logger.warning(f"RemovalDispatcher queue full, dropping removal of {imei} from {bts_id}")
+            return False
+
+        target.pending[imei] = (connected_at, 0)
+        self._pending_count += 1
+        self._submitted += 1
+        self._wakeup.set()
+        return True
+
+    def cancel(self, imei: str, connected_at: float) -> int:
+        """
+        The UE connected to another BTS at connected_at (reported by a removal sent to this BTS): drop the
+        removals of imei queued before that connect. Returns the number of dropped removals.
+        """
+        if any(target.in_flight for target in self._targets.values()):
+            # Removals being sent right now may come back for a retry
+            self._connected_during_send[imei] = max(connected_at, self._connected_during_send.get(imei, 0.0))
+
+        cancelled = 0
+        for target in self._targets.values():
+            queued = target.pending.get(imei)
+            if queued is not None and queued[0] <= connected_at:
+                del target.pending[imei]
+                cancelled += 1
+        self._pending_count -= cancelled
+        self._cancelled += cancelled
+        return cancelled
+
+    def _backoff(self, failures: int) -> float:
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (failures - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _dispatch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = loop.time()
+            next_due = None
+
+            for target in self._targets.values():
+                if not target.pending or target.in_flight:
+                    continue
+                if target.next_attempt_at > now:
+                    next_due = target.next_attempt_at if next_due is None else min(next_due, target.next_attempt_at)
+                    continue
+
+                target.in_flight = True
+                task = asyncio.create_task(self._send(target), name=f"removal-{target.bts_id}")
+                self._sends.add(task)
+                task.add_done_callback(self._sends.discard)
+
+            timeout = None if next_due is None else max(0.0, next_due - now)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _post(self, target: RemovalTarget, removals: dict[str, float]) -> None:
+        if target.supports_batch:
+            response = await target.client.post(
+                "/api/v1/user/remove/batch", json={"imeis": list(removals), "connected_at": removals}
+            )
+            if response.status_code not in (404, 405):
+                response.raise_for_status()
+                return
+            logger.info(f"{target.bts_id} has no batch removal endpoint, sending removals one by one")
+            target.supports_batch = False
+
+        responses = await asyncio.gather(
+            *[
+                target.client.post("/api/v1/user/remove", json={"imei": imei, "connected_at": connected_at})
+                for imei, connected_at in removals.items()
+            ]
+        )
+        for response in responses:
+            response.raise_for_status()
+
+    async def _send(self, target: RemovalTarget) -> None:
+        loop = asyncio.get_running_loop()
+        imeis = list(target.pending)[:self.batch_size]
+        attempts = {imei: target.pending.pop(imei) for imei in imeis}
+        self._pending_count -= len(imeis)
+        removals = {imei: connected_at for imei, (connected_at, _) in attempts.items()}
+
+        started_at = None
+        try:
+            await target.client.start()
+            started_at = time.perf_counter()
+            await self._post(target, removals)
+            self._last_send_ms = (time.perf_counter() - started_at) * 1000
+            self._observe_send(started_at, failed=False)
+
+            target.sent += len(imeis)
+            target.consecutive_failures = 0
+            target.next_attempt_at = 0.0
+            logger.info(f"Notified {target.bts_id} to remove {len(imeis)} users")
+
+        except Exception as e:
+            target.consecutive_failures += 1
+            target.next_attempt_at = loop.time() + self._backoff(target.consecutive_failures)
+            logger.warning(
+                f"Failed to notify {target.bts_id} to remove {len(imeis)} users "
+                f"(failure {target.consecutive_failures}): {e}"
+            )
+            if started_at is not None:
+                self._observe_send(started_at, failed=True)
+            self._requeue(target, attempts)
+
+        finally:
+            target.in_flight = False
+            if not any(other.in_flight for other in self._targets.values()):
+                self._connected_during_send.clear()
+            self._wakeup.set()
+
+    def _observe_send(self, started_at: float, failed: bool) -> None:
+        if self._on_send_complete is None:
+            return
+        try:
+            self._on_send_complete(time.perf_counter() - started_at, failed)
+        except Exception as e:
+            logger.error(f"on_send_complete hook failed: {e}")
+
+    def _requeue(self, target: RemovalTarget, attempts: dict[str, tuple[float, int]]) -> None:
+        for imei, (connected_at, failed_attempts) in attempts.items():
+            if connected_at <= self._connected_during_send.get(imei, 0.0):
+                # The UE connected somewhere else after this removal was queued
+                self._cancelled += 1
+                continue
+            if failed_attempts + 1 >= self.max_attempts:
+                target.failed += 1
+                continue
+            if imei in target.pending:
+                continue
+            if self._pending_count >= self.max_pending:
+                self._dropped += 1
+                continue
+            target.pending[imei] = (connected_at, failed_attempts + 1)
+            self._pending_count += 1
+            self._retries += 1
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending_count,
+            "max_pending": self.max_pending,
+            "submitted": self._submitted,
+            "coalesced": self._coalesced,
+            "dropped": self._dropped,
+            "retries": self._retries,
+            "cancelled": self._cancelled,
+            "last_send_ms": round(self._last_send_ms, 3),
+            "targets": {
+                bts_id: {
+                    "pending": len(target.pending),
+                    "sent": target.sent,
+                    "failed": target.failed,
+                    "consecutive_failures": target.consecutive_failures,
+                    "batch_endpoint": target.supports_batch,
+                    "connections": target.client.stats()["connections"],
+                }
+                for bts_id, target in self._targets.items()
+            },
+        }
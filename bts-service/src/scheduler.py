@@ -0,0 +1,179 @@
+import time
+import random
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobStats:
+    """Timing statistics of one periodic job."""
+    runs: int = 0
+    failures: int = 0
+    overruns: int = 0        # runs that took longer than the interval
+    skipped_ticks: int = 0   # ticks dropped to catch up after an overrun or a stalled loop
+    last_duration_ms: float = 0.0
+    max_duration_ms: float = 0.0
+    total_duration_ms: float = 0.0
+    last_lateness_ms: float = 0.0  # how late the last run started compared to its scheduled time
+    max_lateness_ms: float = 0.0
+    last_run_at: float = 0.0
+    last_error: Optional[str] = None
+
+    def as_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "overruns": self.overruns,
+            "skipped_ticks": self.skipped_ticks,
+            "last_duration_ms": round(self.last_duration_ms, 3),
+            "avg_duration_ms": round(self.total_duration_ms / self.runs, 3) if self.runs else 0.0,
+            "max_duration_ms": round(self.max_duration_ms, 3),
+            "last_lateness_ms": round(self.last_lateness_ms, 3),
+            "max_lateness_ms": round(self.max_lateness_ms, 3),
+            "last_run_at": self.last_run_at,
+            "last_error": self.last_error,
+        }
+
+
+@dataclass
+class PeriodicJob:
+    name: str
+    func: Callable[[], Awaitable]
+    interval: float
+    jitter: float = 0.0  # fraction of the interval, each run starts up to +/- jitter * interval off the grid
+    stats: JobStats = field(default_factory=JobStats)
+    task: Optional[asyncio.Task] = None
+
+
+class PeriodicScheduler:
+    """
+    Runs periodic background jobs as asyncio tasks on the application event loop.
+
+    Every job is scheduled on a fixed grid (start + k * interval), so time spent in the job does not
+    accumulate as drift. Jitter is applied per run around the grid point and never carried over.
+    A run that takes longer than the interval is counted as an overrun and the ticks it missed are
+    skipped, so a slow job never runs back-to-back to catch up. Runs of one job never overlap.
+    An exception raised by a job is logged and counted as a failure; the job stays scheduled.
+    Must be started and stopped from the event loop that runs the jobs.
+    """
+
+    def __init__(self, on_job_complete: Optional[Callable[[str, float, bool, bool], None]] = None):
+        """
+        :param on_job_complete: optional fn(name, duration_seconds, failed, overran) called after every run,
+                                e.g. to export job durations as metrics
+        """
+        self._jobs: dict[str, PeriodicJob] = {}
+        self._on_job_complete = on_job_complete
+        self._running = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._running
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], interval: float, *, jitter: float = 0.0) -> PeriodicJob:
+        """
+        :param name: unique job name, used in logs and stats
+        :param func: async fn() -> Any, called once per tick
+        :param interval: seconds between scheduled runs
+        :param jitter: 0..0.5, fraction of the interval used to spread runs of jobs with equal intervals
+        """
+        if name in self._jobs:
+            raise ValueError(f"Job {name} already scheduled")
+        if interval <= 0:
+            raise ValueError(f"Job {name} interval must be positive")
+
+        job = PeriodicJob(name=name, func=func, interval=float(interval), jitter=min(max(float(jitter), 0.0), 0.5))
+        self._jobs[name] = job
+        if self._running:
+            job.task = asyncio.create_task(self._run_job(job), name=f"periodic-{name}")
+        return job
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for job in self._jobs.values():
+            job.task = asyncio.create_task(self._run_job(job), name=f"periodic-{job.name}")
+        logger.info(f"PeriodicScheduler started with {len(self._jobs)} jobs: {', '.join(self._jobs)}")
+
+    async def stop(self) -> None:
+        """Cancel all jobs and wait until they have finished (a running job is cancelled mid-run)."""
+        if not self._running:
+            return
+        self._running = False
+
+        tasks = [job.task for job in self._jobs.values() if job.task is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for job in self._jobs.values():
+            job.task = None
+        logger.info("PeriodicScheduler stopped")
+
+    def _offset(self, job: PeriodicJob) -> float:
+        if not job.jitter:
+            return 0.0
+        return random.uniform(-job.jitter, job.jitter) * job.interval
+
+    async def _run_job(self, job: PeriodicJob) -> None:
+        loop = asyncio.get_running_loop()
+        stats = job.stats
+        next_tick = loop.time()
+
+        while True:
+            scheduled_at = next_tick + self._offset(job)
+            delay = scheduled_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started_at = loop.time()
+            lateness_ms = max(0.0, started_at - scheduled_at) * 1000
+            failed = False
+            try:
+                await job.func()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                failed = True
+                stats.failures += 1
+                stats.last_error = str(e)
+                logger.error(f"Periodic job {job.name} failed: {e}")
+
+            finished_at = loop.time()
+            duration_ms = (finished_at - started_at) * 1000
+            stats.runs += 1
+            stats.last_duration_ms = duration_ms
+            stats.total_duration_ms += duration_ms
+            stats.max_duration_ms = max(stats.max_duration_ms, duration_ms)
+            stats.last_lateness_ms = lateness_ms
+            stats.max_lateness_ms = max(stats.max_lateness_ms, lateness_ms)
+            stats.last_run_at = time.time()
+
+            overran = duration_ms > job.interval * 1000
+            if overran:
+                stats.overruns += 1
+                logger.warning(f"Periodic job {job.name} overran: {duration_ms:.1f}ms > {job.interval}s interval")
+
+            if self._on_job_complete is not None:
+                try:
+                    self._on_job_complete(job.name, duration_ms / 1000, failed, overran)
+                except Exception as e:
+                    logger.error(f"on_job_complete hook failed for {job.name}: {e}")
+
+            # Next grid point in the future; ticks that already passed are skipped, not replayed
+            next_tick += job.interval
+            if next_tick <= finished_at:
+                missed = int((finished_at - next_tick) // job.interval) + 1
+                stats.skipped_ticks += missed
+                next_tick += missed * job.interval
+
+    def stats(self) -> dict:
+        return {
+            name: {"interval": job.interval, "jitter": job.jitter, **job.stats.as_dict()}
+            for name, job in self._jobs.items()
+        }
@@ -0,0 +1,271 @@
+import time
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class UserEventWriteBehind:
+    """
+    Write-behind buffer for user events going to Central Backend.
+
+    Events are queued in a bounded in-process buffer keyed by IMEI and flushed in batches when
+    either `batch_size` events are pending or `flush_interval` seconds have passed. A newer event
+    for an IMEI that is still pending replaces the older one (it keeps its place in the queue),
+    so a flush window sends at most one event per user.
+
+    When the buffer is full, submit() waits up to `submit_timeout` seconds for a flush to make room
+    (backpressure) and returns False if there is still no room, so the caller can fall back to a
+    synchronous send. Must be started and stopped from the event loop that uses it.
+
+    Central Backend answers a batch with one status per event: rejected events are logged and
+    requeued up to `max_attempts` times. A keep-alive must not reach Central after a newer connect
+    of the same IMEI (Central links previous_bts_id by the latest timestamp, so a late keep-alive
+    of the old BTS would look like a move back to it): discard() drops pending events older than
+    the connect, here or on another BTS, and such events are not requeued either.
+    """
+
+    def __init__(
+        self,
+        *,
+        send_batch_async,
+        max_pending: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+        submit_timeout: float = 1.0,
+        max_attempts: int = 3,
+    ):
+        """
+        :param send_batch_async: async fn(list[dict]) -> list[dict], one response per event
+        :param max_pending: maximum number of distinct IMEIs waiting to be flushed
+        :param batch_size: events per upstream request; reaching it triggers a flush
+        :param flush_interval: seconds between time-triggered flushes
+        :param submit_timeout: seconds submit() waits for room when the buffer is full
+        :param max_attempts: times an event rejected by Central Backend is sent before it is dropped
+        """
+        self.send_batch_async = send_batch_async
+        self.max_pending = int(max_pending)
+        self.batch_size = int(batch_size)
+        self.flush_interval = float(flush_interval)
+        self.submit_timeout = float(submit_timeout)
+        self.max_attempts = int(max_attempts)
+
+        # imei -> (payload, first enqueued at, rejected attempts); insertion order == flush order
+        self._pending: dict[str, tuple[dict, float, int]] = {}
+        # imei -> latest connect (epoch seconds) learned while a flush was sending, checked on requeue
+        self._connected_during_flush: dict[str, float] = {}
+        self._flush_requested = asyncio.Event()
+        self._space_available = asyncio.Event()
+        self._space_available.set()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self._enqueued = 0
+        self._coalesced = 0
+        self._discarded = 0
+        self._dropped = 0
+        self._requeued = 0
+        self._rejected = 0
+        self._flushed_events = 0
+        self._flushed_batches = 0
+        self._failed_batches = 0
+        self._backpressure_waits = 0
+        self._backpressure_wait_seconds = 0.0
+        self._max_depth = 0
+        self._last_flush_ms = 0.0
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop(), name="user-event-write-behind")
+            logger.info(
+                f"UserEventWriteBehind started (batch_size={self.batch_size}, "
+                f"flush_interval={self.flush_interval}s, max_pending={self.max_pending})"
+            )
+
+    async def stop(self) -> None:
+        """Stop the flush loop and flush whatever is still pending."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        logger.info("UserEventWriteBehind stopped")
+
+    async def submit(self, imei: str, payload: dict) -> bool:
+        """Queue an event. Returns False if the buffer stayed full for submit_timeout seconds."""
+        if imei in self._pending:
+            self._pending[imei] = (payload, self._pending[imei][1], 0)
+            self._coalesced += 1
+            return True
+
+        if len(self._pending) >= self.max_pending:
+            self._backpressure_waits += 1
+            self._flush_requested.set()
+            started_at = time.perf_counter()
+            deadline = started_at + self.submit_timeout
+            while len(self._pending) >= self.max_pending:
+                self._space_available.clear()
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(self._space_available.wait(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            self._backpressure_wait_seconds += time.perf_counter() - started_at
+
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                return False
+
+        self._pending[imei] = (payload, time.monotonic(), 0)
+        self._enqueued += 1
+        self._max_depth = max(self._max_depth, len(self._pending))
+        if len(self._pending) >= self.batch_size:
+            self._flush_requested.set()
+        return True
+
+    @staticmethod
+    def event_time(payload: dict) -> Optional[float]:
+        """Epoch seconds of an event payload's timestamp (None if it has none)."""
+        try:
+            return datetime.fromisoformat(payload["timestamp"]).timestamp()
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def is_superseded(self, payload: dict, connected_at: float) -> bool:
+        event_time = self.event_time(payload)
+        return event_time is None or event_time <= connected_at
+
+    def discard(self, imei: str, connected_at: Optional[float] = None) -> bool:
+        """
+        Drop the pending event for imei if it is older than a connect of the IMEI at connected_at
+        (epoch seconds, default now): a connect to this BTS, or a removal from another BTS.
+        """
+        connected_at = time.time() if connected_at is None else connected_at
+        if self._flush_lock.locked():
+            # Events being sent right now may come back for a requeue
+            self._connected_during_flush[imei] = max(connected_at, self._connected_during_flush.get(imei, 0.0))
+
+        entry = self._pending.get(imei)
+        if entry is None or not self.is_superseded(entry[0], connected_at):
+            return False
+        del self._pending[imei]
+        self._discarded += 1
+        self._space_available.set()
+        return True
+
+    async def flush(self) -> int:
+        """Send everything pending, batch_size events per upstream request. Returns events sent."""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            started_at = time.perf_counter()
+            pending, self._pending = self._pending, {}
+            self._space_available.set()
+
+            items = list(pending.items())
+            sent = 0
+            try:
+                for offset in range(0, len(items), self.batch_size):
+                    chunk = items[offset:offset + self.batch_size]
+                    try:
+                        responses = await self.send_batch_async([payload for _, (payload, _, _) in chunk])
+                    except Exception as e:
+                        self._failed_batches += 1
+                        logger.error(f"UserEventWriteBehind failed to flush {len(chunk)} events: {e}")
+                        self._requeue(chunk, rejected=False)
+                        continue
+
+                    self._flushed_batches += 1
+                    responses = list(responses or [])
+                    rejected = [
+                        item for index, item in enumerate(chunk)
+                        if index >= len(responses) or not responses[index]
+                        or responses[index].get("status") != "success"
+                    ]
+                    if rejected:
+                        self._rejected += len(rejected)
+                        logger.warning(
+                            f"UserEventWriteBehind: Central Backend rejected {len(rejected)}/{len(chunk)} events "
+                            f"(IMEIs {', '.join(imei for imei, _ in rejected[:10])})"
+                        )
+                        self._requeue(rejected, rejected=True)
+                    sent += len(chunk) - len(rejected)
+            finally:
+                self._connected_during_flush = {}
+
+            self._flushed_events += sent
+            self._last_flush_ms = (time.perf_counter() - started_at) * 1000
+            return sent
+
+    def _requeue(self, chunk: list, rejected: bool) -> None:
+        """
+        Put unsent events back unless a newer event or connect for the same IMEI arrived meanwhile.
+        Events Central Backend rejected count an attempt; they are dropped after max_attempts.
+        """
+        for imei, (payload, enqueued_at, attempts) in chunk:
+            if rejected:
+                attempts += 1
+                if attempts >= self.max_attempts:
+                    self._dropped += 1
+                    logger.error(f"UserEventWriteBehind: dropping event of {imei} rejected {attempts} times")
+                    continue
+            if imei in self._pending:
+                continue
+            connected_at = self._connected_during_flush.get(imei)
+            if connected_at is not None and self.is_superseded(payload, connected_at):
+                self._discarded += 1
+                continue
+            if len(self._pending) >= self.max_pending:
+                self._dropped += 1
+                continue
+            self._pending[imei] = (payload, enqueued_at, attempts)
+            self._requeued += 1
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"UserEventWriteBehind flush loop error: {e}")
+
+    def stats(self) -> dict:
+        oldest_age = 0.0
+        if self._pending:
+            _, enqueued_at, _ = next(iter(self._pending.values()))
+            oldest_age = time.monotonic() - enqueued_at
+
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "fill_ratio": round(len(self._pending) / self.max_pending, 4) if self.max_pending else 0.0,
+            "max_depth": self._max_depth,
+            "oldest_pending_age_s": round(oldest_age, 3),
+            "enqueued": self._enqueued,
+            "coalesced": self._coalesced,
+            "discarded": self._discarded,
+            "dropped": self._dropped,
+            "requeued": self._requeued,
+            "rejected": self._rejected,
+            "flushed_events": self._flushed_events,
+            "flushed_batches": self._flushed_batches,
+            "failed_batches": self._failed_batches,
+            "backpressure_waits": self._backpressure_waits,
+            "backpressure_wait_s": round(self._backpressure_wait_seconds, 3),
+            "last_flush_ms": round(self._last_flush_ms, 3),
+        }
@@ -10,6 +10,8 @@ import io.swagger.v3.oas.annotations.responses.ApiResponse;
 import io.swagger.v3.oas.annotations.responses.ApiResponses;
 import jakarta.validation.Valid;
 import lombok.RequiredArgsConstructor;
+import org.springframework.http.HttpHeaders;
+import org.springframework.http.HttpStatus;
 import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.*;
 
@@ -27,14 +29,28 @@ public class BTSController {
             summary = "Get all BTS",
             description = "Retrieves a list of all Base Transceiver Stations from the registry"
     )
-    @ApiResponse(
-            responseCode = "200",
-            description = "Successfully retrieved list of BTS",
-            content = @Content(schema = @Schema(implementation = BTS.class))
-    )
+    @ApiResponses(value = {
+            @ApiResponse(
+                    responseCode = "200",
+                    description = "Successfully retrieved list of BTS",
+                    content = @Content(schema = @Schema(implementation = BTS.class))
+            ),
+            @ApiResponse(
+                    responseCode = "304",
+                    description = "Registry not modified since the ETag sent in If-None-Match",
+                    content = @Content
+            )
+    })
     @GetMapping
-    public ResponseEntity<List<BTS>> getAllBTS() {
-        return ResponseEntity.ok(btsService.getAllBTS());
+    public ResponseEntity<List<BTS>> getAllBTS(
+            @Parameter(description = "ETag of a previously fetched list")
+            @RequestHeader(value = HttpHeaders.IF_NONE_MATCH, required = false) String ifNoneMatch
+    ) {
+        String etag = "\"" + btsService.getRegistryVersion() + "\"";
+        if (etag.equals(ifNoneMatch)) {
+            return ResponseEntity.status(HttpStatus.NOT_MODIFIED).eTag(etag).build();
+        }
+        return ResponseEntity.ok().eTag(etag).body(btsService.getAllBTS());
     }
 
     @Operation(
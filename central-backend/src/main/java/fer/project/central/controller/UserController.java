@@ -1,5 +1,6 @@
 package fer.project.central.controller;
 
+import com.fasterxml.jackson.core.type.TypeReference;
 import com.fasterxml.jackson.databind.ObjectMapper;
 import fer.project.central.model.UserEventRequest;
 import fer.project.central.model.UserEventResponse;
@@ -13,6 +14,8 @@ import org.springframework.http.HttpStatus;
 import org.springframework.http.ResponseEntity;
 import org.springframework.web.bind.annotation.*;
 
+import java.util.ArrayList;
+import java.util.List;
 import java.util.Set;
 
 @RestController
@@ -51,4 +54,38 @@ public class UserController {
         UserEventResponse response = userService.processUserEvent(request);
         return ResponseEntity.ok(response);
     }
+
+    @Operation(
+            summary = "Process a batch of user events from BTS",
+            description = "Receives an array of user events in one request. Returns one result per event, in the same order; " +
+                    "events that fail validation or cannot be stored get status \"error\"; the other events are still stored."
+    )
+    @PostMapping("/batch")
+    public ResponseEntity<List<UserEventResponse>> processUserEvents(@RequestBody String rawBody) {
+
+        List<UserEventRequest> requests;
+        try {
+            requests = objectMapper.readValue(rawBody, new TypeReference<List<UserEventRequest>>() {});
+        } catch (Exception e) {
+            log.error("Failed to parse batch request body", e);
+            return ResponseEntity.status(HttpStatus.BAD_REQUEST).build();
+        }
+
+        // Invalid entries are replaced with null so the service answers them with an error at the same index
+        List<UserEventRequest> validated = new ArrayList<>(requests.size());
+        for (UserEventRequest request : requests) {
+            Set<ConstraintViolation<UserEventRequest>> violations =
+                    request == null ? Set.of() : validator.validate(request);
+            if (request == null || !violations.isEmpty()) {
+                log.warn("Validation failed for batch item: {}", violations);
+                validated.add(null);
+            } else {
+                validated.add(request);
+            }
+        }
+
+        log.info("Received batch of {} user events from BTS", requests.size());
+
+        return ResponseEntity.ok(userService.processUserEvents(validated));
+    }
 }
\ No newline at end of file
@@ -40,4 +40,10 @@ public class UserEventResponse {
         response.setData(new ResponseData(previousLocation, cdrId));
         return response;
     }
+
+    public static UserEventResponse error() {
+        UserEventResponse response = new UserEventResponse();
+        response.setStatus("error");
+        return response;
+    }
 }
@@ -7,4 +7,6 @@ import java.util.Optional;
 
 public interface BTSRepository extends JpaRepository<BTS, Long> {
     Optional<BTS> findByBtsId(String btsId);
+
+    Optional<BTS> findTopByOrderByUpdatedAtDesc();
 }
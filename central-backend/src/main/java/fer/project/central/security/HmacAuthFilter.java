@@ -39,11 +39,11 @@ public class HmacAuthFilter extends OncePerRequestFilter {
         String uri = request.getRequestURI();
         String method = request.getMethod();
 
-        boolean userIngest  = uri.equals("/api/v1/user") && method.equalsIgnoreCase("POST");
+        boolean userIngest  = (uri.equals("/api/v1/user") || uri.equals("/api/v1/user/batch")) && method.equalsIgnoreCase("POST");
         boolean btsRegister = uri.equals("/api/v1/bts")  && method.equalsIgnoreCase("POST");
         boolean btsStatus   = uri.matches("^/api/v1/bts/[^/]+/status$") && method.equalsIgnoreCase("PATCH");
 
-        // zaštiti samo ova 3 write endpointa
+        // zaštiti samo write endpointe (user, user/batch, bts, bts status)
         return !(userIngest || btsRegister || btsStatus);
     }
 
@@ -8,6 +8,7 @@ import lombok.RequiredArgsConstructor;
 import org.springframework.stereotype.Service;
 
 import java.time.LocalDateTime;
+import java.time.ZoneOffset;
 import java.util.List;
 
 @Service
@@ -20,6 +21,20 @@ public class BTSService {
         return btsRepository.findAll();
     }
 
+    /**
+     * Verzija registra za conditional GET (ETag): broj BTS-ova + zadnji updatedAt.
+     * Svaka promjena (registracija, promjena statusa) postavlja updatedAt, pa se verzija mijenja
+     * bez da se lista čita i serijalizira.
+     */
+    public String getRegistryVersion() {
+        long count = btsRepository.count();
+        String lastUpdate = btsRepository.findTopByOrderByUpdatedAtDesc()
+                .map(BTS::getUpdatedAt)
+                .map(updatedAt -> Long.toString(updatedAt.toEpochSecond(ZoneOffset.UTC) * 1_000_000_000L + updatedAt.getNano()))
+                .orElse("0");
+        return count + "-" + lastUpdate;
+    }
+
     public BTS getBTSByBtsId(String btsId) {
         return btsRepository.findByBtsId(btsId)
                 .orElseThrow(() -> new BtsNotFoundException(btsId));
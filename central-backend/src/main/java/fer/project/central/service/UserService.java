@@ -7,11 +7,16 @@ import fer.project.central.repository.CDRRepository;
 import lombok.RequiredArgsConstructor;
 import lombok.extern.slf4j.Slf4j;
 import org.springframework.stereotype.Service;
+import org.springframework.transaction.PlatformTransactionManager;
+import org.springframework.transaction.TransactionDefinition;
 import org.springframework.transaction.annotation.Transactional;
+import org.springframework.transaction.support.TransactionTemplate;
 
 import java.math.BigDecimal;
 import java.math.RoundingMode;
 import java.time.Duration;
+import java.util.ArrayList;
+import java.util.List;
 import java.util.Optional;
 
 /**
@@ -22,7 +27,6 @@ import java.util.Optional;
  * TODO for team:
  * - Add Redis caching for recent user locations
  * - Add async processing for high load scenarios
- * - Implement batch processing for multiple events
  * - Add metrics/monitoring
  * - Error handling improvements
  */
@@ -32,6 +36,7 @@ import java.util.Optional;
 public class UserService {
 
     private final CDRRepository cdrRepository;
+    private final PlatformTransactionManager transactionManager;
 
     /**
      * Process user event from BTS
@@ -69,6 +74,36 @@ public class UserService {
         return UserEventResponse.success(previousLocation, savedRecord.getId());
     }
 
+    /**
+     * Process a batch of user events from BTS, each event in its own transaction.
+     * Events are processed in order, so several events for the same IMEI chain their previous locations.
+     * Invalid events (null entries) and events that fail while being stored get an error response
+     * at the same index; the other events of the batch are still stored.
+     */
+    public List<UserEventResponse> processUserEvents(List<UserEventRequest> requests) {
+        log.debug("Processing batch of {} user events", requests.size());
+
+        // processUserEvent called through this is not proxied, so each item gets an explicit new transaction
+        TransactionTemplate itemTransaction = new TransactionTemplate(transactionManager);
+        itemTransaction.setPropagationBehavior(TransactionDefinition.PROPAGATION_REQUIRES_NEW);
+
+        List<UserEventResponse> responses = new ArrayList<>(requests.size());
+        for (int i = 0; i < requests.size(); i++) {
+            UserEventRequest request = requests.get(i);
+            if (request == null) {
+                responses.add(UserEventResponse.error());
+                continue;
+            }
+            try {
+                responses.add(itemTransaction.execute(status -> processUserEvent(request)));
+            } catch (RuntimeException e) {
+                log.error("Failed to process batch item {} for IMEI: {}", i, request.getImei(), e);
+                responses.add(UserEventResponse.error());
+            }
+        }
+        return responses;
+    }
+
     /**
      * Create CDR record from request
      */
@@ -179,6 +179,43 @@ CREATE TRIGGER trg_upsert_user_activity
 AFTER INSERT ON cdr_records
 FOR EACH ROW EXECUTE FUNCTION fn_upsert_user_activity();
 
+-- Change feed for the streaming anomaly detector (analytics/src/anomaly_detection/stream_detector.py).
+-- Notifications only wake the detector up; it reads new rows by its offset in detector_offsets.
+-- Statement-level triggers with an empty payload: one notification per insert statement, and Postgres
+-- folds identical notifications of one transaction into one, so a batch insert does not queue one per row.
+CREATE OR REPLACE FUNCTION fn_notify_cdr_insert() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('cdr_records', '');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_cdr_insert ON cdr_records;
+CREATE TRIGGER trg_notify_cdr_insert
+AFTER INSERT ON cdr_records
+FOR EACH STATEMENT EXECUTE FUNCTION fn_notify_cdr_insert();
+
+CREATE OR REPLACE FUNCTION fn_notify_bts_load() RETURNS trigger AS $$
+BEGIN
+  PERFORM pg_notify('bts_registry', '');
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_notify_bts_load ON bts_registry;
+CREATE TRIGGER trg_notify_bts_load
+AFTER INSERT OR UPDATE OF current_load ON bts_registry
+FOR EACH STATEMENT EXECUTE FUNCTION fn_notify_bts_load();
+
+-- Consumer offsets of the streaming anomaly detector; written in the same transaction as its alerts
+CREATE TABLE IF NOT EXISTS detector_offsets (
+    consumer VARCHAR(50) PRIMARY KEY,
+    last_cdr_id BIGINT NOT NULL DEFAULT 0,
+    pending_cdr_ids BIGINT[] NOT NULL DEFAULT '{}',
+    last_bts_update TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
 -- Sample Data Insertion (for testing purposes)
 -- INSERT INTO bts_registry (bts_id, lac, location_x, location_y, updated_at)
 -- VALUES ('BTS001','1001',0,0,now()),('BTS002','1001',12,-5,now()),('BTS003','1002',100,100,now())
@@ -1,80 +1,143 @@
-from quart import Quart, request, make_response, jsonify
-from quart_cors import cors
-from services.generate import generate
-from services.replay import replay
-from comms.api import connect, get_bts_map, send_keep_alive
-import os, csv, json
-from datetime import datetime
-from io import TextIOWrapper
-
-app = Quart(__name__)
-
-app = cors(app, allow_origin={os.environ.get(
-    "FRONTEND_URL", default="http://localhost:5002")})
-
-
-@app.route('/')
-async def status():
-    return "User Simulation Service is running."
-
-
-@app.route('/generate', methods=['post'])
-async def generate_users():
-    data = await request.get_json()
-
-    users = data.get('users')
-    actions = data.get('events')
-
-    async def generate_bridge(users, actions):
-        async for line in generate(users, actions):
-            line["timestamp"] = line["timestamp"].isoformat()
-            yield json.dumps(line) + "\n"
-
-    response = await make_response(generate_bridge(users, actions), {"content-type": "text/event-stream"})
-    response.timeout = None
-
-    return response
-
-@app.route('/replay', methods=['POST'])
-async def replay_actions():
-    files = await request.files
-    if 'file' not in files:
-        return "No file part", 400
-    f = files['file']
-    if f.filename == '':
-        return "No selected file", 400
-
-    f_wrapper = TextIOWrapper(f.stream, encoding="utf-8")
-    csv_reader = csv.DictReader(f_wrapper)
-    events = [(datetime.fromisoformat(i["timestamp"]), i["imei"], int(i["x"]), int(i["y"])) for i in csv_reader]
-
-    async def replay_bridge(events):
-        async for line in replay(events):
-            line["timestamp"] = line["timestamp"].isoformat()
-            yield json.dumps(line) + "\n"
-
-    response = await make_response(replay_bridge(events), {"Content-Type": "text/event-stream"})
-    response.timeout = None
-
-    return response
-
-@app.route('/connect', methods=['POST'])
-async def connect_endpoint():
-    data = await request.get_json()
-    x = data.get('x')
-    y = data.get('y')
-    imei = data.get('imei')
-    keepalive = data.get('keepalive')
-    timestamp = datetime.fromisoformat(data.get('timestamp'))
-
-    if keepalive:
-        response = await send_keep_alive(timestamp, imei, x, y)
-    else:
-        response = await connect(timestamp, imei, x, y)
-    return jsonify({"timestamp": timestamp.isoformat(), "imei": imei, "x": x, "y": y, "response": response})
-
-@app.route('/bts-locations', methods=['GET'])
-async def get_bts():
-    bts_map = get_bts_map()
-    locs = [{"bts_id": i["bts_id"], "x": i["bts_location"]["x"], "y": i["bts_location"]["y"]} for i in bts_map.values()]
-    return jsonify(locs)
+from quart import Quart, request, make_response, jsonify
+from quart_cors import cors
+from services.generate import generate, generate_open_loop, ARRIVALS
+from services.replay import replay
+from services.headless import simulate
+from comms.api import connect, get_bts_map, send_keep_alive, bts_discovery, bts_pool
+import os, csv, json
+from datetime import datetime
+from io import TextIOWrapper
+
+app = Quart(__name__)
+
+app = cors(app, allow_origin={os.environ.get(
+    "FRONTEND_URL", default="http://localhost:5002")})
+
+
+@app.before_serving
+async def start_discovery():
+    await bts_discovery.start()
+
+
+@app.after_serving
+async def stop_discovery():
+    await bts_discovery.stop()
+    await bts_pool.aclose()
+
+
+@app.route('/')
+async def status():
+    return "User Simulation Service is running."
+
+
+@app.route('/generate', methods=['post'])
+async def generate_users():
+    data = await request.get_json()
+
+    users = data.get('users')
+    actions = data.get('events')
+    # open loop when a target rate (events/s) is given, with periodic "report" lines in the stream
+    rate = data.get('rate')
+    arrivals = data.get('arrivals', 'poisson')
+    ramp_up = float(data.get('ramp_up', 0))
+    report_interval = float(data.get('report_interval', 1.0))
+
+    if rate is not None and (float(rate) <= 0 or arrivals not in ARRIVALS):
+        return jsonify({"error": f"rate must be > 0 and arrivals one of {', '.join(ARRIVALS)}"}), 400
+
+    async def generate_bridge(users, actions):
+        if rate is None:
+            lines = generate(users, actions)
+        else:
+            lines = generate_open_loop(users, actions, float(rate), arrivals, ramp_up, report_interval)
+        async for line in lines:
+            line["timestamp"] = line["timestamp"].isoformat()
+            yield json.dumps(line) + "\n"
+
+    response = await make_response(generate_bridge(users, actions), {"content-type": "text/event-stream"})
+    response.timeout = None
+
+    return response
+
+@app.route('/simulate', methods=['post'])
+async def simulate_users():
+    # headless mode: one progress line per tick instead of one line per user event
+    data = await request.get_json()
+
+    users = data.get('users')
+    ticks = data.get('ticks')
+    interval = float(data.get('interval', 1.0))
+    sample = data.get('sample')
+    rate = data.get('rate')
+    seed = data.get('seed')
+
+    async def simulate_bridge():
+        async for line in simulate(users, ticks, interval, sample=sample, rate=rate, seed=seed):
+            line["timestamp"] = line["timestamp"].isoformat()
+            yield json.dumps(line) + "\n"
+
+    response = await make_response(simulate_bridge(), {"content-type": "text/event-stream"})
+    response.timeout = None
+
+    return response
+
+@app.route('/replay', methods=['POST'])
+async def replay_actions():
+    files = await request.files
+    if 'file' not in files:
+        return "No file part", 400
+    f = files['file']
+    if f.filename == '':
+        return "No selected file", 400
+
+    # 1 = recorded pace, 10 = ten times faster, "max" = as fast as possible
+    form = await request.form
+    speed = form.get('speed', request.args.get('speed', '1'))
+    try:
+        speed = None if speed == 'max' else float(speed)
+    except ValueError:
+        return "Invalid speed", 400
+
+    # rows are parsed one by one while the replay runs, not read into a list up front
+    f_wrapper = TextIOWrapper(f.stream, encoding="utf-8")
+    csv_reader = csv.DictReader(f_wrapper)
+    events = ((datetime.fromisoformat(i["timestamp"]), i["imei"], int(i["x"]), int(i["y"])) for i in csv_reader)
+
+    async def replay_bridge(events):
+        async for line in replay(events, speed):
+            line["timestamp"] = line["timestamp"].isoformat()
+            yield json.dumps(line) + "\n"
+
+    response = await make_response(replay_bridge(events), {"Content-Type": "text/event-stream"})
+    response.timeout = None
+
+    return response
+
+@app.route('/connect', methods=['POST'])
+async def connect_endpoint():
+    data = await request.get_json()
+    x = data.get('x')
+    y = data.get('y')
+    imei = data.get('imei')
+    keepalive = data.get('keepalive')
+    timestamp = datetime.fromisoformat(data.get('timestamp'))
+
+    if keepalive:
+        response = await send_keep_alive(timestamp, imei, x, y)
+    else:
+        response = await connect(timestamp, imei, x, y)
+    return jsonify({"timestamp": timestamp.isoformat(), "imei": imei, "x": x, "y": y, "response": response})
+
+@app.route('/bts-locations', methods=['GET'])
+async def get_bts():
+    bts_map = get_bts_map()
+    locs = [{"bts_id": i["bts_id"], "x": i["bts_location"]["x"], "y": i["bts_location"]["y"]} for i in bts_map.values()]
+    return jsonify(locs)
+
+@app.route('/discovery', methods=['GET'])
+async def get_discovery_stats():
+    return jsonify(bts_discovery.stats())
+
+@app.route('/pool', methods=['GET'])
+async def get_pool_stats():
+    return jsonify(bts_pool.stats())
@@ -0,0 +1,87 @@
+"""
+closest BTS benchmark: linear closest_bts scan vs. BtsGridIndex (single and vectorised bulk queries).
+
+BTS are placed uniformly on an area that grows with their number (constant density, as when a
+simulation adds cells), users uniformly on the same area. Every index answer is checked against
+the linear scan.
+
+    cd simulator/backend
+    python -m benchmarks.closest_bts --bts 10 1000 10000 --users 10000
+"""
+
+import time
+import math
+import random
+import argparse
+import statistics
+
+import numpy as np
+
+from comms.bts_discovery import BTS_CUTOFF, closest_bts
+from comms.spatial_index import BtsGridIndex
+
+# one BTS per 200 x 200 units, like the docker-compose cells
+AREA_PER_BTS = 200 * 200
+
+
+def make_bts_map(n):
+    side = math.sqrt(n * AREA_PER_BTS)
+    return {
+        f"bts-{i}": {
+            "bts_id": f"bts-{i}",
+            "bts_location": {"x": random.uniform(0, side), "y": random.uniform(0, side)},
+            "connect": {"ip": "10.0.0.1", "port": 8080},
+        }
+        for i in range(n)
+    }, side
+
+
+def timed(fn):
+    started_at = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started_at) * 1000
+
+
+def run(n_bts, n_users, repeat):
+    bts_map, side = make_bts_map(n_bts)
+    xs = [random.uniform(0, side) for _ in range(n_users)]
+    ys = [random.uniform(0, side) for _ in range(n_users)]
+
+    index, build_ms = timed(lambda: BtsGridIndex(bts_map))
+
+    linear_ms, single_ms, bulk_ms = [], [], []
+    for _ in range(repeat):
+        expected, ms = timed(lambda: [closest_bts(x, y, bts_map) for x, y in zip(xs, ys)])
+        linear_ms.append(ms)
+        single, ms = timed(lambda: [index.nearest(x, y) for x, y in zip(xs, ys)])
+        single_ms.append(ms)
+        bulk, ms = timed(lambda: index.nearest_ids(np.array(xs), np.array(ys)))
+        bulk_ms.append(ms)
+
+    assert single == expected, "nearest() differs from closest_bts"
+    assert bulk == expected, "nearest_many() differs from closest_bts"
+
+    per_query = lambda ms: statistics.median(ms) * 1000 / n_users
+    print(
+        f"{n_bts:>6} BTS | build {build_ms:8.2f} ms | per query: linear {per_query(linear_ms):8.2f} us, "
+        f"index {per_query(single_ms):6.2f} us, bulk {per_query(bulk_ms):6.3f} us "
+        f"({statistics.median(linear_ms) / statistics.median(bulk_ms):6.1f}x)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bts", type=int, nargs="+", default=[10, 1000, 10000])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    print(f"{args.users} users per run, cutoff {BTS_CUTOFF}")
+    for n in args.bts:
+        run(n, args.users, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,10 @@
-from threading import Thread
 import random
 import sys
 from hashlib import sha256
 import httpx
-from comms.bts_discovery import scan_bts, closest_bts
+from comms.bts_discovery import BtsRegistry, BtsDiscoveryService
+from comms.spatial_index import BtsGridIndex
+from comms.pool import BtsClientPool
 import traceback
 
 
@@ -37,28 +38,46 @@ def sign(*args):
     return sha256(",".join(map(str, args)).encode()).hexdigest()
 
 
-bts_map = dict()
-bts_thread = Thread(target=scan_bts, args=(bts_map,), daemon=True)
-bts_thread.start()
+# BTS discovered from beacons; the listener runs in the app's event loop (started in app.py)
+bts_registry = BtsRegistry()
+bts_discovery = BtsDiscoveryService(bts_registry)
+
+# Spatial index over the registry, rebuilt for every registry version
+bts_index = BtsGridIndex()
+
+@bts_registry.add_listener
+def rebuild_bts_index(snapshot, version):
+    global bts_index
+    bts_index = BtsGridIndex(snapshot, version)
+
+# Keep-alive clients towards BTS endpoints; pools of BTS dropped by discovery are invalidated
+bts_pool = BtsClientPool()
+bts_registry.add_listener(bts_pool.on_registry_change)
 
 def get_bts_map():
-    return bts_map
+    return bts_registry.snapshot()
+
+def get_bts_index():
+    return bts_index
 
 last_bts = dict()
 
 # wipe state
 async def clear():
-    last_bts = dict()
+    last_bts.clear()
 
 # switched to go-inspired errors
 # not a fan, but exception handling isnt the best with async generators
 async def connect(timestamp, imei, x, y):
+    # one consistent version of the registry (and its index) for the whole request
+    index = bts_index
+    bts_map = index.bts_map
     if len(bts_map) == 0:
         return {"error": "No BTS found", "detail": "No BTS found (at all)"}
     last = last_bts.get(imei)
 
     if last is None or last not in bts_map:
-        last = closest_bts(x, y, bts_map)
+        last = index.nearest(x, y)
         last_bts[imei] = last
         if last is None:
             return {"error": "No BTS found", "detail": "No BTS found (in signal range)"}
@@ -71,23 +90,20 @@ async def connect(timestamp, imei, x, y):
 
     conn = bts_map[last]["connect"]
 
-    url = f"http://{conn['ip']}:{conn['port']}/api/v1/connect"
     try:
-        async with httpx.AsyncClient() as client:
-            d = await client.post(url, json=req_json, timeout=3.0)
-            print("LOGLOGLOG", d.status_code, d.text)
-            d = d.json()
-    except httpx.TimeoutException, Exception:
+        d = await bts_pool.post(last, conn, "/api/v1/connect", req_json)
+        d = d.json()
+    except Exception:
         traceback.print_exc()
         old = last
         last_bts[imei] = None
         print(f"Connection to BTS ({last}) failed. Removing from bts_map", file=sys.stderr)
-        return {"error": "Connect timeout", "detail": f"Connecting to {last} failed"}
+        return {"error": "Connect timeout", "bts_id": last, "detail": f"Connecting to {last} failed"}
     print(d, file=sys.stderr)
     if d.get('status') != "success":
         print(f"Error response from bts: {d}", file=sys.stderr)
         last_bts[imei] = None
-        return {"error": "Non-success status from bts", 
+        return {"error": "Non-success status from bts", "bts_id": last, 
                 "detail": f"{last} returned non-success status: {d.get('status')}", 
                 "response": d}
     # if d["data"]["action"] == "handover":
@@ -95,19 +111,22 @@ async def connect(timestamp, imei, x, y):
     #     # this creates a loop if both closest bts-es want us to handover,
     #     # but dont provide targets
     #     target = d["data"]["target_bts_id"] or \
-    #                closest_bts(x, y, {k:v for k,v in bts_map.items() if k != last})
+    #                index.nearest(x, y, exclude={last})
     #     print(f"handover requested from bts, next request will be towards {target}", file=sys.stderr)
     #     last_bts[imei] = target
-    return {"error": None, "detail": f"Connected successfully to {last}", "response": d}
+    return {"error": None, "bts_id": last, "detail": f"Connected successfully to {last}", "response": d}
     
 
 async def send_keep_alive(timestamp, imei, x, y):
+    # one consistent version of the registry (and its index) for the whole request
+    index = bts_index
+    bts_map = index.bts_map
     if len(bts_map) == 0:
         return {"error": "No BTS found", "detail": "No BTS found (at all)"}
     last = last_bts.get(imei)
 
     if last not in bts_map:
-        last = closest_bts(x, y, bts_map)
+        last = index.nearest(x, y)
         last_bts[imei] = last
     if last is None:
         return {"error": "No BTS found", "detail": "No BTS found (in signal range)"}
@@ -120,19 +139,17 @@ async def send_keep_alive(timestamp, imei, x, y):
     
     conn = bts_map[last]["connect"]
 
-    url = f"http://{conn['ip']}:{conn['port']}/api/v1/keepalive"
     try:
-        async with httpx.AsyncClient() as client:
-            d = await client.post(url, json=json, timeout=3.0)
-            d = d.json()
+        d = await bts_pool.post(last, conn, "/api/v1/keepalive", json)
+        d = d.json()
     except httpx.TimeoutException:
         last_bts[imei] = None
         print(f"Sending keep alive to BTS ({last}) failed. Removing from bts_map", file=sys.stderr)
-        return {"error": "Connect timeout", "detail": f"Sending keep alive to {last} failed"}
+        return {"error": "Connect timeout", "bts_id": last, "detail": f"Sending keep alive to {last} failed"}
     print(d, file=sys.stderr)
     if d.get('status') != "success":
         print(f"Error response from bts: {d}", file=sys.stderr)
-        return {"error": "Non-success status from bts", 
+        return {"error": "Non-success status from bts", "bts_id": last, 
                 "detail": f"{last} returned non-success status: {d.get('status')}", 
                 "response": d}
     if d["data"]["action"] == "handover":
@@ -140,12 +157,12 @@ async def send_keep_alive(timestamp, imei, x, y):
         # this creates a loop if both closest bts-es want us to handover,
         # but dont provide targets
         target = d["data"]["target_bts_id"] or \
-                   closest_bts(x, y, {k:v for k,v in bts_map.items() if k != last})
+                   index.nearest(x, y, exclude={last})
         print(f"handover requested from bts, next request will be towards {target}", file=sys.stderr)
         last_bts[imei] = target
-        return {"error": None, 
+        return {"error": None, "bts_id": last, 
                 "detail": f"Sent keep alive successfully to {last}, asked to handover",
                 "action": "handover",
                 "response": d}
     
-    return {"error": None, "detail": f"Sent keep alive successfully to {last}", "response": d}
+    return {"error": None, "bts_id": last, "detail": f"Sent keep alive successfully to {last}", "response": d}
@@ -0,0 +1,61 @@
+import json
+import socket
+import struct
+from datetime import datetime
+
+# BTS beacon decoder. The wire format is defined next to the encoder in
+# bts-service/src/beacon.py; keep both in sync. The first byte selects the format:
+# '{' (0x7B) is the original JSON beacon, anything else is the version of a binary beacon.
+
+JSON_MARKER = ord("{")
+BEACON_VERSION = 1
+BEACON_HEADER = struct.Struct("!BdddIH")
+BEACON_MAX_SIZE = 2048  # receive buffer, larger than any beacon of either format
+
+
+def _short_string(view, offset):
+    if offset >= len(view):
+        raise ValueError("Truncated beacon")
+    length = view[offset]
+    end = offset + 1 + length
+    if end > len(view):
+        raise ValueError("Truncated beacon")
+    # str() decodes straight from the buffer, the slice of a memoryview does not copy
+    return str(view[offset + 1:end], "utf-8"), end
+
+
+def decode_beacon(data):
+    """
+    Decode one beacon (bytes, bytearray or memoryview) into the BTS map entry:
+    {"bts_id", "lac", "bts_location": {"x", "y"}, "connect": {"ip", "port"[, "path"]}, "last_ping"}.
+    Raises ValueError for an unknown version or a malformed beacon.
+    """
+    view = memoryview(data)
+    if not len(view):
+        raise ValueError("Empty beacon")
+
+    if view[0] == JSON_MARKER:
+        beacon = json.loads(str(view, "utf-8"))
+        beacon["last_ping"] = datetime.fromisoformat(beacon.pop("time"))
+        return beacon
+
+    if view[0] != BEACON_VERSION:
+        raise ValueError(f"Unsupported beacon version {view[0]}")
+    if len(view) < BEACON_HEADER.size:
+        raise ValueError("Truncated beacon")
+
+    _, timestamp, x, y, ip, port = BEACON_HEADER.unpack_from(view, 0)
+    bts_id, offset = _short_string(view, BEACON_HEADER.size)
+    lac, offset = _short_string(view, offset)
+    path, offset = _short_string(view, offset)
+
+    connect = {"ip": socket.inet_ntoa(struct.pack("!I", ip)), "port": port}
+    if path:
+        connect["path"] = path
+    return {
+        "bts_id": bts_id,
+        "lac": lac,
+        "bts_location": {"x": x, "y": y},
+        "connect": connect,
+        "last_ping": datetime.fromtimestamp(timestamp),
+    }
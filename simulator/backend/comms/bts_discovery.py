@@ -1,30 +1,170 @@
+import asyncio
 import math
 import socket
 import sys
-import json
-from datetime import datetime, timedelta
+import time
+from types import MappingProxyType
+from comms.beacon import decode_beacon
 
 UDP_PORT = 5000
 BTS_CUTOFF = 175.0 # u bts-servisu je MAX_DISTANCE za handoff 150 units
+BTS_TTL = 30.0 # seconds without a beacon before a BTS is evicted
 
-def scan_bts(bts_map):
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", UDP_PORT))
 
-    while True:
+class BtsRegistry:
+    """
+    BTS map built from beacons, read by the request path while discovery updates it.
+
+    Copy-on-write: every change (new BTS, changed location or endpoint, eviction) builds a new dict and
+    bumps `version`; `snapshot()` returns the current read-only mapping, so a reader iterates one
+    consistent version and never sees it mutate. A beacon that only confirms an unchanged BTS just
+    refreshes its last-seen time and copies nothing.
+    Listeners added with `add_listener(fn)` are called as fn(snapshot, version) after every change,
+    e.g. to rebuild a spatial index.
+    """
+
+    def __init__(self, ttl=BTS_TTL):
+        self.ttl = ttl
+        self.version = 0
+        self._entries = MappingProxyType({})
+        self._last_seen = dict()  # bts_id -> time.monotonic() of the last beacon
+        self._listeners = []
+
+    def snapshot(self):
+        return self._entries
+
+    def add_listener(self, fn):
+        self._listeners.append(fn)
+        return fn
+
+    def remove_listener(self, fn):
+        if fn in self._listeners:
+            self._listeners.remove(fn)
+
+    def _publish(self, entries):
+        self._entries = MappingProxyType(entries)
+        self.version += 1
+        for fn in list(self._listeners):
+            try:
+                fn(self._entries, self.version)
+            except Exception as e:
+                print(f"Error in bts registry listener: {e}", file=sys.stderr)
+
+    def update(self, beacon, now=None):
+        """Record a decoded beacon. Returns True if it changed the registry."""
+        entry = {k: v for k, v in beacon.items() if k != "last_ping"}
+        bts_id = entry["bts_id"]
+        self._last_seen[bts_id] = time.monotonic() if now is None else now
+
+        if self._entries.get(bts_id) == entry:
+            return False
+        entries = dict(self._entries)
+        entries[bts_id] = entry
+        self._publish(entries)
+        return True
+
+    def evict_expired(self, now=None):
+        """Remove every BTS not heard from for `ttl` seconds. Returns the evicted ids."""
+        now = time.monotonic() if now is None else now
+        expired = [bts_id for bts_id, seen in self._last_seen.items() if now - seen > self.ttl]
+        if not expired:
+            return []
+
+        entries = dict(self._entries)
+        for bts_id in expired:
+            del self._last_seen[bts_id]
+            entries.pop(bts_id, None)
+        self._publish(entries)
+        return expired
+
+    def discard(self, bts_id):
+        """Forget one BTS right away (e.g. it stopped answering); a new beacon brings it back."""
+        self._last_seen.pop(bts_id, None)
+        if bts_id in self._entries:
+            entries = dict(self._entries)
+            del entries[bts_id]
+            self._publish(entries)
+
+    def clear(self):
+        self._last_seen.clear()
+        if self._entries:
+            self._publish({})
+
+    def stats(self):
+        return {"bts": len(self._entries), "version": self.version, "ttl": self.ttl}
+
+
+class BtsDiscoveryProtocol(asyncio.DatagramProtocol):
+    """Feeds every received beacon (binary or JSON) into a BtsRegistry, on the event loop."""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.received = 0
+        self.invalid = 0
+
+    def datagram_received(self, data, addr):
+        self.received += 1
         try:
-            data, addr = sock.recvfrom(1024)
-            data = json.loads(data.decode("utf-8"))
-            bts_id = data["bts_id"]
-            data["last_ping"] = datetime.fromisoformat(data["time"])
-            del data["time"]
-            bts_map[bts_id] = data
-            now = datetime.now()
-            for k in bts_map.keys():
-                if bts_map[k]["last_ping"] - now > timedelta(seconds=30):
-                    del bts_map[k]
+            self.registry.update(decode_beacon(data))
         except Exception as e:
-            print(f"Error in bts listener: {e}", file=sys.stderr)
+            self.invalid += 1
+            print(f"Invalid beacon from {addr}: {e}", file=sys.stderr)
+
+    def error_received(self, exc):
+        print(f"Error in bts listener: {exc}", file=sys.stderr)
+
+
+class BtsDiscoveryService:
+    """
+    UDP beacon listener running inside the application's event loop (no thread).
+    Start it once the loop runs (Quart before_serving) and stop it on shutdown.
+    """
+
+    def __init__(self, registry, port=UDP_PORT, evict_interval=None):
+        self.registry = registry
+        self.port = port
+        self.evict_interval = evict_interval or max(1.0, registry.ttl / 3)
+        self.protocol = None
+        self._transport = None
+        self._evict_task = None
+
+    async def start(self):
+        if self._transport is not None:
+            return
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind(("", self.port))
+        self._transport, self.protocol = await loop.create_datagram_endpoint(
+            lambda: BtsDiscoveryProtocol(self.registry), sock=sock
+        )
+        self._evict_task = asyncio.create_task(self._evict_loop())
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(self.evict_interval)
+            evicted = self.registry.evict_expired()
+            if evicted:
+                print(f"Evicted stale BTS: {', '.join(evicted)}", file=sys.stderr)
+
+    async def stop(self):
+        if self._evict_task is not None:
+            self._evict_task.cancel()
+            try:
+                await self._evict_task
+            except asyncio.CancelledError:
+                pass
+            self._evict_task = None
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+    def stats(self):
+        return {
+            **self.registry.stats(),
+            "beacons": self.protocol.received if self.protocol else 0,
+            "invalid": self.protocol.invalid if self.protocol else 0,
+        }
 
 
 def dist(p1, p2):
@@ -40,7 +180,7 @@ def closest_bts(x, y, bts_map, cutoff=BTS_CUTOFF):
         p1 = (x, y)
         p2 = (v["bts_location"]["x"], v["bts_location"]["y"])
         d = dist(p1, p2)
-        if d < min_d and d < BTS_CUTOFF:
+        if d < min_d and d < cutoff:
             min_d = d
             min_bts_id = k
     return min_bts_id
@@ -0,0 +1,160 @@
+import asyncio
+import os
+import sys
+import time
+
+import httpx
+
+BTS_MAX_CONNECTIONS = int(os.environ.get("BTS_MAX_CONNECTIONS", 100))  # per BTS endpoint
+BTS_MAX_KEEPALIVE = int(os.environ.get("BTS_MAX_KEEPALIVE", 20))  # idle connections kept per endpoint
+BTS_KEEPALIVE_EXPIRY = float(os.environ.get("BTS_KEEPALIVE_EXPIRY", 30.0))  # seconds
+BTS_CONCURRENCY = int(os.environ.get("BTS_CONCURRENCY", 64))  # in-flight requests per BTS
+BTS_TIMEOUT = float(os.environ.get("BTS_TIMEOUT", 3.0))
+
+
+def endpoint_of(conn):
+    """Connection pools are per endpoint: cells of a multi-cell host share one (ip, port)."""
+    return (conn["ip"], int(conn["port"]))
+
+
+class BtsStats:
+    __slots__ = ("requests", "errors", "in_flight", "waiting", "total_time")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.total_time = 0.0
+
+    def as_dict(self):
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "avg_ms": round(self.total_time / self.requests * 1000, 3) if self.requests else None,
+        }
+
+
+class BtsClientPool:
+    """
+    Keep-alive HTTP clients for simulator -> BTS traffic, instead of a new httpx.AsyncClient
+    (and new TCP connections) for every UE event.
+
+    One httpx.AsyncClient per BTS endpoint, bounded by max_connections / max_keepalive, and a
+    semaphore per BTS capping its in-flight requests, so a burst towards one cell waits here
+    instead of piling up connections. Register `on_registry_change` as a BtsRegistry listener:
+    when discovery drops a BTS (or it moves to another endpoint) its semaphore and stats are
+    dropped and clients of endpoints no BTS uses any more are closed.
+    """
+
+    def __init__(
+        self,
+        max_connections=BTS_MAX_CONNECTIONS,
+        max_keepalive=BTS_MAX_KEEPALIVE,
+        keepalive_expiry=BTS_KEEPALIVE_EXPIRY,
+        concurrency=BTS_CONCURRENCY,
+        timeout=BTS_TIMEOUT,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.concurrency = concurrency
+        self.timeout = timeout
+
+        self._clients = dict()  # (ip, port) -> httpx.AsyncClient
+        self._endpoints = dict()  # bts_id -> (ip, port) it was last used with
+        self._semaphores = dict()  # bts_id -> asyncio.Semaphore
+        self._stats = dict()  # bts_id -> BtsStats
+        self.clients_opened = 0
+        self.clients_closed = 0
+
+    def _client(self, endpoint):
+        client = self._clients.get(endpoint)
+        if client is None:
+            client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+            self._clients[endpoint] = client
+            self.clients_opened += 1
+        return client
+
+    async def post(self, bts_id, conn, path, json):
+        """POST json to the BTS at conn (beacon "connect" entry) + path, through its pooled client."""
+        endpoint = endpoint_of(conn)
+        if self._endpoints.get(bts_id) not in (None, endpoint):
+            self._forget(bts_id)
+        self._endpoints[bts_id] = endpoint
+
+        semaphore = self._semaphores.get(bts_id)
+        if semaphore is None:
+            semaphore = self._semaphores[bts_id] = asyncio.Semaphore(self.concurrency)
+        stats = self._stats.get(bts_id)
+        if stats is None:
+            stats = self._stats[bts_id] = BtsStats()
+
+        # path is set by cells of a multi-cell BTS host
+        url = f"http://{endpoint[0]}:{endpoint[1]}{conn.get('path', '')}{path}"
+        stats.waiting += 1
+        async with semaphore:
+            stats.waiting -= 1
+            stats.in_flight += 1
+            started_at = time.perf_counter()
+            try:
+                return await self._client(endpoint).post(url, json=json)
+            except Exception:
+                stats.errors += 1
+                raise
+            finally:
+                stats.in_flight -= 1
+                stats.requests += 1
+                stats.total_time += time.perf_counter() - started_at
+
+    def _forget(self, bts_id):
+        self._endpoints.pop(bts_id, None)
+        self._semaphores.pop(bts_id, None)
+        self._stats.pop(bts_id, None)
+
+    def on_registry_change(self, snapshot, version):
+        """BtsRegistry listener: invalidate pools of BTS that are gone or changed endpoint."""
+        for bts_id, endpoint in list(self._endpoints.items()):
+            entry = snapshot.get(bts_id)
+            if entry is None or endpoint_of(entry["connect"]) != endpoint:
+                self._forget(bts_id)
+
+        in_use = {endpoint_of(v["connect"]) for v in snapshot.values()}
+        for endpoint in [e for e in self._clients if e not in in_use]:
+            self._close_later(self._clients.pop(endpoint))
+
+    def _close_later(self, client):
+        self.clients_closed += 1
+        try:
+            asyncio.get_running_loop().create_task(client.aclose())
+        except RuntimeError:
+            # no running loop (shutdown): nothing left to flush, the sockets go with the process
+            pass
+
+    async def aclose(self):
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            try:
+                await client.aclose()
+            except Exception as e:
+                print(f"Error closing bts client: {e}", file=sys.stderr)
+        self.clients_closed += len(clients)
+
+    def stats(self):
+        return {
+            "limits": {
+                "max_connections": self.limits.max_connections,
+                "max_keepalive": self.limits.max_keepalive_connections,
+                "keepalive_expiry": self.limits.keepalive_expiry,
+                "concurrency": self.concurrency,
+            },
+            "endpoints": [f"{ip}:{port}" for ip, port in self._clients],
+            "clients_opened": self.clients_opened,
+            "clients_closed": self.clients_closed,
+            "bts": {bts_id: s.as_dict() for bts_id, s in self._stats.items()},
+        }
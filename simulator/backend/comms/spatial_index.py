@@ -0,0 +1,155 @@
+import math
+import heapq
+from types import MappingProxyType
+
+import numpy as np
+
+from comms.bts_discovery import BTS_CUTOFF
+
+
+class BtsGridIndex:
+    """
+    Uniform grid over BTS locations for closest-BTS lookups.
+
+    Built once per registry version (BtsRegistry listener) and never changed afterwards, so a request
+    can keep using the index and its `bts_map` as one consistent view. With the cell size equal to the
+    cutoff, a nearest-within-cutoff query only looks at the 3x3 cells around the point, whatever the
+    number of BTS. nearest_many() answers the same query for many points at once with NumPy: BTS are
+    laid out in a dense (cells x, cells y, slots) table, so all candidates are gathered and compared
+    as arrays.
+    """
+
+    def __init__(self, bts_map=None, version=0, cell_size=BTS_CUTOFF):
+        self.bts_map = bts_map if bts_map is not None else MappingProxyType({})
+        self.version = version
+        self.cell_size = float(cell_size)
+
+        self.ids = list(self.bts_map.keys())
+        self.xs = np.array([v["bts_location"]["x"] for v in self.bts_map.values()], dtype=np.float64)
+        self.ys = np.array([v["bts_location"]["y"] for v in self.bts_map.values()], dtype=np.float64)
+
+        # grid cell -> indices into ids/xs/ys
+        self._cells = dict()
+        for i, (x, y) in enumerate(zip(self.xs.tolist(), self.ys.tolist())):
+            self._cells.setdefault(self._cell(x, y), []).append(i)
+
+        self._build_table()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def _build_table(self):
+        """Dense copy of the grid for vectorised queries, padded by one empty cell on every side."""
+        if not self.ids:
+            self._table = np.full((1, 1, 1), -1, dtype=np.int64)
+            self._origin = (0, 0)
+            return
+
+        cxs = [c[0] for c in self._cells]
+        cys = [c[1] for c in self._cells]
+        self._origin = (min(cxs) - 1, min(cys) - 1)
+        width = max(cxs) - min(cxs) + 3
+        height = max(cys) - min(cys) + 3
+        slots = max(len(indices) for indices in self._cells.values())
+
+        self._table = np.full((width, height, slots), -1, dtype=np.int64)
+        for (cx, cy), indices in self._cells.items():
+            self._table[cx - self._origin[0], cy - self._origin[1], :len(indices)] = indices
+
+    def _ring(self, cx, cy, r):
+        """Grid cells at Chebyshev distance exactly r from (cx, cy)."""
+        if r == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-r, r + 1):
+            yield (cx + dx, cy - r)
+            yield (cx + dx, cy + r)
+        for dy in range(-r + 1, r):
+            yield (cx - r, cy + dy)
+            yield (cx + r, cy + dy)
+
+    def nearest(self, x, y, cutoff=BTS_CUTOFF, exclude=()):
+        """Closest BTS strictly within cutoff of (x, y), skipping ids in exclude; None if there is none."""
+        cx, cy = self._cell(x, y)
+        radius = math.ceil(cutoff / self.cell_size)
+        best_d, best_id = cutoff, None
+        for dx in range(-radius, radius + 1):
+            for dy in range(-radius, radius + 1):
+                for i in self._cells.get((cx + dx, cy + dy), ()):
+                    bts_id = self.ids[i]
+                    if bts_id in exclude:
+                        continue
+                    d = math.hypot(self.xs[i] - x, self.ys[i] - y)
+                    if d < best_d:
+                        best_d, best_id = d, bts_id
+        return best_id
+
+    def k_nearest(self, x, y, k, max_distance=math.inf):
+        """Up to k (bts_id, distance) pairs closest to (x, y), nearest first, within max_distance."""
+        if k <= 0 or not self.ids:
+            return []
+        cx, cy = self._cell(x, y)
+        # largest ring that can still hold a BTS
+        max_ring = max(max(abs(c[0] - cx), abs(c[1] - cy)) for c in self._cells)
+
+        heap = []  # max-heap of the k best as (-distance, index)
+        for r in range(max_ring + 1):
+            # every BTS in ring r or beyond is at least (r - 1) * cell_size away
+            bound = (r - 1) * self.cell_size
+            if bound > max_distance or (len(heap) == k and bound >= -heap[0][0]):
+                break
+            for cell in self._ring(cx, cy, r):
+                for i in self._cells.get(cell, ()):
+                    d = math.hypot(self.xs[i] - x, self.ys[i] - y)
+                    if d > max_distance:
+                        continue
+                    if len(heap) < k:
+                        heapq.heappush(heap, (-d, i))
+                    elif d < -heap[0][0]:
+                        heapq.heapreplace(heap, (-d, i))
+
+        return [(self.ids[i], -neg_d) for neg_d, i in sorted(heap, reverse=True)]
+
+    def nearest_many(self, xs, ys, cutoff=BTS_CUTOFF):
+        """
+        Vectorised nearest() for many points. Returns an array of BTS indices into `ids`
+        (-1 where no BTS is within cutoff) and the matching distances (inf where none).
+        """
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        if not self.ids or not len(xs):
+            return np.full(len(xs), -1, dtype=np.int64), np.full(len(xs), np.inf)
+
+        radius = math.ceil(cutoff / self.cell_size)
+        width, height, _ = self._table.shape
+        # Points more than one cell outside the grid cannot be within cutoff of any BTS;
+        # clipping them onto the empty padding keeps the gather in bounds
+        cx = np.clip(np.floor(xs / self.cell_size).astype(np.int64) - self._origin[0], 0, width - 1)
+        cy = np.clip(np.floor(ys / self.cell_size).astype(np.int64) - self._origin[1], 0, height - 1)
+
+        offsets = np.arange(-radius, radius + 1)
+        gx = np.clip(cx[:, None, None] + offsets[None, :, None], 0, width - 1)
+        gy = np.clip(cy[:, None, None] + offsets[None, None, :], 0, height - 1)
+        candidates = self._table[gx, gy].reshape(len(xs), -1)  # (points, cells * slots), -1 = empty
+
+        # empty slots point at an extra BTS at infinity; compare squared distances, one sqrt at the end
+        far_xs = np.append(self.xs, np.inf)
+        far_ys = np.append(self.ys, np.inf)
+        dx = far_xs[candidates] - xs[:, None]
+        dy = far_ys[candidates] - ys[:, None]
+        d2 = dx * dx + dy * dy
+
+        rows = np.arange(len(xs))
+        best = np.argmin(d2, axis=1)
+        best_d = np.sqrt(d2[rows, best])
+        found = best_d < cutoff
+        best_index = np.where(found, candidates[rows, best], -1)
+        return best_index, np.where(found, best_d, np.inf)
+
+    def nearest_ids(self, xs, ys, cutoff=BTS_CUTOFF):
+        """nearest_many() as a list of bts_id / None, e.g. to assign thousands of simulated users at once."""
+        indices, _ = self.nearest_many(xs, ys, cutoff)
+        return [self.ids[i] if i >= 0 else None for i in indices.tolist()]
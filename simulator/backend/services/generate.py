@@ -1,71 +1,287 @@
-from datetime import datetime
-from comms.api import gen_imei, connect, send_keep_alive
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from constants import X_MAX, X_MIN, Y_MAX, Y_MIN
-import random
-import time
-import asyncio
-import math
-from aiostream import stream
-
-
-async def simulate_actions(imei, num_actions):
-    x = float(random.randint(X_MIN, X_MAX))
-    y = float(random.randint(Y_MIN, Y_MAX))
-    
-    base_speed = random.uniform(5.0, 30.0)
-
-    should_connect = True
-
-    for _ in range(num_actions):
-        if random.random() < 0.15:
-            pass
-        else:
-            while True:
-                angle = random.uniform(0, 2 * math.pi)
-                step_size = base_speed * random.uniform(0.75, 1.25)
-                new_x = x + step_size * math.cos(angle)
-                new_y = y + step_size * math.sin(angle)
-
-                if X_MIN <= new_x <= X_MAX and Y_MIN <= new_y <= Y_MAX:
-                    x = new_x
-                    y = new_y
-                    break
-
-        timestamp = datetime.now()
-        
-        final_x, final_y = int(x), int(y)
-
-        if (should_connect):
-            response = await connect(timestamp, imei, final_x, final_y)
-            inner_response = response.get("response", {})
-            data = inner_response.get("data", {})
-            if data.get("action") == "disconnect":
-                should_connect = True
-            else:
-                should_connect = False
-        else:
-            response = await send_keep_alive(timestamp, imei, final_x, final_y)
-            inner_response = response.get("response", {})
-            data = inner_response.get("data", {})
-            if (data.get("action") == "handover"):
-                should_connect = True
-            if (data.get("action") == "disconnect"):
-                should_connect = True
-
-        yield {
-            "timestamp": timestamp, "imei": imei, 
-            "x": final_x, "y": final_y, 
-            "response": response
-        }
-        await asyncio.sleep(random.random() * 2)
-
-
-async def generate(num_users, num_actions):
-    imeis = [gen_imei() for _ in range(num_users)]
-    tasks = [simulate_actions(imei, num_actions) for imei in imeis]
-    
-    combined = stream.merge(*tasks)
-    async with combined.stream() as streamer:
-        async for item in streamer:
-            yield item
+from datetime import datetime
+from comms.api import gen_imei, connect, send_keep_alive
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import deque
+from constants import X_MAX, X_MIN, Y_MAX, Y_MIN
+import random
+import time
+import asyncio
+import math
+from aiostream import stream
+
+
+def random_step(x, y, base_speed):
+    if random.random() < 0.15:
+        return x, y
+    while True:
+        angle = random.uniform(0, 2 * math.pi)
+        step_size = base_speed * random.uniform(0.75, 1.25)
+        new_x = x + step_size * math.cos(angle)
+        new_y = y + step_size * math.sin(angle)
+
+        if X_MIN <= new_x <= X_MAX and Y_MIN <= new_y <= Y_MAX:
+            return new_x, new_y
+
+
+async def send_event(timestamp, imei, x, y, should_connect):
+    """Send a connect or keepalive; returns the response and whether the next event is a connect."""
+    if (should_connect):
+        response = await connect(timestamp, imei, x, y)
+        inner_response = response.get("response", {})
+        data = inner_response.get("data", {})
+        if data.get("action") == "disconnect":
+            should_connect = True
+        else:
+            should_connect = False
+    else:
+        response = await send_keep_alive(timestamp, imei, x, y)
+        inner_response = response.get("response", {})
+        data = inner_response.get("data", {})
+        if (data.get("action") == "handover"):
+            should_connect = True
+        if (data.get("action") == "disconnect"):
+            should_connect = True
+    return response, should_connect
+
+
+async def simulate_actions(imei, num_actions):
+    x = float(random.randint(X_MIN, X_MAX))
+    y = float(random.randint(Y_MIN, Y_MAX))
+
+    base_speed = random.uniform(5.0, 30.0)
+
+    should_connect = True
+
+    for _ in range(num_actions):
+        x, y = random_step(x, y, base_speed)
+
+        timestamp = datetime.now()
+
+        final_x, final_y = int(x), int(y)
+
+        response, should_connect = await send_event(timestamp, imei, final_x, final_y, should_connect)
+
+        yield {
+            "timestamp": timestamp, "imei": imei,
+            "x": final_x, "y": final_y,
+            "response": response
+        }
+        await asyncio.sleep(random.random() * 2)
+
+
+async def generate(num_users, num_actions):
+    imeis = [gen_imei() for _ in range(num_users)]
+    tasks = [simulate_actions(imei, num_actions) for imei in imeis]
+
+    combined = stream.merge(*tasks)
+    async with combined.stream() as streamer:
+        async for item in streamer:
+            yield item
+
+
+# ---------------------------------------------------------------------------
+# Open loop: events arrive at a target rate, whatever the BTS response times
+# ---------------------------------------------------------------------------
+
+ARRIVALS = ("poisson", "uniform")
+
+
+def arrival_times(rate, arrivals="poisson", ramp_up=0.0):
+    """
+    Endless offsets (seconds from the start) of event arrivals at `rate` events/s.
+
+    With ramp_up the rate grows linearly from 0 to `rate` over ramp_up seconds. Arrivals are spaced
+    in "expected events" (exponential gaps for Poisson, 1 for uniform) and mapped to time through the
+    inverse of the cumulative rate, so both profiles follow the ramp exactly.
+    """
+    if arrivals not in ARRIVALS:
+        raise ValueError(f"Unknown arrivals {arrivals}, expected one of {', '.join(ARRIVALS)}")
+    ramp_events = rate * ramp_up / 2  # expected events during the ramp
+    expected = 0.0
+    while True:
+        expected += random.expovariate(1.0) if arrivals == "poisson" else 1.0
+        if expected < ramp_events:
+            yield math.sqrt(2 * expected * ramp_up / rate)
+        else:
+            yield ramp_up + (expected - ramp_events) / rate
+
+
+class LatencyHistogram:
+    """
+    Latencies counted in logarithmic buckets 1% wide (from 1 us), so memory is bounded by the latency
+    range rather than the number of events and percentiles() does not sort the samples.
+    Reported percentiles are bucket midpoints, within 0.5% of the exact value.
+    """
+    __slots__ = ("buckets", "count")
+
+    BASE = 1.01
+    MIN_LATENCY = 1e-6
+
+    def __init__(self):
+        self.buckets = dict()  # bucket index -> count
+        self.count = 0
+
+    def add(self, seconds):
+        index = math.floor(math.log(max(seconds, self.MIN_LATENCY) / self.MIN_LATENCY, self.BASE))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+
+    def merge(self, other):
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.count += other.count
+        return self
+
+    def percentiles(self):
+        if not self.count:
+            return {"count": 0}
+        quantiles = {"p50_ms": 0.50, "p95_ms": 0.95, "p99_ms": 0.99}
+        ranks = {name: min(self.count - 1, int(q * self.count)) for name, q in quantiles.items()}
+        result = {"count": self.count}
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            for name in [name for name, rank in ranks.items() if rank < seen]:
+                result[name] = round(self.MIN_LATENCY * self.BASE ** (index + 0.5) * 1000, 3)
+                del ranks[name]
+            if not ranks:
+                break
+        return result
+
+
+class OpenLoopUser:
+    __slots__ = ("imei", "x", "y", "base_speed", "should_connect", "remaining", "lock")
+
+    def __init__(self, imei, num_actions):
+        self.imei = imei
+        self.x = float(random.randint(X_MIN, X_MAX))
+        self.y = float(random.randint(Y_MIN, Y_MAX))
+        self.base_speed = random.uniform(5.0, 30.0)
+        self.should_connect = True
+        self.remaining = num_actions
+        # events of one user are sent in order; later arrivals queue behind a slow one
+        self.lock = asyncio.Lock()
+
+
+class OpenLoopGenerator:
+    """
+    Open-loop load: event i is due at arrival_times()[i] no matter how many are still in flight,
+    so a slow BTS builds up a backlog instead of quietly lowering the offered load (as the sleep
+    after each response in simulate_actions does). Latency is measured from the scheduled arrival,
+    so waiting behind a user's previous event or a late scheduler counts too.
+    """
+
+    def __init__(self, num_users, num_actions, rate, arrivals="poisson", ramp_up=0.0, report_interval=1.0):
+        self.users = [OpenLoopUser(gen_imei(), num_actions) for _ in range(num_users)]
+        self.total = num_users * num_actions
+        self.rate = rate
+        self.arrivals = arrivals
+        self.ramp_up = ramp_up
+        self.report_interval = report_interval
+
+        self.dispatched = 0
+        self.completed = 0
+        self.errors = 0
+        self.latency_by_bts = dict()  # bts_id -> LatencyHistogram
+        self.latency_by_action = dict()  # action -> LatencyHistogram
+        self._events = asyncio.Queue()
+        self._tasks = set()
+
+    async def _event(self, user, due_at):
+        async with user.lock:
+            user.x, user.y = random_step(user.x, user.y, user.base_speed)
+            timestamp = datetime.now()
+            final_x, final_y = int(user.x), int(user.y)
+            action = "connect" if user.should_connect else "keepalive"
+            try:
+                response, user.should_connect = await send_event(
+                    timestamp, user.imei, final_x, final_y, user.should_connect
+                )
+            except Exception as e:
+                response = {"error": "Event failed", "detail": str(e)}
+            latency = time.monotonic() - due_at
+
+        self.completed += 1
+        if response.get("error"):
+            self.errors += 1
+        self.latency_by_bts.setdefault(response.get("bts_id") or "none", LatencyHistogram()).add(latency)
+        self.latency_by_action.setdefault(action, LatencyHistogram()).add(latency)
+        await self._events.put({
+            "timestamp": timestamp, "imei": user.imei,
+            "x": final_x, "y": final_y,
+            "response": response
+        })
+
+    async def _dispatch(self):
+        started_at = time.monotonic()
+        pending = deque(u for u in self.users if u.remaining > 0)
+        arrivals = arrival_times(self.rate, self.arrivals, self.ramp_up)
+        while pending:
+            due_at = started_at + next(arrivals)
+            delay = due_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # round robin over users with events left
+            user = pending.popleft()
+            user.remaining -= 1
+            if user.remaining > 0:
+                pending.append(user)
+
+            task = asyncio.create_task(self._event(user, due_at))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self.dispatched += 1
+
+    def report(self, started_at, final=False):
+        elapsed = time.monotonic() - started_at
+        if self.ramp_up and elapsed < self.ramp_up:
+            target = self.rate * elapsed / (2 * self.ramp_up)  # average rate so far
+        else:
+            target = self.rate * (1 - self.ramp_up / (2 * elapsed)) if elapsed else 0.0
+        return {
+            "timestamp": datetime.now(),
+            "report": {
+                "final": final,
+                "elapsed_s": round(elapsed, 3),
+                "target_rate": round(target, 3),
+                "achieved_rate": round(self.dispatched / elapsed, 3) if elapsed else 0.0,
+                "completed_rate": round(self.completed / elapsed, 3) if elapsed else 0.0,
+                "dispatched": self.dispatched,
+                "completed": self.completed,
+                "errors": self.errors,
+                "backlog": self.dispatched - self.completed,
+                "remaining": self.total - self.dispatched,
+                "latency": {
+                    "bts": {bts_id: latency.percentiles() for bts_id, latency in self.latency_by_bts.items()},
+                    "action": {action: latency.percentiles() for action, latency in self.latency_by_action.items()},
+                },
+            },
+        }
+
+    async def run(self):
+        started_at = time.monotonic()
+        next_report = started_at + self.report_interval
+        dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            while self.completed < self.total:
+                timeout = max(0.0, next_report - time.monotonic())
+                try:
+                    yield await asyncio.wait_for(self._events.get(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                if time.monotonic() >= next_report:
+                    yield self.report(started_at)
+                    next_report += self.report_interval
+            while not self._events.empty():
+                yield self._events.get_nowait()
+            yield self.report(started_at, final=True)
+        finally:
+            dispatcher.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+
+
+async def generate_open_loop(num_users, num_actions, rate, arrivals="poisson", ramp_up=0.0, report_interval=1.0):
+    generator = OpenLoopGenerator(num_users, num_actions, rate, arrivals, ramp_up, report_interval)
+    async for item in generator.run():
+        yield item
@@ -0,0 +1,207 @@
+from datetime import datetime
+from comms.api import gen_imei, connect, send_keep_alive, get_bts_index
+from constants import X_MAX, X_MIN, Y_MAX, Y_MIN
+import asyncio
+import time
+import numpy as np
+
+# UE states of the array state machine
+DETACHED = 0   # next event is a connect
+CONNECTED = 1  # next event is a keepalive
+
+PAUSE_PROBABILITY = 0.15  # same as simulate_actions in services/generate.py
+
+
+def reflect(v, lo, hi):
+    """Mirror coordinates that left [lo, hi] back inside (a step is far shorter than the area)."""
+    v = np.where(v < lo, 2 * lo - v, v)
+    v = np.where(v > hi, 2 * hi - v, v)
+    return np.clip(v, lo, hi)
+
+
+class HeadlessSimulation:
+    """
+    All users of a simulation as NumPy arrays, advanced by one vectorised step per tick.
+
+    Movement is the random walk of services/generate.simulate_actions (15% chance to stand still,
+    otherwise a step of base_speed * U(0.75, 1.25) in a random direction), but positions are
+    reflected at the constants.py bounds instead of retrying the step. The connect/keepalive
+    state machine runs on arrays as well: every tick each user is matched to its closest BTS
+    (BtsGridIndex.nearest_many), users out of range are detached, detached users in range connect
+    and connected users whose closest BTS changed hand over. Only a sample of the users
+    (`sample` probability per user and tick, or `rate` requests per second in total) send the real
+    HTTP request to their BTS; their responses drive the state of those users like in generate.
+
+    Requests run as background tasks, at most max_in_flight at a time; a sampled request that finds
+    no free slot is skipped, so a slow BTS never delays the tick. Each tick reports the requests it
+    dispatched and the responses that completed since the previous tick.
+    """
+
+    def __init__(self, num_users, sample=None, rate=None, max_in_flight=256, seed=None):
+        self.n = num_users
+        self.sample = sample
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+        self._http_slots = asyncio.Semaphore(max_in_flight)
+        self._http_tasks = set()
+        self._http_results = []  # (success, elapsed) completed since the last report
+        self._rate_carry = 0.0
+
+        self.imeis = [gen_imei() for _ in range(num_users)]
+        self.x = self.rng.integers(X_MIN, X_MAX, num_users, endpoint=True).astype(np.float64)
+        self.y = self.rng.integers(Y_MIN, Y_MAX, num_users, endpoint=True).astype(np.float64)
+        self.base_speed = self.rng.uniform(5.0, 30.0, num_users)
+
+        self.state = np.full(num_users, DETACHED, dtype=np.int8)
+        self.serving = np.full(num_users, -1, dtype=np.int64)  # index into self.index.ids, -1 = none
+        self.index = get_bts_index()
+        self.tick = 0
+
+    def step(self):
+        """Move every user once."""
+        moving = self.rng.random(self.n) >= PAUSE_PROBABILITY
+        angle = self.rng.uniform(0, 2 * np.pi, self.n)
+        step_size = self.base_speed * self.rng.uniform(0.75, 1.25, self.n) * moving
+        self.x = reflect(self.x + step_size * np.cos(angle), X_MIN, X_MAX)
+        self.y = reflect(self.y + step_size * np.sin(angle), Y_MIN, Y_MAX)
+
+    def _follow_index(self):
+        """Remap serving BTS indices when discovery published a new registry version."""
+        index = get_bts_index()
+        if index is self.index:
+            return
+        positions = {bts_id: i for i, bts_id in enumerate(index.ids)}
+        remap = np.array([positions.get(bts_id, -1) for bts_id in self.index.ids] + [-1], dtype=np.int64)
+        # -1 (no serving BTS) picks the trailing -1
+        self.serving = remap[self.serving]
+        self.index = index
+
+    def update_states(self):
+        """Advance the connect/keepalive state machine of every user; returns this tick's counts."""
+        self._follow_index()
+        nearest, _ = self.index.nearest_many(self.x, self.y)
+
+        in_range = nearest >= 0
+        connected = self.state == CONNECTED
+        lost = connected & ~in_range
+        connects = ~connected & in_range
+        handovers = connected & in_range & (nearest != self.serving)
+
+        self.state[lost] = DETACHED
+        self.state[connects] = CONNECTED
+        self.serving = np.where(in_range, nearest, -1)
+
+        return {
+            "connects": int(connects.sum()),
+            "keepalives": int((connected & in_range).sum()),
+            "handovers": int(handovers.sum()),
+            "lost": int(lost.sum()),
+        }
+
+    def pick_http_users(self, elapsed):
+        """Users that send a real request this tick, `elapsed` seconds after the previous one."""
+        if self.rate is not None:
+            self._rate_carry += self.rate * elapsed
+            k = min(int(self._rate_carry), self.n)
+            self._rate_carry -= k
+            return self.rng.choice(self.n, k, replace=False) if k else np.empty(0, dtype=np.int64)
+        if self.sample:
+            return np.flatnonzero(self.rng.random(self.n) < self.sample)
+        return np.empty(0, dtype=np.int64)
+
+    async def _send(self, i, was_connected, timestamp):
+        """Send one request; the caller holds an _http_slots slot, released here."""
+        imei, x, y = self.imeis[i], int(self.x[i]), int(self.y[i])
+        started_at = time.perf_counter()
+        try:
+            if was_connected:
+                response = await send_keep_alive(timestamp, imei, x, y)
+            else:
+                response = await connect(timestamp, imei, x, y)
+        except Exception as e:
+            response = {"error": "Event failed", "detail": str(e)}
+        finally:
+            self._http_slots.release()
+        elapsed = time.perf_counter() - started_at
+
+        data = (response.get("response") or {}).get("data") or {}
+        action = data.get("action")
+        if response.get("error") or action == "disconnect" or (was_connected and action == "handover"):
+            self.state[i] = DETACHED
+        self._http_results.append((response.get("error") is None, elapsed))
+
+    async def send_http(self, users, was_connected, timestamp):
+        """Start the sampled requests in the background; returns how many were sent and skipped."""
+        sent = 0
+        for i, c in zip(users, was_connected):
+            if self._http_slots.locked():
+                break
+            await self._http_slots.acquire()  # a slot is free, so this does not wait
+            task = asyncio.create_task(self._send(int(i), bool(c), timestamp))
+            self._http_tasks.add(task)
+            task.add_done_callback(self._http_tasks.discard)
+            sent += 1
+        return {"sent": sent, "skipped": len(users) - sent}
+
+    def http_report(self):
+        """Responses completed since the previous report."""
+        results, self._http_results = self._http_results, []
+        latencies = [elapsed for _, elapsed in results]
+        ok = sum(1 for success, _ in results if success)
+        return {
+            "completed": len(results),
+            "ok": ok,
+            "errors": len(results) - ok,
+            "in_flight": len(self._http_tasks),
+            "p50_ms": round(sorted(latencies)[len(latencies) // 2] * 1000, 3) if latencies else None,
+            "max_ms": round(max(latencies) * 1000, 3) if latencies else None,
+        }
+
+    async def run(self, num_ticks, interval):
+        """Run num_ticks ticks `interval` seconds apart, yielding one progress summary per tick."""
+        previous_tick = time.perf_counter() - interval
+        for _ in range(num_ticks):
+            started_at = time.perf_counter()
+            self.tick += 1
+            self.step()
+
+            # with a slow tick (or interval 0) the rate still holds per second of wall time
+            users = self.pick_http_users(started_at - previous_tick)
+            previous_tick = started_at
+            # the sampled users' state before this tick decides connect vs. keepalive
+            was_connected = self.state[users] == CONNECTED
+            counts = self.update_states()
+            step_ms = (time.perf_counter() - started_at) * 1000
+
+            timestamp = datetime.now()
+            http = await self.send_http(users, was_connected, timestamp)
+
+            yield {
+                "timestamp": timestamp,
+                "tick": self.tick,
+                "users": self.n,
+                "connected": int((self.state == CONNECTED).sum()),
+                **counts,
+                "http": {**http, **self.http_report()},
+                "step_ms": round(step_ms, 3),
+            }
+
+            await asyncio.sleep(max(0.0, interval - (time.perf_counter() - started_at)))
+
+        # responses still in flight after the last tick
+        if self._http_tasks:
+            await asyncio.gather(*self._http_tasks)
+            yield {
+                "timestamp": datetime.now(),
+                "tick": self.tick,
+                "users": self.n,
+                "connected": int((self.state == CONNECTED).sum()),
+                "http": {"sent": 0, "skipped": 0, **self.http_report()},
+                "final": True,
+            }
+
+
+async def simulate(num_users, num_ticks, interval=1.0, sample=None, rate=None, seed=None):
+    simulation = HeadlessSimulation(num_users, sample=sample, rate=rate, seed=seed)
+    async for progress in simulation.run(num_ticks, interval):
+        yield progress
@@ -1,31 +1,135 @@
-from comms.api import connect, send_keep_alive, clear
-import asyncio
-
-async def replay(events):
-    await clear()
-    last_ts = events[0][0]
-    should_connect = True
-    for timestamp, imei, x, y in events:
-        await asyncio.sleep((timestamp - last_ts).total_seconds())
-
-        if (should_connect):
-            response = await connect(timestamp, imei, x, y)
-            inner_response = response.get("response", {})
-            data = inner_response.get("data", {})
-            if data.get("action") == "disconnect":
-                should_connect = True
-            else:
-                should_connect = False
-        else:
-            response = await send_keep_alive(timestamp, imei, x, y)
-            inner_response = response.get("response", {})
-            data = inner_response.get("data", {})
-            if (data.get("action") == "handover"):
-                should_connect = True
-            if (data.get("action") == "disconnect"):
-                print(f"User {imei} disconnected. --------------------------------------")
-                should_connect = True
-                
-        yield {"timestamp": timestamp, "imei": imei, "x": x, "y": y, "response": response}
-        last_ts = timestamp
-
+from datetime import datetime
+from comms.api import clear
+from services.generate import send_event, LatencyHistogram
+import asyncio
+import functools
+import time
+
+MAX_PENDING = 10000  # events read ahead of their responses; bounds memory on fast replays
+
+
+class ImeiReplay:
+    __slots__ = ("should_connect", "lock")
+
+    def __init__(self):
+        self.should_connect = True
+        # events of one IMEI are sent in file order (asyncio.Lock wakes waiters FIFO)
+        self.lock = asyncio.Lock()
+
+
+class Replayer:
+    """
+    Replays recorded events as a repeatable load test.
+
+    Events are read one at a time and due at start + (timestamp - first timestamp) / speed
+    (speed None: as fast as possible). Each IMEI has its own connect/keepalive state machine;
+    different IMEIs are sent concurrently, events of one IMEI strictly in order.
+    """
+
+    def __init__(self, events, speed=1.0, max_pending=MAX_PENDING):
+        self.events = events
+        self.speed = speed
+        self.imeis = dict()  # imei -> ImeiReplay
+
+        self.dispatched = 0
+        self.completed = 0
+        self.errors = 0
+        self.latencies = dict()  # action -> LatencyHistogram
+        self.first_ts = None
+        self.last_ts = None
+        self._pending = asyncio.Semaphore(max_pending)
+        self._results = asyncio.Queue()
+        self._tasks = set()
+
+    async def _event(self, state, timestamp, imei, x, y):
+        try:
+            async with state.lock:
+                action = "connect" if state.should_connect else "keepalive"
+                started_at = time.monotonic()
+                try:
+                    response, state.should_connect = await send_event(timestamp, imei, x, y, state.should_connect)
+                except Exception as e:
+                    response = {"error": "Event failed", "detail": str(e)}
+                latency = time.monotonic() - started_at
+
+            self.completed += 1
+            if response.get("error"):
+                self.errors += 1
+            self.latencies.setdefault(action, LatencyHistogram()).add(latency)
+            await self._results.put({"timestamp": timestamp, "imei": imei, "x": x, "y": y, "response": response})
+        finally:
+            self._pending.release()
+
+    async def _dispatch(self):
+        started_at = time.monotonic()
+        for timestamp, imei, x, y in self.events:
+            if self.first_ts is None:
+                self.first_ts = timestamp
+            self.last_ts = timestamp
+
+            if self.speed:
+                delay = started_at + (timestamp - self.first_ts).total_seconds() / self.speed - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            await self._pending.acquire()
+            state = self.imeis.get(imei)
+            if state is None:
+                state = self.imeis[imei] = ImeiReplay()
+            task = asyncio.create_task(self._event(state, timestamp, imei, x, y))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            self.dispatched += 1
+
+    def summary(self, started_at):
+        elapsed = time.monotonic() - started_at
+        span = (self.last_ts - self.first_ts).total_seconds() if self.first_ts is not None else 0.0
+        return {
+            "timestamp": datetime.now(),
+            "summary": {
+                "events": self.completed,
+                "imeis": len(self.imeis),
+                "errors": self.errors,
+                "speed": self.speed or "max",
+                "trace_span_s": round(span, 3),
+                "elapsed_s": round(elapsed, 3),
+                "achieved_rate": round(self.completed / elapsed, 3) if elapsed else 0.0,
+                "trace_rate": round(self.completed / span, 3) if span else None,
+                "latency": {
+                    "all": functools.reduce(LatencyHistogram.merge, self.latencies.values(), LatencyHistogram()).percentiles(),
+                    **{action: latency.percentiles() for action, latency in self.latencies.items()},
+                },
+            },
+        }
+
+    async def run(self):
+        started_at = time.monotonic()
+        dispatcher = asyncio.create_task(self._dispatch())
+        try:
+            while not dispatcher.done():
+                get = asyncio.ensure_future(self._results.get())
+                done, _ = await asyncio.wait({get, dispatcher}, return_when=asyncio.FIRST_COMPLETED)
+                if get in done:
+                    yield get.result()
+                else:
+                    get.cancel()
+            while self.completed < self.dispatched or not self._results.empty():
+                yield await self._results.get()
+            # a failing event source (e.g. a malformed row) ends the replay with its error
+            dispatcher.result()
+            yield self.summary(started_at)
+        finally:
+            dispatcher.cancel()
+            for task in list(self._tasks):
+                task.cancel()
+
+
+async def replay(events, speed=1.0):
+    """
+    Replay an iterable of (timestamp, imei, x, y), yielding one line per event and a final summary.
+    speed: 1 = recorded pace, 10 = ten times faster, None/0 = as fast as possible.
+    """
+    await clear()
+    replayer = Replayer(events, speed)
+    async for line in replayer.run():
+        yield line